@@ -1,7 +1,10 @@
 import firebase_admin
 from firebase_admin import credentials
 from google.cloud import firestore
-import re
+from candidate_store import CandidateStore
+from committee_store import CommitteeStore
+from contributor_groups import ContributorGroupResolver
+from occupations import OccupationClassifier
 
 
 class Database:
@@ -18,6 +21,8 @@ class Database:
         self.candidate_aliases = None
         self.individual_employers = None
         self.occupation_allowlist = None
+        self.occupation_classifier = None
+        self.group_resolver = None
         self.duplicate_contributions = None
         self.candidates = None
         self.all_committees = None
@@ -27,6 +32,9 @@ class Database:
         self.committee_affiliations = None
         self.opposition_spending = None
         self.non_candidate_committees = None
+        self.candidate_store = CandidateStore()
+        self.committee_store = CommitteeStore()
+        self.race_index = None
 
     def get_constants(self):
         constants = self.client.collection("constants")
@@ -44,11 +52,9 @@ class Database:
         self.occupation_allowlist = (
             constants.document("occupationAllowlist").get().to_dict()
         )
-        self.occupation_allowlist["contains"] = re.compile(
-            "({})".format("|".join(self.occupation_allowlist["contains"])),
-            re.IGNORECASE,
+        self.occupation_classifier = OccupationClassifier(
+            self.occupation_allowlist["contains"], self.occupation_allowlist["equals"]
         )
-        self.occupation_allowlist["equals"] = set(self.occupation_allowlist["equals"])
         self.duplicate_contributions = (
             constants.document("duplicateContributions").get().to_dict()
         )
@@ -67,3 +73,4 @@ class Database:
             constants.document("nonCandidateCommittees").get().to_dict()
         )
         self.non_candidate_committees = set(non_candidate_committees_dict["ids"])
+        self.group_resolver = ContributorGroupResolver(self)
@@ -1,6 +1,8 @@
 from google.cloud import bigquery
 import datetime
 
+from pipeline_core.changelog import diff_records
+
 
 def quote_str(string):
     return "'{}'".format(string)
@@ -24,7 +26,12 @@ FIELDS = [
 ]
 
 
-def get_ads(db):
+def get_ads(db, changelog=None):
+    """
+    Fetch each committee's Google political ads from BigQuery, and merge in the manually tracked ads. Returns the ads
+    that weren't present in the previous run, by committee. If a Changelog is provided, added, removed, and changed ads
+    are recorded in it.
+    """
     new_ads = {}
     ads_by_committee = {}
     gatc_to_fec = {}
@@ -69,19 +76,17 @@ def get_ads(db):
             ads_by_committee[ad["committee_id"]] = {"ads": {ad["ad_id"]: ad}}
 
     old_ads = db.client.collection("ads").document("by_committee").get().to_dict()
-    if old_ads:
-        for committee in ads_by_committee:
+    for committee in set(ads_by_committee).union(old_ads or {}):
+        old_committee_ads = (old_ads or {}).get(committee, {}).get("ads")
+        committee_ads = ads_by_committee.get(committee, {}).get("ads", {})
+        diff = diff_records(old_committee_ads, committee_ads)
+        if old_ads and committee in ads_by_committee:
             if committee not in old_ads:
-                new_ads[committee] = ads_by_committee[committee]["ads"]
-            else:
-                old_ad_ids = set(old_ads[committee]["ads"].keys())
-                for ad_id in ads_by_committee[committee]["ads"]:
-                    if ad_id not in old_ad_ids:
-                        if committee not in new_ads:
-                            new_ads[committee] = {}
-                        new_ads[committee][ad_id] = ads_by_committee[committee]["ads"][
-                            ad_id
-                        ]
+                new_ads[committee] = committee_ads
+            elif diff.inserted:
+                new_ads[committee] = diff.inserted
+        if changelog is not None:
+            changelog.record("ads", committee, diff)
 
     db.client.collection("ads").document("by_committee").set(ads_by_committee)
     return new_ads
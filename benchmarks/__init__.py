@@ -0,0 +1,10 @@
+"""
+Benchmarks for the processing stages, runnable without Firestore or FEC API access.
+
+- memory_firestore: In-memory stand-in for the Firestore client
+- fec_replay: Replays recorded FEC API responses through a requests-like session
+- synthetic: Synthetic datasets at multiples of today's data volume
+- fec_simulator: Local HTTP stand-in for the FEC API (python -m benchmarks.fec_simulator)
+- harness: Times the processing stages end to end (python -m benchmarks.harness)
+- micro: Times the per-record functions of the processing stages against stored baselines (python -m benchmarks.micro)
+"""
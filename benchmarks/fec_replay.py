@@ -0,0 +1,174 @@
+"""
+Replays recorded FEC API responses through a requests-like session, so FEC_fetch can run without network access.
+
+Fixtures are JSON files, each holding one entry or a list of entries:
+
+    {"url": "/v1/candidates/search", "params": {"state": "AZ", "office": "H"}, "response": {...}}
+
+A request matches an entry when the URL path is the same and every param in the entry equals the corresponding request
+param (after normalization: the api_key and None values are dropped, and multi-valued params are sorted). When several
+entries match, the one with the most params wins, so fixtures can be as general or specific as needed.
+
+An entry can also list "filter_params": request params that filter the results like the FEC API does, so one entry can
+answer requests for any subset of its results (e.g. candidates/totals for a list of candidate_id values).
+"""
+
+import datetime
+import glob
+import json
+import os
+from urllib.parse import urlparse
+
+import requests
+
+EMPTY_RESPONSE = {
+    "results": [],
+    "pagination": {
+        "count": 0,
+        "pages": 0,
+        "per_page": 100,
+        "page": 1,
+        "last_indexes": None,
+    },
+}
+
+
+def normalize_params(params):
+    """Normalize request params the same way requests would encode them, so they can be compared."""
+    normalized = {}
+    for key, value in (params or {}).items():
+        if key == "api_key" or value is None:
+            continue
+        if isinstance(value, (str, bytes, int, float, bool)):
+            normalized[key] = str(value)
+        else:
+            values = sorted(str(v) for v in value)
+            if values:
+                normalized[key] = values
+    return normalized
+
+
+def url_path(url):
+    return urlparse(url).path.rstrip("/")
+
+
+def load_fixtures(path):
+    """Load fixture entries from every *.json file in a directory."""
+    entries = []
+    for filename in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(filename) as f:
+            loaded = json.load(f)
+        entries.extend(loaded if isinstance(loaded, list) else [loaded])
+    return entries
+
+
+def make_response(url, status_code, data):
+    """Build a requests.Response holding a JSON body."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response._content = json.dumps(data).encode()
+    response.headers["Content-Type"] = "application/json"
+    response.elapsed = datetime.timedelta(0)
+    response.from_cache = False
+    return response
+
+
+class ReplaySession:
+    """Session that answers requests from recorded fixtures instead of the network."""
+
+    def __init__(self, fixture_entries=None, missing_status=200):
+        """
+        Args:
+            fixture_entries: Fixture entries (see module docstring)
+            missing_status: Status code for requests with no matching fixture. With the default (200), an empty
+                page of results is returned; use 404 to have FEC_fetch return None instead.
+        """
+        self._entries = {}
+        self.missing_status = missing_status
+        self.requests = 0
+        self.misses = []
+        for entry in fixture_entries or []:
+            self.add(entry)
+
+    @classmethod
+    def from_directory(cls, path, **kwargs):
+        """Load every *.json fixture file in a directory."""
+        return cls(load_fixtures(path), **kwargs)
+
+    def add(self, entry):
+        """Add a fixture entry."""
+        params = normalize_params(entry.get("params"))
+        self._entries.setdefault(url_path(entry["url"]), []).append(
+            (params, entry["response"], entry.get("status", 200), entry.get("filter_params", []))
+        )
+
+    def find(self, url, params=None):
+        """Find the fixture entry matching a request, returning (response data, status), or None."""
+        request_params = normalize_params(params)
+        best = None
+        for entry_params, data, status, filter_params in self._entries.get(url_path(url), []):
+            if all(request_params.get(k) == v for k, v in entry_params.items()):
+                if best is None or len(entry_params) > len(best[0]):
+                    best = (entry_params, data, status, filter_params)
+        if best is None:
+            return None
+        _, data, status, filter_params = best
+        filters = {
+            k: request_params[k] if isinstance(request_params[k], list) else [request_params[k]]
+            for k in filter_params
+            if k in request_params
+        }
+        if filters:
+            results = [
+                result
+                for result in data["results"]
+                if all(str(result.get(k)) in v for k, v in filters.items())
+            ]
+            data = {**data, "results": results, "pagination": {**data.get("pagination", {}), "count": len(results)}}
+        return data, status
+
+    def get(self, url, params=None, **kwargs):
+        self.requests += 1
+        found = self.find(url, params)
+        if found is None:
+            self.misses.append((url_path(url), normalize_params(params)))
+            if self.missing_status == 200:
+                return make_response(url, 200, EMPTY_RESPONSE)
+            return make_response(url, self.missing_status, {})
+        data, status = found
+        return make_response(url, status, data)
+
+
+class RecordingSession:
+    """
+    Wraps a real session, saving every JSON response as a fixture entry.
+
+    Use this to record fixtures from a live run, then replay them with ReplaySession.
+    """
+
+    def __init__(self, session, path):
+        """
+        Args:
+            session: Session to make the real requests with
+            path: JSON file to write recorded entries to when save() is called
+        """
+        self.session = session
+        self.path = path
+        self.entries = []
+
+    def get(self, url, params=None, **kwargs):
+        response = self.session.get(url, params=params, **kwargs)
+        if response.ok:
+            self.entries.append(
+                {
+                    "url": url_path(url),
+                    "params": normalize_params(params),
+                    "response": response.json(),
+                }
+            )
+        return response
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
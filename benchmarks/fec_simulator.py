@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the FEC API, serving a generated (or saved) dataset over HTTP.
+
+The simulator serves the endpoints the fetch stages use, with the same pagination as the live API: keyset pagination
+(last_index plus last_<sort field>) for schedules/schedule_a, schedule_b and schedule_e, and page numbers everywhere
+else. Latency, server errors and 429 rate limiting can be injected to see how the fetch layer holds up.
+
+Point FEC_fetch at it with the FEC_API_BASE_URL environment variable:
+
+    python -m benchmarks.fec_simulator --scale 10 --latency 80 --rate-limit-rate 0.01
+    FEC_API_BASE_URL=http://127.0.0.1:8089/v1 python pipeline.py --tasks fetch_committee_contributions
+
+Usage:
+    python -m benchmarks.fec_simulator                                   # 1x synthetic data on port 8089
+    python -m benchmarks.fec_simulator --write-dataset runs/fec.json     # Save the generated dataset
+    python -m benchmarks.fec_simulator --dataset runs/fec.json --error-rate 0.02 --max-rps 16
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import synthetic
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# path: (dataset key, default sort, amount field, date field)
+KEYSET_ENDPOINTS = {
+    "schedules/schedule_a": (
+        "schedule_a",
+        "-contribution_receipt_date",
+        "contribution_receipt_amount",
+        "contribution_receipt_date",
+    ),
+    "schedules/schedule_b": (
+        "schedule_b",
+        "-disbursement_date",
+        "disbursement_amount",
+        "disbursement_date",
+    ),
+    "schedules/schedule_e": (
+        "schedule_e",
+        "-expenditure_date",
+        "expenditure_amount",
+        "expenditure_date",
+    ),
+}
+PAGED_ENDPOINTS = {
+    "schedules/schedule_a/efile": (
+        "schedule_a_efile",
+        "-contribution_receipt_date",
+        "contribution_receipt_amount",
+        "contribution_receipt_date",
+    ),
+    "schedules/schedule_e/efile": (
+        "schedule_e_efile",
+        "-expenditure_date",
+        "expenditure_amount",
+        "expenditure_date",
+    ),
+    "committees": ("committees", "name", None, None),
+    "candidates": ("candidates", "name", None, None),
+    "candidates/search": ("candidates", "name", None, None),
+    "candidates/totals": ("candidate_totals", "-receipts", None, None),
+}
+# Fields only the single-committee endpoint (/committee/{id}) returns, and the committees list leaves out
+COMMITTEE_DETAIL_FIELDS = ("leadership_pac", "party_type", "party_type_full", "website")
+COMMITTEE_PATH = re.compile(r"^committee/(?P<committee_id>[^/]+)(?P<totals>/totals)?$")
+
+# Params that select a page rather than filter results
+PAGINATION_PARAMS = {"api_key", "per_page", "page", "sort", "last_index"}
+# Params accepted by the live API that don't change which results the simulator returns
+IGNORED_PARAMS = {"is_notice", "most_recent", "sort_hide_null", "sort_null_only"}
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def words(value):
+    return set(WORD.findall(str(value).lower()))
+
+
+def matches_words(term_words, value_words):
+    return all(
+        any(value_word.startswith(term_word) for value_word in value_words)
+        for term_word in term_words
+    )
+
+
+def matches_text(value, terms):
+    """Full-text match: every word of one of the terms is a prefix of a word in the value."""
+    if not value:
+        return False
+    value_words = words(value)
+    return any(matches_words(words(term), value_words) for term in terms)
+
+
+def matches_equal(value, terms):
+    return value is not None and str(value).lower() in {t.lower() for t in terms}
+
+
+# param: (record field, match(record value, param values))
+FILTERS = {
+    "committee_id": ("committee_id", matches_equal),
+    "candidate_id": ("candidate_id", matches_equal),
+    "contributor_name": ("contributor_name", matches_text),
+    "contributor_employer": ("contributor_employer", matches_text),
+    "contributor_occupation": ("contributor_occupation", matches_text),
+    "contributor_city": ("contributor_city", matches_text),
+    "contributor_state": ("contributor_state", matches_equal),
+    "contributor_zip": (
+        "contributor_zip",
+        lambda value, terms: bool(value) and any(str(value).startswith(t) for t in terms),
+    ),
+    "recipient_committee_id": ("recipient_committee_id", matches_equal),
+    "q": ("name", matches_text),
+    "state": ("state", matches_equal),
+    "office": ("office", matches_equal),
+    "district": ("district", matches_equal),
+    "party": ("party", matches_equal),
+    "cycle": ("cycle", matches_equal),
+    "two_year_transaction_period": ("two_year_transaction_period", matches_equal),
+    "election_year": (
+        "election_years",
+        lambda value, terms: any(str(year) in terms for year in value or []),
+    ),
+    # The live API takes "<form>-<line>", e.g. F3X-22
+    "line_number": (
+        "line_number",
+        lambda value, terms: any(str(value) == t.split("-")[-1] for t in terms),
+    ),
+}
+
+
+class FECSimulator:
+    """Answers FEC API requests from an in-memory dataset, with optional latency and fault injection."""
+
+    def __init__(
+        self,
+        dataset,
+        latency=0.0,
+        latency_jitter=0.0,
+        error_rate=0.0,
+        error_status=500,
+        rate_limit_rate=0.0,
+        max_rps=None,
+        seed=None,
+    ):
+        """
+        Args:
+            dataset: {dataset key: [records]}, as returned by synthetic.generate_fec_dataset()
+            latency: Mean seconds to wait before responding
+            latency_jitter: Latency varies uniformly by up to this many seconds either way
+            error_rate: Share of requests answered with error_status
+            error_status: Status code for injected errors
+            rate_limit_rate: Share of requests answered with 429
+            max_rps: Answer with 429 once more than this many requests arrive within a second
+            seed: Random seed for latency and fault injection
+        """
+        self.dataset = dataset
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._sorted_cache = {}
+        self._committees = {c["committee_id"]: c for c in dataset.get("committees", [])}
+        self._committee_totals = {}
+        for totals in dataset.get("committee_totals", []):
+            self._committee_totals.setdefault(totals["committee_id"], []).append(totals)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def handle(self, path, params):
+        """
+        Answer a request.
+
+        Args:
+            path: Request path, e.g. /v1/schedules/schedule_a/
+            params: Query params, as {name: [values]}
+
+        Returns:
+            (status code, JSON body)
+        """
+        endpoint = path.strip("/")
+        if endpoint.startswith("v1/"):
+            endpoint = endpoint[len("v1/"):]
+
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = max(
+                0.0,
+                self.latency
+                + self.random.uniform(-self.latency_jitter, self.latency_jitter),
+            )
+            fault = self._choose_fault()
+        if delay:
+            time.sleep(delay)
+
+        if fault == 429:
+            return 429, {
+                "error": {
+                    "code": "OVER_RATE_LIMIT",
+                    "message": "You have exceeded your rate limit. Try again later.",
+                }
+            }
+        if fault:
+            return fault, {"message": "Injected server error"}
+        if not params.get("api_key"):
+            return 403, {
+                "error": {
+                    "code": "API_KEY_MISSING",
+                    "message": "No api_key was supplied.",
+                }
+            }
+
+        if endpoint in KEYSET_ENDPOINTS:
+            return 200, self.keyset_page(endpoint, params)
+        if endpoint == "committees":
+            body = self.numbered_page(endpoint, params)
+            body["results"] = [
+                {k: v for k, v in committee.items() if k not in COMMITTEE_DETAIL_FIELDS}
+                for committee in body["results"]
+            ]
+            return 200, body
+        if endpoint in PAGED_ENDPOINTS:
+            return 200, self.numbered_page(endpoint, params)
+        m = COMMITTEE_PATH.match(endpoint)
+        if m:
+            committee_id = m.group("committee_id")
+            if m.group("totals"):
+                records = self.filter(
+                    self._committee_totals.get(committee_id, []), params
+                )
+            else:
+                committee = self._committees.get(committee_id)
+                records = [committee] if committee else []
+            return 200, self.page_response(records, 1, self.per_page(params))
+        return 404, {"message": f"Unknown endpoint: /v1/{endpoint}"}
+
+    def _choose_fault(self):
+        if self.max_rps:
+            now = time.monotonic()
+            while self._recent and self._recent[0] < now - 1:
+                self._recent.popleft()
+            self._recent.append(now)
+            if len(self._recent) > self.max_rps:
+                self.stats["rate_limited"] += 1
+                return 429
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return 429
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return self.error_status
+        return None
+
+    @staticmethod
+    def per_page(params):
+        try:
+            per_page = int(params.get("per_page", [DEFAULT_PER_PAGE])[0])
+        except ValueError:
+            per_page = DEFAULT_PER_PAGE
+        return max(1, min(per_page, MAX_PER_PAGE))
+
+    def filter(self, records, params, amount_field=None, date_field=None):
+        filters = []
+        for param, values in params.items():
+            if param in FILTERS:
+                field, match = FILTERS[param]
+                filters.append((field, match, values))
+        bounds = []
+        if amount_field:
+            if "min_amount" in params:
+                bounds.append((amount_field, float(params["min_amount"][0]), None))
+            if "max_amount" in params:
+                bounds.append((amount_field, None, float(params["max_amount"][0])))
+        if date_field:
+            if "min_date" in params:
+                bounds.append((date_field, params["min_date"][0], None))
+            if "max_date" in params:
+                bounds.append((date_field, None, params["max_date"][0]))
+
+        matched = []
+        for record in records:
+            if not all(match(record.get(field), values) for field, match, values in filters):
+                continue
+            in_bounds = True
+            for field, low, high in bounds:
+                value = record.get(field)
+                if value is None or (low is not None and value < low) or (
+                    high is not None and value > high
+                ):
+                    in_bounds = False
+                    break
+            if in_bounds:
+                matched.append(record)
+        return matched
+
+    def sorted_matches(self, endpoint, params, endpoints):
+        """
+        Filter and sort an endpoint's records in ascending order, caching the result for later pages.
+
+        Returns:
+            (sort field, descending, records, sort keys)
+        """
+        dataset_key, default_sort, amount_field, date_field = endpoints[endpoint]
+        sort = params.get("sort", [default_sort])[0]
+        field = sort.lstrip("-")
+        cache_key = (
+            endpoint,
+            sort,
+            tuple(
+                sorted(
+                    (k, tuple(v))
+                    for k, v in params.items()
+                    if k not in PAGINATION_PARAMS
+                    and k not in IGNORED_PARAMS
+                    and not k.startswith("last_")
+                )
+            ),
+        )
+        with self._lock:
+            cached = self._sorted_cache.get(cache_key)
+        if cached is None:
+            records = self.filter(
+                self.dataset.get(dataset_key, []), params, amount_field, date_field
+            )
+            records.sort(key=lambda r: sort_key(r, field))
+            cached = (field, sort.startswith("-"), records, [sort_key(r, field) for r in records])
+            with self._lock:
+                if len(self._sorted_cache) >= 1024:
+                    self._sorted_cache.clear()
+                self._sorted_cache[cache_key] = cached
+        return cached
+
+    def keyset_page(self, endpoint, params):
+        field, descending, records, keys = self.sorted_matches(
+            endpoint, params, KEYSET_ENDPOINTS
+        )
+        per_page = self.per_page(params)
+        cursor = None
+        if params.get("last_index"):
+            cursor = (
+                sort_value(params.get(f"last_{field}", [None])[0]),
+                int(params["last_index"][0]),
+            )
+
+        if descending:
+            end = bisect_left(keys, cursor) if cursor else len(records)
+            start = max(0, end - per_page)
+            results = records[start:end][::-1]
+            has_more = start > 0
+        else:
+            start = bisect_right(keys, cursor) if cursor else 0
+            end = start + per_page
+            results = records[start:end]
+            has_more = end < len(records)
+
+        last_indexes = None
+        if has_more and results:
+            last_indexes = {
+                "last_index": str(results[-1]["sub_id"]),
+                f"last_{field}": results[-1].get(field),
+            }
+        return {
+            "api_version": "1.0",
+            "results": results,
+            "pagination": {
+                "count": len(records),
+                "is_count_exact": True,
+                "pages": math.ceil(len(records) / per_page),
+                "per_page": per_page,
+                "last_indexes": last_indexes,
+            },
+        }
+
+    def numbered_page(self, endpoint, params):
+        field, descending, records, _ = self.sorted_matches(
+            endpoint, params, PAGED_ENDPOINTS
+        )
+        if descending:
+            records = records[::-1]
+        try:
+            page = max(1, int(params.get("page", ["1"])[0]))
+        except ValueError:
+            page = 1
+        return self.page_response(records, page, self.per_page(params))
+
+    @staticmethod
+    def page_response(records, page, per_page):
+        return {
+            "api_version": "1.0",
+            "results": records[(page - 1) * per_page : page * per_page],
+            "pagination": {
+                "count": len(records),
+                "is_count_exact": True,
+                "page": page,
+                "pages": math.ceil(len(records) / per_page),
+                "per_page": per_page,
+            },
+        }
+
+
+def sort_value(value):
+    """Make values of mixed types (and missing values) comparable, sorting missing values first."""
+    if value is None:
+        return (0, "")
+    if isinstance(value, (int, float)):
+        return (1, value)
+    try:
+        return (1, float(value))
+    except ValueError:
+        return (2, value)
+
+
+def sort_key(record, field):
+    return (sort_value(record.get(field)), int(record.get("sub_id") or 0))
+
+
+class SimulatorRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        status, body = self.server.simulator.handle(url.path, parse_qs(url.query))
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(simulator, host="127.0.0.1", port=8089, verbose=False):
+    """Create (but don't start) an HTTP server for a simulator. Use port 0 to pick any free port."""
+    server = ThreadingHTTPServer((host, port), SimulatorRequestHandler)
+    server.daemon_threads = True
+    server.simulator = simulator
+    server.verbose = verbose
+    return server
+
+
+def serve_in_background(simulator, host="127.0.0.1", port=0):
+    """
+    Serve a simulator from a background thread.
+
+    Returns:
+        (server, base URL): Call server.shutdown() when done. Set FEC_API_BASE_URL to the base URL to use it.
+    """
+    server = make_server(simulator, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://{}:{}/v1".format(*server.server_address)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve a simulated FEC API locally")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        help="JSON dataset to serve (as written by --write-dataset) instead of generating one",
+    )
+    parser.add_argument("--scale", type=int, default=1, help="Scale of the generated dataset")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated dataset")
+    parser.add_argument("--write-dataset", type=str, help="Write the dataset to this JSON file")
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Mean response latency in milliseconds"
+    )
+    parser.add_argument(
+        "--latency-jitter",
+        type=float,
+        default=0,
+        help="Latency varies uniformly by up to this many milliseconds either way",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="Share of requests to fail (0-1)"
+    )
+    parser.add_argument(
+        "--error-status", type=int, default=500, help="Status code for failed requests"
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0,
+        help="Share of requests to answer with 429 (0-1)",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=int,
+        help="Answer with 429 when more than this many requests arrive within a second",
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.dataset:
+        with open(args.dataset) as f:
+            dataset = json.load(f)
+    else:
+        print(f"Generating {args.scale}x dataset...")
+        dataset = synthetic.generate_fec_dataset(args.scale, args.seed)
+    if args.write_dataset:
+        with open(args.write_dataset, "w") as f:
+            json.dump(dataset, f)
+        print(f"Dataset written to {args.write_dataset}")
+
+    simulator = FECSimulator(
+        dataset,
+        latency=args.latency / 1000,
+        latency_jitter=args.latency_jitter / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit_rate=args.rate_limit_rate,
+        max_rps=args.max_rps,
+        seed=args.seed,
+    )
+    server = make_server(simulator, args.host, args.port, args.verbose)
+    base_url = "http://{}:{}/v1".format(*server.server_address)
+    print(", ".join(f"{len(records)} {key}" for key, records in dataset.items()))
+    print(f"Serving at {base_url}")
+    print(f"  export FEC_API_BASE_URL={base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = simulator.stats
+        print(
+            f"\n{stats['requests']} requests, {stats['rate_limited']} rate limited, "
+            f"{stats['errors']} failed"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Time the processing stages end to end against an in-memory Firestore and replayed FEC responses.
+
+Each scale gets a fresh synthetic dataset (see benchmarks/synthetic.py), and the stages run in pipeline order against
+it. For each stage, the harness records wall time, throughput (input records per second), peak memory, and Firestore
+and HTTP activity.
+
+Usage:
+    python -m benchmarks.harness                            # 1x, 10x and 100x scale
+    python -m benchmarks.harness --scales 1,10 --stages process_expenditures,summarize_races
+    python -m benchmarks.harness --fixtures path/to/recorded --output runs/benchmark.json
+    python -m benchmarks.harness --snapshot path/to/firestore.json   # Use exported data instead of synthetic data
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from Database import Database
+from candidate_store import CandidateStore
+from committee_store import CommitteeStore
+from pipeline_core.metrics import InstrumentedClient, MetricsCollector
+from process_committee_contributions import process_committee_contributions
+from process_committee_expenditures import process_expenditures
+from process_company_contributions import process_company_contributions
+from process_individual_contributions import process_individual_contributions
+from race_summary import summarize_races
+from recipients import summarize_recipients
+
+from . import synthetic
+from .fec_replay import ReplaySession, load_fixtures
+from .memory_firestore import InMemoryClient
+
+
+class BenchmarkDatabase(Database):
+    """Database backed by an in-memory client, without connecting to Firebase."""
+
+    def __init__(self, client):
+        self.client = client
+        # Not persisted, so that every benchmark run starts from the same state
+        self.candidate_store = CandidateStore(":memory:")
+        self.committee_store = CommitteeStore(":memory:")
+        self.race_index = None
+
+
+def count_list_field(field):
+    def count(store, collection):
+        return sum(
+            len(doc.get(field, [])) for doc in store.get(collection, {}).values()
+        )
+
+    return count
+
+
+def count_company_contributions(store):
+    return sum(
+        len(group.get("contributions", []))
+        for company in store.get("companies", {}).values()
+        for group in company.get("contributions", [])
+        if isinstance(group, dict)
+    )
+
+
+def count_expenditures(store):
+    return len(store.get("expenditures", {}).get("all", {}))
+
+
+# (name, function, count of input records)
+STAGES = [
+    (
+        "process_committee_contributions",
+        lambda db, session: process_committee_contributions(db),
+        lambda store: count_list_field("transactions")(store, "rawContributions"),
+    ),
+    (
+        # Run again with nothing changed, which only checks for changes against the stored aggregation state (or
+        # rebuilds from scratch if process_committee_contributions wasn't run first)
+        "reprocess_committee_contributions",
+        lambda db, session: process_committee_contributions(db),
+        lambda store: count_list_field("transactions")(store, "rawContributions"),
+    ),
+    (
+        "process_individual_contributions",
+        process_individual_contributions,
+        lambda store: count_list_field("contributions")(
+            store, "rawIndividualContributions"
+        ),
+    ),
+    (
+        "process_company_contributions",
+        process_company_contributions,
+        lambda store: count_list_field("contributions")(store, "rawCompanyContributions"),
+    ),
+    (
+        "process_expenditures",
+        lambda db, session: process_expenditures(db),
+        count_expenditures,
+    ),
+    (
+        # Run again with nothing changed, which only diffs expenditures against the stored snapshot
+        "reprocess_expenditures",
+        lambda db, session: process_expenditures(db),
+        count_expenditures,
+    ),
+    (
+        "summarize_recipients",
+        lambda db, session: summarize_recipients(db),
+        count_company_contributions,
+    ),
+    ("summarize_races", summarize_races, count_expenditures),
+]
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+
+def run_stages(collections, fixtures, stage_names, trace_memory=True, scale=None):
+    """
+    Run the processing stages against a dataset.
+
+    Args:
+        collections: Firestore contents, as {collection: {doc_id: document}}
+        fixtures: FEC fixture entries for the ReplaySession
+        stage_names: Stages to run, in pipeline order
+        trace_memory: Track peak memory per stage with tracemalloc
+        scale: Scale of the dataset, recorded with the results
+
+    Returns:
+        List of per-stage results
+    """
+    client = InMemoryClient(collections)
+    MetricsCollector.reset()
+    collector = MetricsCollector.get_instance()
+    collector.trace_memory = trace_memory
+
+    db = BenchmarkDatabase(InstrumentedClient(client, collector))
+    db.get_constants()
+    session = ReplaySession(fixtures)
+
+    results = []
+    for name, func, count_inputs in STAGES:
+        if name not in stage_names:
+            continue
+        inputs = count_inputs(client._store)
+        misses_before = len(session.misses)
+        collector.start_task(name)
+        try:
+            func(db, session)
+        finally:
+            metrics = collector.end_task()
+        result = {
+            **metrics.to_dict(),
+            "scale": scale,
+            "inputs": inputs,
+            "throughput": round(inputs / metrics.wall_seconds, 1)
+            if metrics.wall_seconds
+            else None,
+            "fixture_misses": len(session.misses) - misses_before,
+        }
+        results.append(result)
+        print(
+            f"  {name}: {metrics.wall_seconds:.2f}s, {inputs} inputs"
+            + (f", {result['throughput']:.0f}/s" if result["throughput"] else "")
+        )
+    collector.stop()
+    return results
+
+
+def format_results(results):
+    headers = [
+        "Stage",
+        "Scale",
+        "Inputs",
+        "Time (s)",
+        "Inputs/s",
+        "Peak traced MB",
+        "FS reads",
+        "FS writes",
+        "MB written",
+        "HTTP",
+    ]
+    rows = [
+        [
+            r["task_name"],
+            f"{r['scale']}x" if r["scale"] is not None else "-",
+            str(r["inputs"]),
+            f"{r['wall_seconds']:.2f}",
+            f"{r['throughput']:.0f}" if r["throughput"] else "-",
+            f"{r['peak_traced_bytes'] / 1e6:.1f}"
+            if r["peak_traced_bytes"] is not None
+            else "-",
+            str(r["firestore_reads"]),
+            str(r["firestore_writes"]),
+            f"{r['bytes_written'] / 1e6:.1f}",
+            str(r["http_requests"]),
+        ]
+        for r in results
+    ]
+    widths = [max(len(row[i]) for row in [headers] + rows) for i in range(len(headers))]
+    lines = [
+        "  ".join(
+            cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i])
+            for i, cell in enumerate(row)
+        )
+        for row in [headers] + rows
+    ]
+    lines.insert(1, "-" * len(lines[0]))
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the processing stages against in-memory data"
+    )
+    parser.add_argument(
+        "--scales",
+        type=str,
+        default="1,10,100",
+        help="Comma-separated multiples of today's data volume (default: 1,10,100)",
+    )
+    parser.add_argument(
+        "--stages",
+        type=str,
+        help=f"Comma-separated stages to run (default: all). Available: {', '.join(STAGE_NAMES)}",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for synthetic data")
+    parser.add_argument(
+        "--fixtures",
+        type=str,
+        help="Directory of recorded FEC responses to replay, in addition to the synthetic ones",
+    )
+    parser.add_argument(
+        "--snapshot",
+        type=str,
+        help="JSON file of Firestore contents ({collection: {doc_id: document}}) to use instead of synthetic data",
+    )
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    parser.add_argument(
+        "--no-trace-memory",
+        action="store_true",
+        help="Don't track peak memory (tracemalloc slows down allocation-heavy stages)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault("FEC_API_KEY", "benchmark")
+
+    stage_names = STAGE_NAMES
+    if args.stages:
+        stage_names = [s.strip() for s in args.stages.split(",")]
+        unknown = set(stage_names) - set(STAGE_NAMES)
+        if unknown:
+            print(f"Unknown stages: {', '.join(sorted(unknown))}")
+            return 1
+
+    recorded = load_fixtures(args.fixtures) if args.fixtures else []
+
+    results = []
+    if args.snapshot:
+        with open(args.snapshot) as f:
+            collections = json.load(f)
+        print(f"\nSnapshot {args.snapshot}")
+        results.extend(
+            run_stages(collections, recorded, stage_names, not args.no_trace_memory)
+        )
+    else:
+        for scale in [int(s) for s in args.scales.split(",")]:
+            print(f"\nScale {scale}x: generating data...")
+            start = time.perf_counter()
+            collections, fixtures = synthetic.generate(scale, args.seed)
+            print(f"  Generated in {time.perf_counter() - start:.1f}s")
+            results.extend(
+                run_stages(
+                    collections,
+                    fixtures + recorded,
+                    stage_names,
+                    not args.no_trace_memory,
+                    scale,
+                )
+            )
+            del collections
+
+    print()
+    print(format_results(results))
+    print()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
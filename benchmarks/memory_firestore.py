@@ -0,0 +1,253 @@
+"""
+In-memory stand-in for the subset of the Firestore client API used by the pipeline.
+
+Documents are stored as plain dicts. Like the real client, writes store a copy of the data and reads return a fresh
+copy, so processing code that mutates what it reads doesn't corrupt the store.
+"""
+
+import copy
+import re
+
+from google.cloud.firestore import DELETE_FIELD
+
+SIMPLE_FIELD_NAME = re.compile(r"^[_a-zA-Z][_a-zA-Z0-9]*$")
+
+
+def field_path(*field_names):
+    """Build a field path string, quoting components that aren't simple identifiers (as the Firestore client does)."""
+    return ".".join(
+        name if SIMPLE_FIELD_NAME.match(name) else "`{}`".format(name.replace("`", "\\`"))
+        for name in field_names
+    )
+
+
+def split_field_path(path):
+    """Split a field path string built by field_path() back into its components."""
+    parts = []
+    current = ""
+    quoted = False
+    i = 0
+    while i < len(path):
+        char = path[i]
+        if char == "\\" and quoted and i + 1 < len(path):
+            current += path[i + 1]
+            i += 2
+            continue
+        if char == "`":
+            quoted = not quoted
+        elif char == "." and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+        i += 1
+    parts.append(current)
+    return parts
+
+
+def merge_into(target, data):
+    """Recursively merge data into target, as a Firestore set(..., merge=True) does."""
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_into(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+class NotFound(Exception):
+    """Raised when updating a document that doesn't exist, like google.api_core.exceptions.NotFound."""
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        value = self._data
+        for part in split_field_path(field):
+            value = value[part]
+        return copy.deepcopy(value)
+
+
+class DocumentReference:
+    def __init__(self, client, collection_path, doc_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    def _documents(self):
+        return self._client._store.setdefault(self._collection_path, {})
+
+    def collection(self, name):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, *args, **kwargs):
+        return DocumentSnapshot(self, self._documents().get(self.id))
+
+    def set(self, document_data, merge=False):
+        documents = self._documents()
+        if merge and self.id in documents:
+            merge_into(documents[self.id], document_data)
+        else:
+            documents[self.id] = copy.deepcopy(document_data)
+
+    def create(self, document_data):
+        if self.id in self._documents():
+            raise ValueError(f"Document already exists: {self.path}")
+        self.set(document_data)
+
+    def update(self, field_updates):
+        documents = self._documents()
+        if self.id not in documents:
+            raise NotFound(f"No document to update: {self.path}")
+        document = documents[self.id]
+        for path, value in field_updates.items():
+            parts = split_field_path(path)
+            target = document
+            for part in parts[:-1]:
+                if not isinstance(target.get(part), dict):
+                    target[part] = {}
+                target = target[part]
+            if value is DELETE_FIELD:
+                target.pop(parts[-1], None)
+            else:
+                target[parts[-1]] = copy.deepcopy(value)
+
+    def delete(self):
+        self._documents().pop(self.id, None)
+
+
+class Query:
+    def __init__(self, collection, filters=None, limit_count=None):
+        self._collection = collection
+        self._filters = filters or []
+        self._limit = limit_count
+
+    OPERATORS = {
+        "==": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+        "<": lambda a, b: a < b,
+        "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b,
+        ">=": lambda a, b: a >= b,
+        "in": lambda a, b: a in b,
+        "array_contains": lambda a, b: b in (a or []),
+    }
+
+    def where(self, field, op, value):
+        return Query(
+            self._collection, self._filters + [(field, op, value)], self._limit
+        )
+
+    def limit(self, count):
+        return Query(self._collection, self._filters, count)
+
+    def _matches(self, data):
+        for field, op, value in self._filters:
+            current = data
+            for part in split_field_path(field):
+                if not isinstance(current, dict) or part not in current:
+                    return False
+                current = current[part]
+            try:
+                if not self.OPERATORS[op](current, value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def stream(self, *args, **kwargs):
+        count = 0
+        for doc_id, data in list(self._collection._documents().items()):
+            if self._limit is not None and count >= self._limit:
+                return
+            if self._matches(data):
+                count += 1
+                yield DocumentSnapshot(self._collection.document(doc_id), data)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.split("/")[-1]
+        super().__init__(self)
+
+    def _documents(self):
+        return self._client._store.setdefault(self.path, {})
+
+    def document(self, doc_id):
+        return DocumentReference(self._client, self.path, doc_id)
+
+
+class WriteBatch:
+    def __init__(self):
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(lambda: reference.set(document_data, merge=merge))
+
+    def update(self, reference, field_updates):
+        self._writes.append(lambda: reference.update(field_updates))
+
+    def create(self, reference, document_data):
+        self._writes.append(lambda: reference.create(document_data))
+
+    def delete(self, reference):
+        self._writes.append(reference.delete)
+
+    def commit(self):
+        for write in self._writes:
+            write()
+        self._writes = []
+
+
+class InMemoryClient:
+    """Drop-in replacement for google.cloud.firestore.Client, holding all documents in memory."""
+
+    def __init__(self, data=None):
+        """
+        Args:
+            data: Optional initial contents, as {collection_path: {doc_id: document}}
+        """
+        self._store = {}
+        for collection_path, documents in (data or {}).items():
+            for doc_id, document in documents.items():
+                self.collection(collection_path).document(doc_id).set(document)
+
+    def collection(self, path):
+        return CollectionReference(self, path)
+
+    def document(self, path):
+        collection_path, doc_id = path.rsplit("/", 1)
+        return DocumentReference(self, collection_path, doc_id)
+
+    def get_all(self, references, *args, **kwargs):
+        for reference in references:
+            yield reference.get()
+
+    def batch(self):
+        return WriteBatch()
+
+    @staticmethod
+    def field_path(*field_names):
+        return field_path(*field_names)
+
+    def dump(self):
+        """Get a copy of everything in the store, as {collection_path: {doc_id: document}}."""
+        return copy.deepcopy(self._store)
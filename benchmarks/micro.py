@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the pure-Python functions the processing stages call for every record.
+
+Inputs come from a synthetic dataset (see benchmarks/synthetic.py) at 1x scale: the same records these functions see in
+a pipeline run. Each benchmark is timed over several rounds and reported as the best time per input record, which is
+the most stable measure between runs on the same machine.
+
+Baselines are stored in benchmarks/baselines/micro.json. Save one before optimizing a function, then compare against
+it afterwards; the comparison exits with status 1 if any benchmark is slower than the baseline by more than the
+threshold, so it can gate changes to these paths.
+
+Usage:
+    python -m benchmarks.micro                                  # Run every benchmark
+    python -m benchmarks.micro --filter compare_names           # Run benchmarks whose names contain a string
+    python -m benchmarks.micro --save                           # Store the results as the baseline
+    python -m benchmarks.micro --compare --threshold 0.1        # Flag benchmarks more than 10% slower than baseline
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import process_committee_contributions
+import process_individual_contributions
+import recipients
+import utils
+from fetch_committee_contributions import CONTRIBUTION_FIELDS
+from process_company_contributions import process_company_contributions
+
+from . import synthetic
+from .fec_replay import ReplaySession
+from .harness import BenchmarkDatabase
+from .memory_firestore import InMemoryClient
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_ROUNDS = 7
+# Each round runs the benchmark enough times to take at least this long, so timer resolution doesn't matter
+MIN_ROUND_SECONDS = 0.05
+
+
+@dataclass
+class Case:
+    """
+    A prepared benchmark.
+
+    Attributes:
+        run: Function to time. It receives the value returned by prepare, or None.
+        count: Number of input records run() processes, to report time per record
+        prepare: Function called before each run() without being timed, for benchmarks of functions that mutate their
+            inputs
+    """
+
+    run: Callable[[Any], Any]
+    count: int
+    prepare: Optional[Callable[[], Any]] = None
+
+
+class Inputs:
+    """Representative inputs for the benchmarks, built once from a synthetic dataset."""
+
+    def __init__(self, seed=0):
+        self.generator = synthetic.Generator(1, seed)
+        self.collections, fixtures = self.generator.generate()
+        self.client = InMemoryClient(self.collections)
+        self.db = BenchmarkDatabase(self.client)
+        self.db.get_constants()
+        self.session = ReplaySession(fixtures)
+        self._company_groups = None
+
+    @property
+    def committee_transactions(self):
+        return [
+            transaction
+            for doc in self.collections["rawContributions"].values()
+            for transaction in doc["transactions"]
+        ]
+
+    @property
+    def schedule_a_results(self):
+        """Committee receipts as the FEC API returns them, before the fetch stage picks the stored fields."""
+        committees = {}
+        results = []
+        for committee_id, transactions in self.generator.committee_receipts.items():
+            committee = committees.setdefault(committee_id, self.generator.fec_committee(committee_id))
+            results.extend(self.generator.fec_schedule_a(t, committee) for t in transactions)
+        return results
+
+    @property
+    def individual_contribution_groups(self):
+        """Each individual's contributions grouped by date, as process_individual_contributions groups them."""
+        groups = []
+        for doc in self.collections["rawIndividualContributions"].values():
+            by_date = {}
+            for contrib in doc["contributions"]:
+                by_date.setdefault(contrib["contribution_receipt_date"], []).append(contrib)
+            groups.extend(by_date.values())
+        return groups
+
+    @property
+    def expenditures_with_races(self):
+        """Expenditures paired with the subraces of the race they're in, as summarize_races looks them up."""
+        pairs = []
+        for exp in self.collections["expenditures"]["all"].values():
+            race_id = "S" if exp["candidate_office"] == "S" else "H-" + exp["candidate_office_district"]
+            race = self.collections["raceDetails"][exp["candidate_office_state"]][race_id]
+            pairs.append((exp, race["races"]))
+        return pairs
+
+    @property
+    def company_groups(self):
+        """Contribution groups stored in the companies collection by process_company_contributions."""
+        if self._company_groups is None:
+            process_company_contributions(self.db, self.session)
+            self._company_groups = [
+                group
+                for doc in self.client.collection("companies").stream()
+                for group in doc.to_dict().get("contributions", [])
+            ]
+        return self._company_groups
+
+
+def bench_pick(inputs):
+    results = inputs.schedule_a_results
+
+    def run(_):
+        for result in results:
+            utils.pick(result, CONTRIBUTION_FIELDS)
+
+    return Case(run, len(results))
+
+
+def bench_compare_names(inputs, allow_levenstein=False):
+    pairs = [
+        (exp["candidate_last_name"], candidate["name"])
+        for exp, races in inputs.expenditures_with_races
+        for race in races
+        for candidate in race["candidates"]
+    ]
+
+    def run(_):
+        for name_portion, name in pairs:
+            utils.compare_names(name_portion, name, allow_levenstein)
+
+    return Case(run, len(pairs))
+
+
+def bench_compare_names_lastfirst(inputs):
+    # Contributor names compared against every tracked individual, as process_contribution links groups
+    names = sorted({t["contributor_name"] for t in inputs.committee_transactions if "," in t["contributor_name"]})
+    individuals = [individual["name"] for individual in inputs.db.individuals.values()]
+    pairs = [(individual, name) for name in names[:100] for individual in individuals]
+
+    def run(_):
+        for name, last_first in pairs:
+            utils.compare_names_lastfirst(name, last_first)
+
+    return Case(run, len(pairs))
+
+
+def bench_get_expenditure_race_type(inputs):
+    pairs = inputs.expenditures_with_races
+
+    def prepare():
+        # Matching an efiled expenditure to a subrace sets its subrace, so each run needs fresh copies
+        return [({k: v for k, v in exp.items() if k != "subrace"}, races) for exp, races in pairs]
+
+    def run(prepared):
+        for exp, races in prepared:
+            utils.get_expenditure_race_type(exp, races)
+
+    return Case(run, len(pairs), prepare)
+
+
+def bench_is_redacted(inputs):
+    transactions = inputs.committee_transactions
+    occupation_classifier = inputs.db.occupation_classifier
+
+    def run(_):
+        for transaction in transactions:
+            process_committee_contributions.is_redacted(transaction, occupation_classifier)
+
+    return Case(run, len(transactions))
+
+
+def bench_process_contribution(inputs):
+    transactions = inputs.committee_transactions
+    db = inputs.db
+
+    def prepare():
+        donor_map = {
+            "contributions_count": 0,
+            "groups": {},
+            "by_date": [],
+            "total_contributed": 0,
+            "total_transferred": 0,
+        }
+        return [dict(t) for t in transactions], donor_map
+
+    def run(prepared):
+        contribs, donor_map = prepared
+        for contrib in contribs:
+            process_committee_contributions.process_contribution(contrib, db, donor_map)
+
+    return Case(run, len(transactions), prepare)
+
+
+def bench_dedupe_by_ids(inputs):
+    groups = [group for group in inputs.individual_contribution_groups if len(group) > 1]
+
+    def run(_):
+        for group in groups:
+            process_individual_contributions.dedupe_by_ids(group)
+
+    return Case(run, sum(len(group) for group in groups))
+
+
+def bench_process_contribution_group(inputs):
+    groups = inputs.individual_contribution_groups
+
+    def run(_):
+        for group in groups:
+            process_individual_contributions.process_contribution_group(group)
+
+    return Case(run, sum(len(group) for group in groups))
+
+
+def bench_group_contributions(inputs):
+    groups = inputs.company_groups
+    all_recipient_committees = inputs.collections["allRecipients"]["recipients"]
+    committee_name_to_type = {
+        v["committee_name"]: v.get("committee_type_full")
+        for v in all_recipient_committees.values()
+        if v.get("committee_name")
+    }
+    committees = inputs.db.committees
+
+    def run(_):
+        for group in groups:
+            recipients.group_contributions(
+                group["contributions"], {}, committees, all_recipient_committees, committee_name_to_type
+            )
+
+    return Case(run, sum(len(group["contributions"]) for group in groups))
+
+
+BENCHMARKS = {
+    "utils.pick": bench_pick,
+    "utils.compare_names": bench_compare_names,
+    "utils.compare_names (levenshtein)": lambda inputs: bench_compare_names(inputs, allow_levenstein=True),
+    "utils.compare_names_lastfirst": bench_compare_names_lastfirst,
+    "utils.get_expenditure_race_type": bench_get_expenditure_race_type,
+    "process_committee_contributions.is_redacted": bench_is_redacted,
+    "process_committee_contributions.process_contribution": bench_process_contribution,
+    "process_individual_contributions.dedupe_by_ids": bench_dedupe_by_ids,
+    "process_individual_contributions.process_contribution_group": bench_process_contribution_group,
+    "recipients.group_contributions": bench_group_contributions,
+}
+
+
+def time_case(case, rounds=DEFAULT_ROUNDS):
+    """
+    Time a benchmark case.
+
+    Returns:
+        {"ns_per_item", "median_ns_per_item", "items", "loops"}: best and median time per input record across rounds
+    """
+
+    def timed(loops):
+        prepared = [case.prepare() if case.prepare else None for _ in range(loops)]
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for value in prepared:
+                case.run(value)
+            return time.perf_counter() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    # Calibrate the number of loops per round
+    loops = 1
+    while True:
+        elapsed = timed(loops)
+        if elapsed >= MIN_ROUND_SECONDS or loops >= 1000:
+            break
+        loops = max(loops * 2, int(loops * MIN_ROUND_SECONDS / max(elapsed, 1e-9)))
+    per_item = [timed(loops) / loops / case.count * 1e9 for _ in range(rounds)]
+    return {
+        "ns_per_item": round(min(per_item), 1),
+        "median_ns_per_item": round(statistics.median(per_item), 1),
+        "items": case.count,
+        "loops": loops,
+    }
+
+
+def run_benchmarks(names, rounds=DEFAULT_ROUNDS, seed=0):
+    inputs = Inputs(seed)
+    results = {}
+    for name in names:
+        case = BENCHMARKS[name](inputs)
+        results[name] = time_case(case, rounds)
+        print(f"  {name}: {results[name]['ns_per_item']:.0f} ns/item ({case.count} items)")
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(baseline, results, threshold):
+    """
+    Compare results against a baseline.
+
+    Returns:
+        (rows, regressions): Table rows of (name, baseline ns, current ns, change, status), and the names of benchmarks
+        slower than the baseline by more than the threshold
+    """
+    rows = []
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            rows.append((name, "-", f"{result['ns_per_item']:.0f}", "-", "new"))
+            continue
+        change = result["ns_per_item"] / before["ns_per_item"] - 1
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append(
+            (
+                name,
+                f"{before['ns_per_item']:.0f}",
+                f"{result['ns_per_item']:.0f}",
+                f"{change:+.1%}",
+                status,
+            )
+        )
+    return rows, regressions
+
+
+def format_table(headers, rows):
+    widths = [max(len(str(row[i])) for row in [headers] + rows) for i in range(len(headers))]
+    lines = [
+        "  ".join(
+            str(cell).ljust(widths[i]) if i == 0 else str(cell).rjust(widths[i])
+            for i, cell in enumerate(row)
+        )
+        for row in [headers] + rows
+    ]
+    lines.insert(1, "-" * len(lines[0]))
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark the per-record functions of the processing stages"
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        help=f"Only run benchmarks whose names contain this string. Available: {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=DEFAULT_ROUNDS, help=f"Timed rounds per benchmark (default: {DEFAULT_ROUNDS})"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for synthetic inputs")
+    parser.add_argument(
+        "--baseline", type=str, default=BASELINE_PATH, help="Baseline file (default: benchmarks/baselines/micro.json)"
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="Store the results in the baseline file, replacing the saved results for the benchmarks that ran",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Compare the results against the baseline, exiting with status 1 if any benchmark regressed",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Slowdown relative to the baseline that counts as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault("FEC_API_KEY", "benchmark")
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+    if not names:
+        print(f"No benchmarks match {args.filter}")
+        return 1
+
+    print("Running micro-benchmarks...")
+    results = run_benchmarks(names, args.rounds, args.seed)
+    print()
+    print(
+        format_table(
+            ["Benchmark", "ns/item", "Median ns/item", "Items"],
+            [
+                (name, f"{r['ns_per_item']:.0f}", f"{r['median_ns_per_item']:.0f}", str(r["items"]))
+                for name, r in results.items()
+            ],
+        )
+    )
+    print()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    status = 0
+    if args.compare:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"No baseline at {args.baseline}; run with --save to create one")
+            return 1
+        if baseline.get("environment") != environment():
+            print(
+                "Warning: the baseline was recorded in a different environment ({}), so timings may not be "
+                "comparable".format(", ".join(f"{k} {v}" for k, v in baseline.get("environment", {}).items()))
+            )
+        rows, regressions = compare(baseline["results"], results, args.threshold)
+        print(format_table(["Benchmark", "Baseline ns", "Current ns", "Change", "Status"], rows))
+        print()
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            status = 1
+        else:
+            print(f"No regressions over {args.threshold:.0%}")
+
+    if args.save:
+        baseline = load_baseline(args.baseline) or {}
+        save_baseline(args.baseline, {**baseline.get("results", {}), **results})
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
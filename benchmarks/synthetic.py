@@ -0,0 +1,1190 @@
+"""
+Synthetic Firestore dataset and FEC fixtures for benchmarking the processing stages.
+
+generate(scale) builds the constants, raw collections, and race data the processing stages read, along with the FEC
+responses they request. The number of tracked committees, companies, individuals and races stays fixed, while the
+number of transactions per entity grows with the scale, as it does over an election cycle.
+
+The data mimics the quirks of real filings that the processing stages have to handle:
+- Most receipts are small donations from repeat donors, which are rolled up by contributor
+- SA17 receipts are itemized as SA17.x.0, SA17.x.1, ... children of a parent transaction
+- Earmarked contributions are reported by both the conduit and the recipient, with EARMARKED memos
+- Some transactions are reported again in amended filings, with a longer amendment chain
+- Recent transactions have only been efiled, and some processed transactions also turn up in efilings
+- Outside spending concentrates on a few races, and spans primaries, runoffs and generals
+
+generate_fec_dataset(scale) builds the same kind of entities as the FEC API would return them, for the FEC API
+simulator (see benchmarks/fec_simulator.py) to serve to the fetch stages.
+
+Usage:
+    python -m benchmarks.synthetic --scale 10 --output runs/synthetic-10x.json   # For harness --snapshot
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+from datetime import date, timedelta
+
+from company_spending import CONTRIBUTION_FIELDS as SCHEDULE_A_FIELDS
+from fetch_committee_contributions import CONTRIBUTION_FIELDS
+from states import SINGLE_MEMBER_STATES
+from utils import get_expenditure_race_type, pick
+
+# Transactions per entity at 1x scale
+BASE_COMMITTEE_TRANSACTIONS = 500
+BASE_INDIVIDUAL_CONTRIBUTIONS = 30
+BASE_COMPANY_CONTRIBUTIONS = 60
+BASE_EXPENDITURES = 2000
+BASE_DISBURSEMENTS = 50
+
+COMMITTEE_COUNT = 8
+COMPANY_COUNT = 30
+INDIVIDUAL_COUNT = 60
+PAC_RECIPIENT_COUNT = 20
+CONDUIT_COUNT = 3
+RACE_STATES = ["AZ", "CA", "CO", "GA", "IL", "MI", "NC", "NV", "NY", "PA", "TX", "WI"]
+RUNOFF_STATES = {"GA", "NC", "TX"}
+HOUSE_DISTRICTS_PER_STATE = 3
+MAX_PRIMARY_CANDIDATES = 5
+
+# Shares of transactions with each of the quirks of real filings
+TRANSFER_SHARE = 0.02  # Transfers from other committees (line 12)
+ORG_SHARE = 0.04  # Contributions from companies
+MEMO_CHILD_SHARE = 0.03  # SA17 receipts itemized as SA17.x.0 children
+EARMARKED_SHARE = 0.2  # Contributions made through a conduit
+AMENDED_SHARE = 0.05  # Transactions reported again in an amended filing
+EFILED_DUPLICATE_SHARE = 0.08  # Processed transactions that also turn up in efilings
+SPLIT_EXPENDITURE_SHARE = 0.1  # Ad buys paid for in several expenditures on the same day
+MEMOED_SUBTOTAL_SHARE = 0.02  # Memo entries itemizing an expenditure reported elsewhere
+WITHDRAWN_SHARE = 0.15  # Candidates who withdrew before their primary
+
+# Shares of committee donors who give small (rollup-sized), mid-sized, and large amounts
+SMALL_DONOR_SHARE = 0.8
+MID_DONOR_SHARE = 0.17
+SMALL_AMOUNTS = [5.0, 10.0, 15.0, 19.0, 25.0, 27.0, 50.0, 100.0, 250.0, 500.0]
+MID_AMOUNTS = [1000.0, 2500.0, 3300.0, 3500.0, 5000.0, 6600.0]
+
+FIRST_NAMES = [
+    "ALEX", "BRIAN", "CAROL", "DANA", "ELENA", "FRANK", "GRACE", "HENRY", "IRENE", "JAMES", "KAREN", "LUIS",
+    "MARIA", "NATHAN", "OLIVIA", "PETER", "QUINN", "RACHEL", "SAMUEL", "TERESA", "VICTOR", "WENDY",
+]
+LAST_NAME_PARTS = ["AB", "BEL", "COR", "DRA", "EL", "FEN", "GAR", "HOL", "IVER", "JAN", "KEL", "LOR", "MAR", "NOR"]
+LAST_NAME_SUFFIXES = ["SON", "TON", "MAN", "BERG", "WOOD", "FIELD", "LEY", "ER"]
+OCCUPATIONS = [
+    "CEO", "FOUNDER", "PRESIDENT", "CHIEF EXECUTIVE OFFICER", "INVESTOR", "ENGINEER", "ATTORNEY", "TEACHER",
+    "RETIRED", "SOFTWARE DEVELOPER", "MANAGER", "PHYSICIAN", "NOT EMPLOYED", "", "OWNER", "PARTNER",
+]
+EXECUTIVE_OCCUPATIONS = ["CEO", "FOUNDER", "CO-FOUNDER", "PRESIDENT", "INVESTOR", "MANAGING PARTNER"]
+OTHER_EMPLOYERS = ["SELF-EMPLOYED", "RETIRED", "NONE", "ACME CORP", "GLOBEX", "INITECH", "N/A", ""]
+INDIVIDUAL_EMPLOYERS = ["SELF-EMPLOYED", "SELF", "RETIRED", "NONE", "NOT EMPLOYED"]
+PAYEES = ["SYNTHETIC MEDIA LLC", "SYNTHETIC DIGITAL", "MAILHOUSE INC", "BROADCAST PARTNERS", "FIELD WORKS LLC"]
+EXPENDITURE_DESCRIPTIONS = ["DIGITAL ADVERTISING", "TV ADVERTISING", "MAILERS", "CANVASSING", "RADIO ADVERTISING"]
+
+# Committee fields nested in schedule_a results
+SCHEDULE_A_COMMITTEE_FIELDS = [
+    "name",
+    "candidate_ids",
+    "committee_type",
+    "committee_type_full",
+    "designation",
+    "designation_full",
+    "party",
+    "state",
+]
+
+CYCLE_START = date(2025, 1, 1)
+CYCLE_DAYS = 640
+# Transactions dated in the last days of the synthetic cycle have been efiled, but not yet processed by the FEC
+EFILE_CUTOFF = (CYCLE_START + timedelta(days=CYCLE_DAYS - 30)).isoformat()
+# Processed transactions dated after this can also turn up in efilings
+EFILED_DUPLICATE_START = (CYCLE_START + timedelta(days=CYCLE_DAYS - 90)).isoformat()
+PRIMARY_DATE = "2026-06-02"
+RUNOFF_DATE = "2026-08-25"
+GENERAL_DATE = "2026-11-03"
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights for random.choices, so that the first few of count items are picked far more than the rest."""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def efiled_copy(record):
+    """Copy a schedule_a record as it appears in efilings, where contributor fields are lowercase."""
+    efiled = {
+        k: v.lower() if k.startswith("contributor_") and isinstance(v, str) else v
+        for k, v in record.items()
+    }
+    # Organization names also have trailing commas
+    if record.get("entity_type") != "IND" and efiled.get("contributor_name") and not efiled[
+        "contributor_name"
+    ].endswith(","):
+        efiled["contributor_name"] += ","
+    return efiled
+
+
+class Generator:
+    def __init__(self, scale=1, seed=0):
+        self.scale = scale
+        self.random = random.Random(seed)
+        self.transaction_counter = 0
+        self.sub_id_counter = 0
+        self.filing_counter = 1_800_000
+        self.used_last_names = set()
+        self.last_names = []
+
+    def last_name(self):
+        while True:
+            name = (
+                self.random.choice(LAST_NAME_PARTS)
+                + self.random.choice(LAST_NAME_PARTS)
+                + self.random.choice(LAST_NAME_SUFFIXES)
+            )
+            if name not in self.used_last_names:
+                self.used_last_names.add(name)
+                self.last_names.append(name)
+                return name
+
+    def person(self):
+        return self.random.choice(FIRST_NAMES), self.last_name()
+
+    def date(self):
+        return (CYCLE_START + timedelta(days=self.random.randrange(CYCLE_DAYS))).isoformat()
+
+    def transaction_id(self, prefix="SA11AI"):
+        self.transaction_counter += 1
+        return f"{prefix}.{self.transaction_counter}"
+
+    def sub_id(self):
+        self.sub_id_counter += 1
+        return str(4_000_000_000_000_000 + self.sub_id_counter)
+
+    def filing_id(self):
+        self.filing_counter += self.random.randrange(1, 50)
+        return self.filing_counter
+
+    def amount(self, tier):
+        if tier == "small":
+            return self.random.choice(SMALL_AMOUNTS)
+        if tier == "mid":
+            if self.random.random() < 0.6:
+                return self.random.choice(MID_AMOUNTS)
+            return float(self.random.randrange(1000, 10000, 100))
+        return float(self.random.randrange(10000, 5000000, 1000))
+
+    def donor_tier(self):
+        roll = self.random.random()
+        if roll < SMALL_DONOR_SHARE:
+            return "small"
+        if roll < SMALL_DONOR_SHARE + MID_DONOR_SHARE:
+            return "mid"
+        return "large"
+
+    def build_constants(self):
+        self.committees = {}
+        for i in range(COMMITTEE_COUNT):
+            committee_id = f"C9{i:07d}"
+            self.committees[committee_id] = {
+                "id": committee_id,
+                "name": f"SYNTHETIC PAC {i}",
+            }
+
+        self.companies = {}
+        for i in range(COMPANY_COUNT):
+            name = f"{self.last_name()} LABS"
+            company_id = name.lower().replace(" ", "-")
+            self.companies[company_id] = {
+                "id": company_id,
+                "name": name,
+                "aliases": [f"{name} INC", f"{name}, INC."],
+            }
+        company_list = list(self.companies.values())
+
+        self.individuals = {}
+        for i in range(INDIVIDUAL_COUNT):
+            first, last = self.person()
+            individual_id = f"{first}-{last}".lower()
+            individual = {"id": individual_id, "name": f"{first.title()} {last.title()}"}
+            if self.random.random() < 0.6:
+                individual["company"] = [self.random.choice(company_list)["name"]]
+            self.individuals[individual_id] = individual
+
+        return {
+            "committees": self.committees,
+            "companyAliases": {
+                alias: company["name"]
+                for company in company_list
+                for alias in company["aliases"]
+            },
+            "candidateAliases": {},
+            "individualEmployers": {"individualEmployers": INDIVIDUAL_EMPLOYERS},
+            "occupationAllowlist": {
+                "contains": ["CEO", "FOUNDER", "PRESIDENT", "CHIEF", "INVESTOR", "PARTNER"],
+                "equals": ["OWNER", "EXECUTIVE"],
+            },
+            "duplicateContributions": {},
+            "candidates": {},
+            "allCommittees": {
+                committee_id: f"Synthetic committee {committee_id}"
+                for committee_id in self.committees
+            },
+            "ads": {},
+            "companies": self.companies,
+            "individuals": self.individuals,
+            "committeeAffiliations": {},
+            "oppositionSpending": {},
+            "nonCandidateCommittees": {"ids": []},
+        }
+
+    def candidate(self, state, race_id, district, party):
+        first, last = self.person()
+        candidate = {
+            "name": f"{first.title()} {last.title()}",
+            "first_name": first,
+            "last_name": last,
+            "candidate_id": f"{race_id[0]}6{state}{len(self.candidates):05d}",
+            "committee_id": f"C8{len(self.candidates):07d}",
+            "party": party,
+            "state": state,
+            "office": race_id[0],
+            "district": district,
+            "race_id": race_id,
+        }
+        self.candidates.append(candidate)
+        return candidate
+
+    def race(self, state, race_id, district):
+        """
+        Build the raceDetails entry for one race, with subraces in reverse chronological order: the upcoming general,
+        then the primary runoffs and primaries, which have already happened.
+        """
+        primaries = []
+        runoffs = []
+        nominees = []
+        withdrew = {}
+        for party in ("DEM", "REP"):
+            letter = party[0]
+            count = self.random.randint(1, MAX_PRIMARY_CANDIDATES)
+            running = []
+            for _ in range(count):
+                candidate = self.candidate(state, race_id, district, party)
+                if running and self.random.random() < WITHDRAWN_SHARE:
+                    withdrew[candidate["name"]] = {
+                        "name": candidate["name"],
+                        "party": letter,
+                        "withdrew_race": {"type": "primary", "party": letter},
+                    }
+                else:
+                    running.append(candidate)
+            if state in RUNOFF_STATES and len(running) > 2:
+                advancing = self.random.sample(running, 2)
+                nominee = self.random.choice(advancing)
+                runoffs.append(
+                    {
+                        "type": "primary_runoff",
+                        "party": letter,
+                        "date": RUNOFF_DATE,
+                        "candidates": [
+                            {"name": c["name"], "party": letter, "won": c is nominee}
+                            for c in advancing
+                        ],
+                    }
+                )
+            else:
+                advancing = [self.random.choice(running)]
+                nominee = advancing[0]
+            nominees.append(nominee)
+            primaries.append(
+                {
+                    "type": "primary",
+                    "party": letter,
+                    "date": PRIMARY_DATE,
+                    "candidates": [
+                        {"name": c["name"], "party": letter, "won": c in advancing}
+                        for c in running
+                    ],
+                }
+            )
+        general = {
+            "type": "general",
+            "date": GENERAL_DATE,
+            "candidates": [{"name": c["name"], "party": c["party"][0]} for c in nominees],
+        }
+        race = {"year": 2026, "races": [general] + runoffs + primaries}
+        if withdrew:
+            race["withdrew"] = withdrew
+        return race
+
+    def build_races(self):
+        """Build raceDetails, along with the candidates and their campaign committees."""
+        self.race_details = {}
+        self.candidates = []
+        for state in RACE_STATES:
+            races = {"S": "00"}
+            for district in range(1, HOUSE_DISTRICTS_PER_STATE + 1):
+                if state in SINGLE_MEMBER_STATES and district > 1:
+                    break
+                races[f"H-{district:02d}"] = f"{district:02d}"
+            self.race_details[state] = {
+                race_id: self.race(state, race_id, district)
+                for race_id, district in races.items()
+            }
+        # Outside spending concentrates on a few candidates in competitive races
+        self.spending_targets = self.random.sample(self.candidates, len(self.candidates))
+        self.spending_weights = zipf_weights(len(self.spending_targets), exponent=0.9)
+
+        self.recipient_committees = {}
+        for candidate in self.candidates:
+            self.recipient_committees[candidate["committee_id"]] = {
+                "committee_id": candidate["committee_id"],
+                "committee_name": f"{candidate['last_name']} FOR {candidate['state']}",
+                "party": candidate["party"],
+                "state": candidate["state"],
+                "designation_full": "Principal campaign committee",
+                "committee_type_full": "House"
+                if candidate["office"] == "H"
+                else "Senate",
+                "candidate_ids": [candidate["candidate_id"]],
+                "sponsor_candidate_ids": None,
+                "candidate_details": {
+                    candidate["candidate_id"]: {
+                        "name": f"{candidate['last_name']}, {candidate['first_name']}",
+                        "party": candidate["party"],
+                        "state": candidate["state"],
+                        "office": candidate["office"],
+                        "district": candidate["district"],
+                        "incumbent_challenge": "C",
+                        "election_years": [2026],
+                        "isRunningThisCycle": True,
+                    }
+                },
+            }
+        self.pac_ids = []
+        for i in range(PAC_RECIPIENT_COUNT):
+            committee_id = f"C7{i:07d}"
+            self.pac_ids.append(committee_id)
+            self.recipient_committees[committee_id] = {
+                "committee_id": committee_id,
+                "committee_name": f"SYNTHETIC RECIPIENT PAC {i}",
+                "party": self.random.choice(["DEM", "REP", None]),
+                "state": self.random.choice(RACE_STATES),
+                "designation_full": "Unauthorized",
+                "committee_type_full": "PAC - Nonqualified",
+                "candidate_ids": [],
+                "sponsor_candidate_ids": None,
+                "candidate_details": {},
+            }
+        self.conduit_ids = []
+        for i in range(CONDUIT_COUNT):
+            committee_id = f"C6{i:07d}"
+            self.conduit_ids.append(committee_id)
+            self.recipient_committees[committee_id] = {
+                "committee_id": committee_id,
+                "committee_name": f"SYNTHETIC VICTORY FUND {i}",
+                "party": self.random.choice(["DEM", "REP"]),
+                "state": self.random.choice(RACE_STATES),
+                "designation_full": "Joint fundraiser",
+                "committee_type_full": "PAC - Nonqualified",
+                "candidate_ids": [],
+                "sponsor_candidate_ids": None,
+                "candidate_details": {},
+            }
+        # Contributions go mostly to a few popular recipients
+        self.recipient_ids = self.random.sample(
+            [c["committee_id"] for c in self.candidates] + self.pac_ids,
+            len(self.candidates) + len(self.pac_ids),
+        )
+        self.recipient_weights = zipf_weights(len(self.recipient_ids), exponent=0.8)
+
+    def recipient(self):
+        return self.random.choices(self.recipient_ids, cum_weights=self.recipient_weights)[0]
+
+    def committee_fields(self, committee_id):
+        committee = self.recipient_committees[committee_id]
+        return {
+            "committee_id": committee_id,
+            "committee_name": committee["committee_name"],
+            "candidate_ids": committee["candidate_ids"],
+            "committee_type": "H",
+            "committee_type_full": committee["committee_type_full"],
+            "designation": "P",
+            "designation_full": committee["designation_full"],
+            "party": committee["party"],
+            "state": committee["state"],
+        }
+
+    def contributor(self):
+        """A contributor, sometimes employed by one of the tracked companies."""
+        first, last = self.random.choice(FIRST_NAMES), self.random.choice(
+            self.last_names
+        )
+        roll = self.random.random()
+        if roll < 0.3:
+            employer = self.random.choice(list(self.companies.values()))["name"]
+        elif roll < 0.4:
+            employer = self.random.choice(INDIVIDUAL_EMPLOYERS)
+        else:
+            employer = self.random.choice(OTHER_EMPLOYERS)
+        return {
+            "contributor_first_name": first,
+            "contributor_middle_name": None,
+            "contributor_last_name": last,
+            "contributor_suffix": None,
+            "contributor_name": f"{last}, {first}",
+            "contributor_occupation": self.random.choice(OCCUPATIONS),
+            "contributor_employer": employer,
+            "entity_type": "IND",
+        }
+
+    def organization(self, name, entity_type="ORG"):
+        return {
+            "contributor_first_name": None,
+            "contributor_middle_name": None,
+            "contributor_last_name": None,
+            "contributor_suffix": None,
+            "contributor_name": name,
+            "contributor_occupation": None,
+            "contributor_employer": None,
+            "entity_type": entity_type,
+        }
+
+    def committee_transaction(self, contributor, amount, receipt_date, line_number="11AI", transaction_id=None):
+        return {
+            **contributor,
+            "contributor_aggregate_ytd": amount,
+            "contribution_receipt_amount": amount,
+            "contribution_receipt_date": receipt_date,
+            "line_number": line_number,
+            "pdf_url": "https://docquery.fec.gov/cgi-bin/fecimg/?000000000",
+            "receipt_type": None,
+            "receipt_type_full": None,
+            "memo_text": None,
+            "transaction_id": transaction_id or self.transaction_id(f"SA{line_number}"),
+            "amendment_chain": [self.filing_id()],
+        }
+
+    def committee_transactions(self, count):
+        """
+        Receipts for a tracked committee, as reported to the FEC (including SA17 parents, which the fetch stage drops).
+
+        Most come from a pool of repeat donors, a few of whom give far more often than the rest, and most of whom give
+        small amounts that are rolled up by contributor.
+        """
+        donors = [(self.contributor(), self.donor_tier()) for _ in range(max(20, count // 4))]
+        donor_weights = zipf_weights(len(donors))
+        aggregates = [0.0] * len(donors)
+        transactions = []
+        while len(transactions) < count:
+            receipt_date = self.date()
+            roll = self.random.random()
+            if roll < TRANSFER_SHARE:
+                pac = self.recipient_committees[self.random.choice(self.pac_ids)]
+                transaction = self.committee_transaction(
+                    self.organization(pac["committee_name"], "COM"),
+                    self.amount("large"),
+                    receipt_date,
+                    line_number="12",
+                )
+                transaction["receipt_type_full"] = "TRANSFER FROM AFFILIATED COMMITTEE"
+                transactions.append(transaction)
+            elif roll < TRANSFER_SHARE + ORG_SHARE:
+                company = self.random.choice(list(self.companies.values()))
+                transactions.append(
+                    self.committee_transaction(
+                        self.organization(self.random.choice([company["name"]] + company["aliases"])),
+                        self.amount(self.random.choice(["mid", "large"])),
+                        receipt_date,
+                    )
+                )
+            elif roll < TRANSFER_SHARE + ORG_SHARE + MEMO_CHILD_SHARE:
+                # A partnership contribution, attributed to the partners in SA17.x.0, SA17.x.1, ... children
+                parent_id = self.transaction_id("SA17")
+                partners = [self.contributor() for _ in range(self.random.randint(1, 3))]
+                amounts = [self.amount("mid") for _ in partners]
+                parent = self.committee_transaction(
+                    self.organization(f"{self.random.choice(self.last_names)} PARTNERS LP"),
+                    sum(amounts),
+                    receipt_date,
+                    line_number="17",
+                    transaction_id=parent_id,
+                )
+                parent["receipt_type_full"] = "IN-KIND CONTRIBUTION"
+                transactions.append(parent)
+                for i, (partner, amount) in enumerate(zip(partners, amounts)):
+                    child = self.committee_transaction(
+                        partner, amount, receipt_date, line_number="17", transaction_id=f"{parent_id}.{i}"
+                    )
+                    child["receipt_type_full"] = "IN-KIND CONTRIBUTION"
+                    transactions.append(child)
+            else:
+                index = self.random.choices(range(len(donors)), cum_weights=donor_weights)[0]
+                contributor, tier = donors[index]
+                amount = self.amount(tier)
+                aggregates[index] += amount
+                transaction = self.committee_transaction(contributor, amount, receipt_date)
+                transaction["contributor_aggregate_ytd"] = aggregates[index]
+                transactions.append(transaction)
+        return transactions
+
+    def schedule_a_contribution(self, contributor, amount=None, committee_id=None, receipt_date=None):
+        committee_id = committee_id or self.recipient()
+        amount = amount or float(self.random.randrange(1000, 50000, 100))
+        return {
+            **{
+                k: v
+                for k, v in contributor.items()
+                if k not in ("contributor_middle_name", "contributor_suffix")
+            },
+            **self.committee_fields(committee_id),
+            "contribution_receipt_amount": amount,
+            "contribution_receipt_date": receipt_date or self.date(),
+            "contributor_aggregate_ytd": amount,
+            "pdf_url": "https://docquery.fec.gov/cgi-bin/fecimg/?000000000",
+            "receipt_type": None,
+            "receipt_type_full": None,
+            "memo_text": None,
+            "transaction_id": self.transaction_id(),
+            "amendment_chain": [self.filing_id()],
+        }
+
+    def earmarked_contributions(self, contributor, amount, receipt_date):
+        """
+        A contribution made through a conduit. Through ActBlue, only the recipient's record is fetched, since
+        contributions to ActBlue itself are skipped. Through a joint fundraiser, both the conduit's record (receipt type
+        15 or 24T, with a memo naming the recipient) and the recipient's record are fetched.
+        """
+        recipient_id = self.random.choice(self.candidates)["committee_id"]
+        recipient = self.schedule_a_contribution(contributor, amount, recipient_id, receipt_date)
+        recipient["receipt_type"] = "15E"
+        recipient["receipt_type_full"] = "EARMARKED CONTRIBUTION"
+        if self.random.random() < 0.5:
+            recipient["memo_text"] = "EARMARKED THROUGH ACTBLUE"
+            return [recipient]
+
+        conduit_id = self.random.choice(self.conduit_ids)
+        recipient["memo_text"] = "EARMARKED THROUGH {}".format(
+            self.recipient_committees[conduit_id]["committee_name"]
+        )
+        conduit = self.schedule_a_contribution(contributor, amount, conduit_id, receipt_date)
+        conduit["receipt_type"] = "15" if self.random.random() < 0.6 else "24T"
+        conduit["memo_text"] = "EARMARKED FOR {} ({})".format(
+            self.recipient_committees[recipient_id]["committee_name"], recipient_id
+        )
+        return [conduit, recipient]
+
+    def individual_contributions(self, contributor, count):
+        """
+        Contributions by a tracked individual, as the fetch stage stores them: processed and efiled records together,
+        without deduplication, so amendments, efiled duplicates, earmarks and SA17 parents are left for processing.
+        """
+        contributions = []
+        while len(contributions) < count:
+            receipt_date = self.date()
+            amount = self.amount(self.random.choice(["mid", "mid", "large"]))
+            if receipt_date >= EFILE_CUTOFF:
+                contribution = self.schedule_a_contribution(contributor, amount, receipt_date=receipt_date)
+                contributions.append({**efiled_copy(contribution), "efiled": True})
+                continue
+
+            roll = self.random.random()
+            if roll < EARMARKED_SHARE:
+                contributions.extend(self.earmarked_contributions(contributor, amount, receipt_date))
+                continue
+            contribution = self.schedule_a_contribution(contributor, amount, receipt_date=receipt_date)
+            contributions.append(contribution)
+            roll -= EARMARKED_SHARE
+            if roll < AMENDED_SHARE:
+                amended = {
+                    **contribution,
+                    "amendment_chain": contribution["amendment_chain"] + [self.filing_id()],
+                }
+                if self.random.random() < 0.3:
+                    amended["contribution_receipt_amount"] = self.amount("mid")
+                contributions.append(amended)
+            elif roll < AMENDED_SHARE + EFILED_DUPLICATE_SHARE:
+                contributions.append({**efiled_copy(contribution), "efiled": True})
+            elif roll < AMENDED_SHARE + EFILED_DUPLICATE_SHARE + MEMO_CHILD_SHARE:
+                contribution["transaction_id"] = self.transaction_id("SA17")
+                contributions.append(
+                    {**contribution, "transaction_id": contribution["transaction_id"] + ".0"}
+                )
+        return contributions
+
+    def company_contributions(self, company, count):
+        """
+        Contributions by a tracked company and its executives, as the fetch stage stores them (without SA17 parents or
+        duplicate transactions). Executives give repeatedly, mostly in amounts small enough to be rolled up.
+        """
+        executives = [
+            {
+                **self.contributor(),
+                "contributor_employer": self.random.choice([company["name"]] + company["aliases"]),
+                "contributor_occupation": self.random.choice(EXECUTIVE_OCCUPATIONS),
+            }
+            for _ in range(max(5, count // 6))
+        ]
+        executive_weights = zipf_weights(len(executives))
+        contributions = []
+        for _ in range(count):
+            receipt_date = self.date()
+            if self.random.random() < 0.1:
+                contribution = self.schedule_a_contribution(
+                    self.organization(company["name"]), self.amount("large"), receipt_date=receipt_date
+                )
+            else:
+                contribution = self.schedule_a_contribution(
+                    self.random.choices(executives, cum_weights=executive_weights)[0],
+                    self.amount(self.random.choice(["mid", "mid", "mid", "mid", "large"])),
+                    receipt_date=receipt_date,
+                )
+                if self.random.random() < MEMO_CHILD_SHARE:
+                    contribution["transaction_id"] = self.transaction_id("SA17") + ".0"
+            if receipt_date >= EFILE_CUTOFF:
+                contribution = {**efiled_copy(contribution), "efiled": True}
+            contributions.append(contribution)
+        return contributions
+
+    def build_raw_collections(self):
+        self.committee_receipts = {}
+        raw_contributions = {}
+        for committee_id in self.committees:
+            transactions = self.committee_transactions(BASE_COMMITTEE_TRANSACTIONS * self.scale)
+            self.committee_receipts[committee_id] = transactions
+            parent_ids = {
+                t["transaction_id"].rsplit(".", 1)[0]
+                for t in transactions
+                if t["transaction_id"].count(".") == 2
+            }
+            stored = []
+            for transaction in transactions:
+                if transaction["transaction_id"] in parent_ids:
+                    continue
+                contribution = pick(transaction, CONTRIBUTION_FIELDS)
+                if transaction["contribution_receipt_date"] >= EFILE_CUTOFF:
+                    contribution["efiled"] = True
+                stored.append(contribution)
+            raw_contributions[committee_id] = {"transactions": stored}
+
+        raw_individual_contributions = {}
+        for individual_id, individual in self.individuals.items():
+            first, last = individual["name"].upper().split(" ")
+            contributor = {
+                **self.contributor(),
+                "contributor_first_name": first,
+                "contributor_last_name": last,
+                "contributor_name": f"{last}, {first}",
+            }
+            associated = [
+                company["id"]
+                for company in self.companies.values()
+                if company["name"] in individual.get("company", [])
+            ]
+            raw_individual_contributions[individual_id] = {
+                "contributions": [
+                    pick(contribution, SCHEDULE_A_FIELDS + ["amendment_chain"])
+                    for contribution in self.individual_contributions(
+                        contributor, BASE_INDIVIDUAL_CONTRIBUTIONS * self.scale
+                    )
+                ],
+                "associatedCompany": associated,
+            }
+
+        raw_company_contributions = {}
+        companies = {}
+        for company_id, company in self.companies.items():
+            raw_company_contributions[company_id] = {
+                "contributions": [
+                    pick(contribution, SCHEDULE_A_FIELDS + ["amendment_chain"])
+                    for contribution in self.company_contributions(
+                        company, BASE_COMPANY_CONTRIBUTIONS * self.scale
+                    )
+                ]
+            }
+            companies[company_id] = {
+                **company,
+                "relatedIndividuals": [
+                    individual
+                    for individual in self.individuals.values()
+                    if company["name"] in individual.get("company", [])
+                ],
+            }
+
+        return {
+            "rawContributions": raw_contributions,
+            "rawIndividualContributions": raw_individual_contributions,
+            "rawCompanyContributions": raw_company_contributions,
+            "companies": companies,
+        }
+
+    def expenditure(self, committee_id, candidate, expenditure_date):
+        """An independent expenditure, as reported on schedule_e."""
+        if expenditure_date < PRIMARY_DATE:
+            election_type = "P2026" if self.random.random() < 0.8 else "G2026"
+        elif candidate["state"] in RUNOFF_STATES and expenditure_date < RUNOFF_DATE:
+            election_type = "R2026" if self.random.random() < 0.5 else "G2026"
+        else:
+            election_type = "G2026"
+        return {
+            "expenditure_amount": float(self.random.randrange(500, 2000000, 100)),
+            "candidate_office_state": candidate["state"],
+            "expenditure_date": expenditure_date,
+            "expenditure_description": self.random.choice(EXPENDITURE_DESCRIPTIONS),
+            "candidate_id": candidate["candidate_id"],
+            "candidate_first_name": candidate["first_name"],
+            "candidate_last_name": candidate["last_name"],
+            "candidate_middle_name": None,
+            "candidate_suffix": None,
+            "candidate_name": f"{candidate['last_name']}, {candidate['first_name']}",
+            "candidate_office": candidate["office"],
+            "candidate_office_district": candidate["district"],
+            "candidate_party": candidate["party"],
+            "category_code": "004",
+            "category_code_full": "Advertising Expenses",
+            "dissemination_date": expenditure_date,
+            "election_type": election_type,
+            "payee_name": self.random.choice(PAYEES),
+            "support_oppose_indicator": "S" if self.random.random() < 0.6 else "O",
+            "transaction_id": self.transaction_id("SE"),
+            "committee_id": committee_id,
+            "memoed_subtotal": False,
+            "amendment_indicator": "N",
+            "amendment_number": 0,
+            "is_notice": True,
+            "pdf_url": "https://docquery.fec.gov/cgi-bin/fecimg/?000000000",
+            "cycle": 2026,
+        }
+
+    def schedule_e(self):
+        """
+        Expenditures by the tracked committees, as reported to the FEC: including the original versions of amended
+        expenditures and memoed subtotals, both of which the fetch stage drops.
+        """
+        committee_ids = list(self.committees)
+        committee_weights = zipf_weights(len(committee_ids), exponent=0.7)
+        expenditures = []
+        while len(expenditures) < BASE_EXPENDITURES * self.scale:
+            committee_id = self.random.choices(committee_ids, cum_weights=committee_weights)[0]
+            candidate = self.random.choices(self.spending_targets, cum_weights=self.spending_weights)[0]
+            expenditure = self.expenditure(committee_id, candidate, self.date())
+            expenditures.append(expenditure)
+            roll = self.random.random()
+            if roll < SPLIT_EXPENDITURE_SHARE:
+                for _ in range(self.random.randint(1, 3)):
+                    expenditures.append(
+                        {
+                            **self.expenditure(committee_id, candidate, expenditure["expenditure_date"]),
+                            "election_type": expenditure["election_type"],
+                            "payee_name": expenditure["payee_name"],
+                            "support_oppose_indicator": expenditure["support_oppose_indicator"],
+                        }
+                    )
+            elif roll < SPLIT_EXPENDITURE_SHARE + AMENDED_SHARE:
+                amended = {
+                    **expenditure,
+                    "amendment_indicator": "A",
+                    "amendment_number": 1,
+                }
+                if self.random.random() < 0.5:
+                    amended["expenditure_amount"] = float(self.random.randrange(500, 2000000, 100))
+                expenditures.append(amended)
+            elif roll < SPLIT_EXPENDITURE_SHARE + AMENDED_SHARE + MEMOED_SUBTOTAL_SHARE:
+                expenditures.append(
+                    {**expenditure, "memoed_subtotal": True, "transaction_id": self.transaction_id("SE")}
+                )
+        return expenditures
+
+    def build_expenditures(self):
+        """Build expenditures/all as update_committee_expenditures stores it, from the latest version of each."""
+        self.expenditures = self.schedule_e()
+        latest = {}
+        for exp in self.expenditures:
+            if exp["memoed_subtotal"]:
+                continue
+            uid = "{}-{}".format(exp["committee_id"], exp["transaction_id"])
+            latest[uid] = exp
+        expenditures = {}
+        for uid, exp in latest.items():
+            stored = {
+                k: v
+                for k, v in exp.items()
+                if k not in ("memoed_subtotal", "amendment_indicator", "amendment_number", "is_notice", "cycle")
+            }
+            if stored["expenditure_date"] >= EFILE_CUTOFF:
+                # Efiled expenditures store the candidate last name in the candidate name field, and have no election
+                # type, so their subrace is determined later from the race dates
+                stored["candidate_name"] = stored["candidate_last_name"]
+                stored["election_type"] = None
+            stored["subrace"] = get_expenditure_race_type(stored)
+            stored["uid"] = uid
+            expenditures[uid] = stored
+        return expenditures
+
+    def build_fixtures(self):
+        """FEC responses requested by summarize_races."""
+        fixtures = []
+        by_race = {}
+        for candidate in self.candidates:
+            by_race.setdefault(
+                (candidate["state"], candidate["race_id"]), []
+            ).append(candidate)
+        for (state, race_id), candidates in by_race.items():
+            params = {"state": state, "office": race_id[0]}
+            if race_id[0] == "H" and state not in SINGLE_MEMBER_STATES:
+                params["district"] = race_id.split("-")[1]
+            fixtures.append(
+                {
+                    "url": "/v1/candidates/search",
+                    "params": params,
+                    "response": {
+                        "results": [
+                            {
+                                "name": f"{c['last_name']}, {c['first_name']}",
+                                "candidate_id": c["candidate_id"],
+                                "party": c["party"],
+                                "incumbent_challenge": "C",
+                            }
+                            for c in candidates
+                        ],
+                        "pagination": {"count": len(candidates), "pages": 1},
+                    },
+                }
+            )
+        fixtures.append(
+            {
+                "url": "/v1/candidates/totals",
+                "params": {},
+                "filter_params": ["candidate_id"],
+                "response": {
+                    "results": [
+                        {
+                            "name": f"{c['last_name']}, {c['first_name']}",
+                            "candidate_id": c["candidate_id"],
+                            "receipts": float(self.random.randrange(10**4, 10**7)),
+                            "disbursements": float(
+                                self.random.randrange(10**4, 10**7)
+                            ),
+                        }
+                        for c in self.candidates
+                    ],
+                    "pagination": {"count": len(self.candidates), "pages": 1},
+                },
+            }
+        )
+        return fixtures
+
+    def generate(self):
+        constants = self.build_constants()
+        self.build_races()
+        collections = {
+            "constants": constants,
+            **self.build_raw_collections(),
+            "expenditures": {"all": self.build_expenditures()},
+            "raceDetails": self.race_details,
+            "allRecipients": {"recipients": self.recipient_committees},
+            "candidates": {
+                c["candidate_id"]: {"candidate_id": c["candidate_id"]}
+                for c in self.candidates[::2]
+            },
+        }
+        return collections, self.build_fixtures()
+
+    def fec_committee(self, committee_id):
+        """A committee as returned by the committee/ and committees/ endpoints."""
+        if committee_id in self.committees:
+            committee = {
+                "name": self.committees[committee_id]["name"],
+                "party": None,
+                "state": "DC",
+                "committee_type": "O",
+                "committee_type_full": "Super PAC (Independent Expenditure-Only)",
+                "designation": "U",
+                "designation_full": "Unauthorized",
+                "candidate_ids": [],
+            }
+        else:
+            recipient = self.recipient_committees[committee_id]
+            committee = {
+                "name": recipient["committee_name"],
+                "party": recipient["party"],
+                "state": recipient["state"],
+                "committee_type": "H" if recipient["candidate_ids"] else "Q",
+                "committee_type_full": recipient["committee_type_full"],
+                "designation": "P" if recipient["candidate_ids"] else "U",
+                "designation_full": recipient["designation_full"],
+                "candidate_ids": recipient["candidate_ids"],
+            }
+        return {
+            "committee_id": committee_id,
+            **committee,
+            "party_full": {"DEM": "DEMOCRATIC PARTY", "REP": "REPUBLICAN PARTY"}.get(
+                committee["party"]
+            ),
+            "party_type": None,
+            "party_type_full": None,
+            "sponsor_candidate_ids": None,
+            "affiliated_committee_name": None,
+            "leadership_pac": None,
+            "organization_type": None,
+            "organization_type_full": None,
+            "cycles": [2024, 2026],
+            "first_f1_date": "2023-01-17",
+            "website": None,
+        }
+
+    def fec_schedule_a(self, transaction, committee):
+        """Convert a raw transaction into a schedule_a result, with the recipient committee nested."""
+        record = {
+            k: v
+            for k, v in transaction.items()
+            if k not in SCHEDULE_A_COMMITTEE_FIELDS
+            and k not in ("committee_id", "committee_name", "amendment_chain", "efiled")
+        }
+        record.update(
+            {
+                "committee_id": committee["committee_id"],
+                "committee": pick(committee, SCHEDULE_A_COMMITTEE_FIELDS),
+                "contributor_city": None,
+                "contributor_state": None,
+                "contributor_zip": None,
+                "line_number": transaction.get("line_number", "11AI"),
+                "memo_text": transaction.get("memo_text"),
+                "filing": {
+                    "amendment_chain": transaction.get(
+                        "amendment_chain", [self.filing_id()]
+                    )
+                },
+                "sub_id": self.sub_id(),
+                "two_year_transaction_period": 2026,
+            }
+        )
+        return record
+
+    def fec_schedule_b(self, committee_id):
+        recipient_id = self.random.choice(list(self.recipient_committees))
+        return {
+            "committee_id": committee_id,
+            "recipient_committee_id": recipient_id,
+            "recipient_name": self.recipient_committees[recipient_id]["committee_name"],
+            "disbursement_amount": float(self.random.randrange(1000, 500000, 500)),
+            "disbursement_date": self.date(),
+            "line_number": "22",
+            "pdf_url": "https://docquery.fec.gov/cgi-bin/fecimg/?000000000",
+            "transaction_id": self.transaction_id("SB22"),
+            "sub_id": self.sub_id(),
+            "two_year_transaction_period": 2026,
+        }
+
+    def fec_totals(self, committee_id, cycle):
+        receipts = float(self.random.randrange(10**5, 10**8))
+        contributions = round(receipts * self.random.uniform(0.5, 1), 2)
+        refunds = round(contributions * self.random.uniform(0, 0.02), 2)
+        return {
+            "committee_id": committee_id,
+            "cycle": cycle,
+            "receipts": receipts,
+            "contributions": contributions,
+            "contribution_refunds": refunds,
+            "net_contributions": round(contributions - refunds, 2),
+            "disbursements": round(receipts * self.random.uniform(0.2, 1), 2),
+            "independent_expenditures": round(receipts * self.random.uniform(0, 0.8), 2)
+            if committee_id in self.committees
+            else 0.0,
+            "last_cash_on_hand_end_period": float(self.random.randrange(0, 10**7)),
+        }
+
+    def fec_candidate(self, candidate):
+        return {
+            "candidate_id": candidate["candidate_id"],
+            "name": f"{candidate['last_name']}, {candidate['first_name']}",
+            "party": candidate["party"],
+            "party_full": "DEMOCRATIC PARTY"
+            if candidate["party"] == "DEM"
+            else "REPUBLICAN PARTY",
+            "state": candidate["state"],
+            "office": candidate["office"],
+            "office_full": "House" if candidate["office"] == "H" else "Senate",
+            "district": candidate["district"],
+            "incumbent_challenge": "C",
+            "incumbent_challenge_full": "Challenger",
+            "election_years": [2026],
+            "cycles": [2026],
+            "candidate_status": "C",
+        }
+
+    def build_fec_dataset(self):
+        """
+        Build the records served by the FEC API simulator, split into processed and efiled records.
+
+        Records dated after EFILE_CUTOFF are only efiled, and some processed records dated after
+        EFILED_DUPLICATE_START are efiled as well.
+        """
+        committees = {
+            committee_id: self.fec_committee(committee_id)
+            for committee_id in list(self.committees) + list(self.recipient_committees)
+        }
+        raw = self.build_raw_collections()
+
+        schedule_a = []
+        schedule_a_efile = []
+        records = [
+            (transaction, committee_id)
+            for committee_id, transactions in self.committee_receipts.items()
+            for transaction in transactions
+        ] + [
+            (contribution, contribution["committee_id"])
+            for collection in ("rawIndividualContributions", "rawCompanyContributions")
+            for document in raw[collection].values()
+            for contribution in document["contributions"]
+        ]
+        for transaction, committee_id in records:
+            record = self.fec_schedule_a(transaction, committees[committee_id])
+            if transaction.get("efiled") or record["contribution_receipt_date"] >= EFILE_CUTOFF:
+                schedule_a_efile.append(efiled_copy(record))
+                continue
+            schedule_a.append(record)
+            if (
+                record["contribution_receipt_date"] >= EFILED_DUPLICATE_START
+                and self.random.random() < EFILED_DUPLICATE_SHARE
+            ):
+                schedule_a_efile.append(efiled_copy(record))
+
+        self.build_expenditures()
+        schedule_e = []
+        schedule_e_efile = []
+        for expenditure in self.expenditures:
+            record = {**expenditure, "sub_id": self.sub_id()}
+            # Efiled expenditures store the candidate last name in the candidate name field
+            efiled = {**record, "candidate_name": record["candidate_last_name"], "election_type": None}
+            if record["expenditure_date"] >= EFILE_CUTOFF:
+                schedule_e_efile.append(efiled)
+                continue
+            schedule_e.append(record)
+            if (
+                record["expenditure_date"] >= EFILED_DUPLICATE_START
+                and self.random.random() < EFILED_DUPLICATE_SHARE
+            ):
+                schedule_e_efile.append(efiled)
+
+        return {
+            "schedule_a": schedule_a,
+            "schedule_a_efile": schedule_a_efile,
+            "schedule_e": schedule_e,
+            "schedule_e_efile": schedule_e_efile,
+            "schedule_b": [
+                self.fec_schedule_b(committee_id)
+                for committee_id in self.committees
+                for _ in range(BASE_DISBURSEMENTS * self.scale)
+            ],
+            "committees": list(committees.values()),
+            "committee_totals": [
+                self.fec_totals(committee_id, cycle)
+                for committee_id in committees
+                for cycle in (2024, 2026)
+            ],
+            "candidates": [self.fec_candidate(c) for c in self.candidates],
+            "candidate_totals": [
+                {
+                    **pick(
+                        self.fec_candidate(c),
+                        ["candidate_id", "name", "party", "state", "office", "district"],
+                    ),
+                    "cycle": 2026,
+                    "receipts": float(self.random.randrange(10**4, 10**7)),
+                    "disbursements": float(self.random.randrange(10**4, 10**7)),
+                }
+                for c in self.candidates
+            ],
+        }
+
+    def generate_fec_dataset(self):
+        self.build_constants()
+        self.build_races()
+        return self.build_fec_dataset()
+
+
+def generate(scale=1, seed=0):
+    """
+    Generate a synthetic dataset.
+
+    Args:
+        scale: Multiple of today's per-entity transaction volume
+        seed: Random seed, so runs at the same scale use identical data
+
+    Returns:
+        (collections, fixtures): Firestore contents as {collection: {doc_id: document}}, and FEC fixture entries for
+        a ReplaySession
+    """
+    return Generator(scale, seed).generate()
+
+
+def generate_fec_dataset(scale=1, seed=0):
+    """
+    Generate the records served by the FEC API simulator.
+
+    Args:
+        scale: Multiple of today's per-entity transaction volume
+        seed: Random seed, so runs at the same scale use identical data
+
+    Returns:
+        {endpoint: [records]}, with schedule_a, schedule_a_efile, schedule_e, schedule_e_efile, schedule_b,
+        committees, committee_totals, candidates and candidate_totals
+    """
+    return Generator(scale, seed).generate_fec_dataset()
+
+
+def describe(collections):
+    """Count the records in a generated dataset, and how many have each of the quirks of real filings, as (label, count)."""
+    transactions = [
+        t for doc in collections["rawContributions"].values() for t in doc["transactions"]
+    ]
+    contributions = [
+        c
+        for collection in ("rawIndividualContributions", "rawCompanyContributions")
+        for doc in collections[collection].values()
+        for c in doc["contributions"]
+    ]
+    expenditures = list(collections["expenditures"]["all"].values())
+    return [
+        ("Committee transactions", len(transactions)),
+        ("  under rollup threshold", sum(t["contribution_receipt_amount"] < 10000 for t in transactions)),
+        ("  SA17 children", sum(t["transaction_id"].count(".") == 2 for t in transactions)),
+        ("  efiled", sum(bool(t.get("efiled")) for t in transactions)),
+        ("Individual and company contributions", len(contributions)),
+        ("  earmarked", sum("EARMARK" in (c.get("memo_text") or "") for c in contributions)),
+        ("  amended", sum(len(c["amendment_chain"]) > 1 for c in contributions)),
+        ("  efiled", sum(bool(c.get("efiled")) for c in contributions)),
+        ("Expenditures", len(expenditures)),
+        ("  efiled", sum(e["election_type"] is None for e in expenditures)),
+        ("Races", sum(len(races) for races in collections["raceDetails"].values())),
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Firestore dataset")
+    parser.add_argument(
+        "--scale", type=int, default=1, help="Multiple of today's per-entity transaction volume (default: 1)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write the collections as JSON to this file, for use with harness --snapshot",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    collections, _ = generate(args.scale, args.seed)
+    for label, count in describe(collections):
+        print(f"{label}: {count}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(collections, f)
+        print(f"Dataset written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
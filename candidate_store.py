@@ -0,0 +1,261 @@
+"""
+Persistent store of FEC candidate records.
+
+Candidate records rarely change, but they're looked up on every run: by ID when recipients are enriched with their
+candidates' details, and by name when races are summarized. Records are kept in a local SQLite database, keyed by
+candidate ID and indexed by (state, office, district, normalized last name), so the API is only asked about candidates
+that are unknown or stale.
+
+Name searches are recorded along with the candidates they returned. A race is only answered from the store if every
+name in it was searched for recently, so the store never returns fewer candidates than the API would have.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from unidecode import unidecode
+
+from utils import FEC_fetch, chunk, pick
+
+CANDIDATE_STORE_PATH = os.environ.get("CANDIDATE_STORE_PATH", "candidates.sqlite")
+MAX_AGE = 7 * 24 * 60 * 60  # Seconds before a stored candidate or search is stale and fetched again
+REFRESH_BATCH = 100  # Most candidates refreshed per run by refresh_stale
+
+CANDIDATE_FIELDS = [
+    "candidate_id",
+    "name",
+    "party",
+    "party_full",
+    "state",
+    "office",
+    "district",
+    "incumbent_challenge",
+    "election_years",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    candidate_id TEXT PRIMARY KEY,
+    state TEXT,
+    office TEXT,
+    district TEXT,
+    last_name TEXT,
+    record TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS candidates_by_name ON candidates (state, office, district, last_name);
+CREATE TABLE IF NOT EXISTS searches (
+    state TEXT,
+    office TEXT,
+    district TEXT,
+    election_year INTEGER,
+    last_name TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (state, office, district, election_year, last_name)
+);
+"""
+
+WORD = re.compile(r"[A-Z0-9']+")
+
+
+def normalize_last_name(name):
+    """Normalize a last name for lookups: its last word, in upper case and without accents."""
+    words = WORD.findall(unidecode(name or "").upper())
+    return words[-1] if words else ""
+
+
+def get_last_name(fec_name):
+    """Get the normalized last name from an FEC candidate name, e.g. "DOE, JOHN JR"."""
+    return normalize_last_name((fec_name or "").split(",")[0])
+
+
+class CandidateStore:
+    """
+    Candidate records from the FEC API, persisted in SQLite.
+
+    Records are fetched again once they're older than max_age, and refresh_stale refreshes the oldest ones a batch at a
+    time, so that the store is kept current without refetching everything on the same run.
+    """
+
+    def __init__(self, path=CANDIDATE_STORE_PATH, max_age=MAX_AGE):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: Path of the SQLite database, or ":memory:" for a store that isn't persisted
+            max_age: Seconds before a stored candidate or search is stale
+        """
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def _fresh_after(self):
+        return time.time() - self.max_age
+
+    def put(self, candidates):
+        """Store candidate records as returned by the FEC API."""
+        now = time.time()
+        rows = []
+        for candidate in candidates:
+            record = pick(candidate, CANDIDATE_FIELDS)
+            rows.append(
+                (
+                    record["candidate_id"],
+                    record.get("state"),
+                    record.get("office"),
+                    record.get("district") or "",
+                    get_last_name(record.get("name")),
+                    json.dumps(record),
+                    now,
+                )
+            )
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get(self, candidate_ids, include_stale=False):
+        """
+        Get stored candidate records.
+
+        Args:
+            candidate_ids: IDs of the candidates
+            include_stale: Also return records older than max_age
+
+        Returns:
+            Dict of {candidate_id: record} for the candidates that are stored
+        """
+        fresh_after = float("-inf") if include_stale else self._fresh_after()
+        records = {}
+        with self._lock:
+            for ids_chunk in chunk(list(candidate_ids), 500):
+                rows = self._connection.execute(
+                    "SELECT candidate_id, record FROM candidates WHERE fetched_at > ? AND candidate_id IN ({})".format(
+                        ",".join("?" * len(ids_chunk))
+                    ),
+                    [fresh_after, *ids_chunk],
+                ).fetchall()
+                records.update((candidate_id, json.loads(record)) for candidate_id, record in rows)
+        return records
+
+    def find(self, last_name, state=None, office=None, district=None):
+        """Find stored candidates by normalized last name, optionally in a given state, office, and district."""
+        query = "SELECT record FROM candidates WHERE last_name = ?"
+        params = [last_name]
+        for column, value in (("state", state), ("office", office), ("district", district)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def get_candidates(self, session, candidate_ids):
+        """
+        Get candidate records by ID, fetching those that are unknown or stale from the FEC API.
+
+        Returns:
+            Dict of {candidate_id: record} for the candidates that were found
+        """
+        candidate_ids = list(dict.fromkeys(candidate_ids))
+        records = self.get(candidate_ids)
+        missing = [candidate_id for candidate_id in candidate_ids if candidate_id not in records]
+        for ids_chunk in chunk(missing, 10):
+            data = FEC_fetch(
+                session,
+                "candidate",
+                "https://api.open.fec.gov/v1/candidates/",
+                params={"candidate_id": ids_chunk},
+            )
+            results = data["results"] if data else []
+            self.put(results)
+            for candidate in results:
+                records[candidate["candidate_id"]] = pick(candidate, CANDIDATE_FIELDS)
+        return records
+
+    def search(self, session, params):
+        """
+        Search for a race's candidates by name, like the /candidates/search endpoint.
+
+        Args:
+            session: Requests session
+            params: Params for /candidates/search: office, state, election_year, q (names to search for), and district
+                for House races in states with more than one district
+
+        Returns:
+            List of candidate records
+        """
+        terms = list(params["q"])
+        state, office = params["state"], params["office"]
+        district = params.get("district")
+        election_year = int(params["election_year"])
+        last_names = {normalize_last_name(term) for term in terms}
+        search_key = (state, office, district or "", election_year)
+
+        with self._lock:
+            searched = {
+                last_name
+                for last_name, in self._connection.execute(
+                    "SELECT last_name FROM searches WHERE state = ? AND office = ? AND district = ? "
+                    "AND election_year = ? AND fetched_at > ?",
+                    [*search_key, self._fresh_after()],
+                ).fetchall()
+            }
+        if last_names <= searched:
+            return [
+                candidate
+                for last_name in sorted(last_names)
+                for candidate in self.find(last_name, state, office, district)
+                if election_year in (candidate.get("election_years") or [])
+            ]
+
+        data = FEC_fetch(
+            session,
+            f"candidates data for {state}",
+            "https://api.open.fec.gov/v1/candidates/search",
+            {**params, "q": terms},
+        )
+        results = data["results"]
+        self.put(results)
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?)",
+                [(*search_key, last_name, now) for last_name in last_names],
+            )
+        return results
+
+    def refresh_stale(self, session, limit=REFRESH_BATCH):
+        """
+        Refresh the oldest stored candidates that are more than half of max_age old, so that the store is refreshed
+        incrementally rather than all going stale at once.
+
+        Returns:
+            Number of candidates refreshed
+        """
+        with self._lock:
+            stale_ids = [
+                candidate_id
+                for candidate_id, in self._connection.execute(
+                    "SELECT candidate_id FROM candidates WHERE fetched_at < ? ORDER BY fetched_at LIMIT ?",
+                    [time.time() - self.max_age / 2, limit],
+                ).fetchall()
+            ]
+        for ids_chunk in chunk(stale_ids, 10):
+            data = FEC_fetch(
+                session,
+                "candidate",
+                "https://api.open.fec.gov/v1/candidates/",
+                params={"candidate_id": ids_chunk},
+            )
+            if data:
+                self.put(data["results"])
+        return len(stale_ids)
+
+    def close(self):
+        self._connection.close()
@@ -131,3 +131,4 @@ def trim_candidates(db):
 
         if modified_state:
             db.client.collection("raceDetails").document(state).set(state_data)
+    db.race_index = None
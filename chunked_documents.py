@@ -0,0 +1,189 @@
+"""
+Storage for documents holding long lists of records (rawContributions, rawIndividualContributions,
+rawCompanyContributions, contributionAggregates and _changelog entries), which can otherwise approach Firestore's 1 MiB
+document limit.
+
+The records are split into chunk documents in a "chunks" subcollection, and the document itself becomes a manifest: its
+other fields, plus the IDs of its chunks in order. Chunk boundaries are chosen by content (a record ends a chunk if a
+hash of its transaction ID says so) rather than by position, so records added, amended, or removed only change the
+chunk they're in, instead of shifting every chunk after them. A chunk also ends early if it would grow past
+MAX_CHUNK_BYTES. Chunks are named by a hash of their contents, so a write
+only creates the chunks that aren't already stored, and deletes the ones no longer used.
+
+Documents written before chunking (with the records inline) are still read as they are.
+"""
+
+import hashlib
+import json
+import zlib
+
+CHUNK_COLLECTION = "chunks"
+MANIFEST_FIELDS = ("chunk_field", "chunks", "count")
+TARGET_CHUNK_RECORDS = 200  # Average records per chunk
+MAX_CHUNK_RECORDS = 800  # Kept well under 1 MiB for raw contribution records
+MAX_CHUNK_BYTES = 512 * 1024  # Approximate, for records much larger than raw contributions (e.g. changelog entries)
+MAX_BATCH_CHUNKS = 10  # Chunks written per batch, to stay under the 10 MiB request limit
+
+
+def is_chunk_boundary(record, key):
+    return zlib.crc32(str(record.get(key)).encode()) % TARGET_CHUNK_RECORDS == 0
+
+
+def get_record_size(record):
+    return len(json.dumps(record, default=str))
+
+
+def split_into_chunks(records, key="transaction_id"):
+    """Split records into chunks, keeping their order."""
+    chunks = []
+    chunk = []
+    chunk_size = 0
+    for record in records:
+        record_size = get_record_size(record)
+        if chunk and chunk_size + record_size > MAX_CHUNK_BYTES:
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = 0
+        chunk.append(record)
+        chunk_size += record_size
+        if is_chunk_boundary(record, key) or len(chunk) >= MAX_CHUNK_RECORDS:
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def get_chunk_id(chunk):
+    return hashlib.sha1(
+        json.dumps(chunk, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def is_chunked(data):
+    return data is not None and "chunk_field" in data
+
+
+def strip_manifest(data):
+    """Get the fields of a raw document other than those describing its chunks."""
+    return {k: v for k, v in data.items() if k not in MANIFEST_FIELDS}
+
+
+def count_records(data, field):
+    """Count the records in a raw document, without reading its chunks."""
+    if data is None:
+        return 0
+    if is_chunked(data):
+        return data["count"]
+    return len(data.get(field, []))
+
+
+def write_chunked(db, collection, doc_id, data, field, key="transaction_id"):
+    """
+    Write a raw document, with the list of records in data[field] split into chunks.
+
+    Only chunks that aren't already stored are written. The manifest is written after its chunks and before stale
+    chunks are deleted, so readers never see a manifest whose chunks are missing.
+
+    Args:
+        db: Database instance with Firestore client
+        collection: Collection of the document, e.g. "rawContributions"
+        doc_id: ID of the document
+        data: Document to store
+        field: Field of data holding the list of records
+        key: Field of each record used to choose chunk boundaries
+
+    Returns:
+        Number of chunks written
+    """
+    doc_ref = db.client.collection(collection).document(doc_id)
+    chunks_ref = doc_ref.collection(CHUNK_COLLECTION)
+    old = doc_ref.get().to_dict()
+    old_chunk_ids = set(old.get("chunks", [])) if is_chunked(old) else set()
+
+    chunks = split_into_chunks(data[field], key)
+    chunk_ids = [get_chunk_id(chunk) for chunk in chunks]
+    to_write = [
+        (chunk_id, chunk)
+        for chunk_id, chunk in dict(zip(chunk_ids, chunks)).items()
+        if chunk_id not in old_chunk_ids
+    ]
+    for i in range(0, len(to_write), MAX_BATCH_CHUNKS):
+        batch = db.client.batch()
+        for chunk_id, chunk in to_write[i : i + MAX_BATCH_CHUNKS]:
+            batch.set(chunks_ref.document(chunk_id), {field: chunk})
+        batch.commit()
+
+    manifest = {k: v for k, v in data.items() if k != field}
+    manifest.update(
+        {"chunk_field": field, "chunks": chunk_ids, "count": len(data[field])}
+    )
+    doc_ref.set(manifest)
+
+    stale = old_chunk_ids.difference(chunk_ids)
+    if stale:
+        batch = db.client.batch()
+        for i, chunk_id in enumerate(stale):
+            batch.delete(chunks_ref.document(chunk_id))
+            if (i + 1) % 500 == 0:
+                batch.commit()
+                batch = db.client.batch()
+        batch.commit()
+    return len(to_write)
+
+
+def stream_records(db, collection, doc_id, data, field):
+    """
+    Stream the records of a raw document, a few chunks at a time.
+
+    Args:
+        db: Database instance with Firestore client
+        collection: Collection of the document
+        doc_id: ID of the document
+        data: The document as read (a manifest, or a document written before chunking with its records inline)
+        field: Field holding the list of records
+    """
+    if not is_chunked(data):
+        yield from data.get(field, [])
+        return
+    chunks_ref = db.client.collection(collection).document(doc_id).collection(
+        CHUNK_COLLECTION
+    )
+    chunk_ids = data["chunks"]
+    for i in range(0, len(chunk_ids), MAX_BATCH_CHUNKS):
+        batch_ids = chunk_ids[i : i + MAX_BATCH_CHUNKS]
+        snapshots = db.client.get_all(
+            [chunks_ref.document(chunk_id) for chunk_id in set(batch_ids)]
+        )
+        # get_all doesn't return documents in the order they were asked for
+        chunks = {snapshot.id: snapshot.to_dict() for snapshot in snapshots}
+        for chunk_id in batch_ids:
+            if chunks.get(chunk_id) is None:
+                raise ValueError(f"Missing chunk {chunk_id} of {collection}/{doc_id}")
+            yield from chunks[chunk_id][field]
+
+
+def read_chunked(db, collection, doc_id, data=None):
+    """
+    Read a raw document with all of its records, as it was passed to write_chunked.
+
+    Args:
+        db: Database instance with Firestore client
+        collection: Collection of the document
+        doc_id: ID of the document
+        data: The document, if it's already been read (e.g. by streaming the collection)
+
+    Returns:
+        The document, or None if it doesn't exist
+    """
+    if data is None:
+        data = db.client.collection(collection).document(doc_id).get().to_dict()
+        if data is None:
+            return None
+    if not is_chunked(data):
+        return data
+    document = strip_manifest(data)
+    field = data["chunk_field"]
+    document[field] = list(stream_records(db, collection, doc_id, data, field))
+    return document
@@ -10,122 +10,26 @@ Usage:
 import argparse
 import logging
 from Database import Database
-from utils import FEC_fetch, pick
+from committee_details import hydrate_committees
 import requests
 
 
 def hydrate_committee(db, committee_id, committee_data, session=None):
     """
     Fetch committee details and totals from FEC API for a specific committee.
-    Similar to the hydrate_committees task but for a single committee.
+    Uses the same implementation as the hydrate_committees task.
     """
     if session is None:
         session = requests.Session()
 
-    committee_processed = {
-        "details_fetched": False,
-        "totals_fetched": False,
-        "data": None,
-    }
-
-    # Fetch committee details
-    details_data = FEC_fetch(
-        session,
-        "committee details",
-        "https://api.open.fec.gov/v1/committee/" + committee_id,
-    )
-
-    if details_data and "results" in details_data and details_data["results"]:
-        details = details_data["results"][0]
-        picked = pick(
-            details,
-            [
-                "affiliated_committee_name",
-                "candidate_ids",
-                "committee_type",
-                "committee_type_full",
-                "cycles",
-                "designation",
-                "designation_full",
-                "first_f1_date",
-                "leadership_pac",
-                "organization_type",
-                "organization_type_full",
-                "party",
-                "party_full",
-                "party_type",
-                "party_type_full",
-                "sponsor_candidate_ids",
-                "website",
-            ],
-        )
-        picked["fec_name"] = details["name"]
-        full_committee_data = {**committee_data, **picked}
-        committee_processed["details_fetched"] = True
-
-        # Fetch committee totals
-        totals_data = FEC_fetch(
-            session,
-            "committee totals",
-            "https://api.open.fec.gov/v1/committee/{}/totals".format(committee_id),
-            params={"cycle": 2026},
-        )
-
-        if (
-            totals_data
-            and "results" in totals_data
-            and len(totals_data["results"])
-            and totals_data["results"][0]
-        ):
-            totals = totals_data["results"][0]
-            full_committee_data.update(
-                **pick(
-                    totals,
-                    [
-                        "contributions",
-                        "contribution_refunds",
-                        "disbursements",
-                        "net_contributions",
-                        "receipts",
-                        "independent_expenditures",
-                    ],
-                ),
-            )
-            committee_processed["totals_fetched"] = True
-
-        # Fetch cash on hand from the 2024 cycle to get EOY 2024 balance,
-        # avoiding double-counting 2025 contributions.
-        # Newly formed committees return None here, which is fine — they had $0.
-        full_committee_data["last_cash_on_hand_end_period"] = 0
-        cash_on_hand_data = FEC_fetch(
-            session,
-            "committee EOY 2024 cash on hand",
-            "https://api.open.fec.gov/v1/committee/{}/totals".format(committee_id),
-            params={"cycle": 2024},
-        )
-        if (
-            cash_on_hand_data
-            and "results" in cash_on_hand_data
-            and len(cash_on_hand_data["results"])
-            and cash_on_hand_data["results"][0]
-        ):
-            full_committee_data["last_cash_on_hand_end_period"] = (
-                cash_on_hand_data["results"][0].get(
-                    "last_cash_on_hand_end_period", 0
-                )
-            )
-
-        # Save to Firestore committees collection
-        db.client.collection("committees").document(committee_id).set(full_committee_data)
-        committee_processed["data"] = full_committee_data
-
+    committee_processed = hydrate_committees(
+        db, session, {committee_id: committee_data}
+    )[committee_id]
+    if committee_processed["details_fetched"]:
         logging.info(
             f"Committee {committee_id} hydrated - Details: {committee_processed['details_fetched']}, "
             f"Totals: {committee_processed['totals_fetched']}"
         )
-    else:
-        logging.warning(f"Could not fetch details for committee {committee_id}")
-
     return committee_processed
 
 
@@ -156,6 +60,13 @@ def add_committee(committee_id: str, committee_data: dict, fetch_immediately: bo
     if committee_id in db.committees:
         raise ValueError(f"Committee '{committee_id}' already exists.")
 
+    # Stored FEC committees with the same name may mean the ID was mistyped
+    for match in db.committee_store.find(committee_data.get("name")):
+        if match["committee_id"] != committee_id:
+            logging.warning(
+                f"FEC committee {match['committee_id']} is also named '{match['name']}'"
+            )
+
     # Add to constants collection
     current_committees = db.committees.copy()
     current_committees[committee_id] = committee_data
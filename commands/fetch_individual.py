@@ -11,6 +11,7 @@ import argparse
 import logging
 import requests
 from Database import Database
+from chunked_documents import count_records
 from individuals import update_spending_by_individuals
 from process_individual_contributions import process_individual_contributions
 from company_spending import update_spending_by_company
@@ -45,15 +46,15 @@ def fetch_individual_data(individual_id: str, force: bool = False):
         db.client.collection("rawIndividualContributions").document(individual_id).get()
     )
     if existing_data.exists and not force:
-        existing_contribs = existing_data.to_dict().get("contributions", [])
+        existing_contribs = count_records(existing_data.to_dict(), "contributions")
         if existing_contribs:
             print(
-                f"ℹ️  Individual '{individual_id}' already has {len(existing_contribs)} contributions. Use --force to refetch."
+                f"ℹ️  Individual '{individual_id}' already has {existing_contribs} contributions. Use --force to refetch."
             )
             return {
                 "individual_id": individual_id,
                 "skipped": True,
-                "existing_contributions": len(existing_contribs),
+                "existing_contributions": existing_contribs,
             }
 
     logging.info(f"Fetching contribution data for {individual_id}")
@@ -47,6 +47,12 @@ def find_duplicate_candidates():
         db.candidate_aliases.values()
     )
 
+    # Prefer candidate details from the candidate store, which may be more current than recipientsWithContribs
+    stored_candidates = db.candidate_store.get(
+        [recipient_id for recipient_id in recipients if recipient_id[0] in ("H", "S", "P")],
+        include_stale=True,
+    )
+
     # Group candidates by normalized name
     name_to_candidates = defaultdict(list)
 
@@ -56,6 +62,13 @@ def find_duplicate_candidates():
             continue
 
         candidate_details = data.get("candidate_details", {})
+        if recipient_id in stored_candidates:
+            stored = stored_candidates[recipient_id]
+            candidate_details = {
+                **candidate_details,
+                **stored,
+                "isRunningThisCycle": 2026 in (stored.get("election_years") or []),
+            }
         name = candidate_details.get("name", "")
         if not name:
             continue
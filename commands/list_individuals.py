@@ -9,6 +9,7 @@ Usage:
 
 import argparse
 from Database import Database
+from chunked_documents import count_records
 
 try:
     from tabulate import tabulate
@@ -44,7 +45,7 @@ def list_individuals(verbose: bool = False):
         
         raw_contribs = 0
         if raw_data.exists:
-            raw_contribs = len(raw_data.to_dict().get("contributions", []))
+            raw_contribs = count_records(raw_data.to_dict(), "contributions")
         
         processed_contribs = 0
         if processed_data.exists:
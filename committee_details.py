@@ -0,0 +1,157 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import FEC_fetch, chunk, pick
+
+MAX_WORKERS = 8  # Concurrent requests for committee totals
+TOTALS_CYCLE = 2026
+# Cash on hand is taken from the 2024 cycle to get the EOY 2024 balance, avoiding double-counting 2025 contributions
+CASH_ON_HAND_CYCLE = 2024
+
+# Details reported by the committees list endpoint
+DETAILS_FIELDS = [
+    "affiliated_committee_name",
+    "candidate_ids",
+    "committee_type",
+    "committee_type_full",
+    "cycles",
+    "designation",
+    "designation_full",
+    "first_f1_date",
+    "organization_type",
+    "organization_type_full",
+    "party",
+    "party_full",
+    "sponsor_candidate_ids",
+]
+
+# Details only reported by the single committee endpoint (/committee/{id})
+DETAIL_ONLY_FIELDS = [
+    "leadership_pac",
+    "party_type",
+    "party_type_full",
+    "website",
+]
+
+TOTALS_FIELDS = [
+    "contributions",
+    "contribution_refunds",
+    "disbursements",
+    "net_contributions",
+    "receipts",
+    "independent_expenditures",
+]
+
+
+def fetch_committee_detail(session, committee_id):
+    """Fetch a committee from the single committee endpoint, or None if it couldn't be fetched."""
+    data = FEC_fetch(
+        session,
+        "committee details",
+        "https://api.open.fec.gov/v1/committee/" + committee_id,
+    )
+    if data and "results" in data and len(data["results"]) and data["results"][0]:
+        return data["results"][0]
+    return None
+
+
+def fetch_committee_totals(session, committee_id, cycle):
+    """Fetch a committee's totals for a cycle, or None if it has none (e.g. a newly formed committee)."""
+    data = FEC_fetch(
+        session,
+        "committee totals",
+        "https://api.open.fec.gov/v1/committee/{}/totals".format(committee_id),
+        params={"cycle": cycle},
+    )
+    if data and "results" in data and len(data["results"]) and data["results"][0]:
+        return data["results"][0]
+    return None
+
+
+def hydrate_committees(db, session, committees):
+    """
+    Fetch details and totals from the FEC API for a set of tracked committees, and write them to the committees
+    collection.
+
+    Details come from the committee store, which fetches any that are missing or stale from the committees list
+    endpoint in batches. The few details the list endpoint doesn't report (DETAIL_ONLY_FIELDS) are fetched from the
+    single committee endpoint, concurrently with the totals for both cycles. Committee documents are written in bulk
+    once everything has been fetched.
+
+    Args:
+        db: Database instance with Firestore client
+        session: Requests session
+        committees: Tracked committees (from db.committees) to hydrate, keyed by committee ID
+
+    Returns:
+        Dict of {committee_id: {"details_fetched", "totals_fetched", "totals", "data"}}, where totals are the
+        committee's totals for the current cycle, and data is what was written to the committee's document (or None if
+        its details couldn't be fetched)
+    """
+    details = db.committee_store.get_committees(session, committees.keys())
+    found = [committee_id for committee_id in committees if committee_id in details]
+    for committee_id in committees:
+        if committee_id not in details:
+            logging.warning(f"Could not fetch details for committee {committee_id}")
+
+    totals_requests = [
+        (committee_id, cycle)
+        for committee_id in found
+        for cycle in (TOTALS_CYCLE, CASH_ON_HAND_CYCLE)
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        detail_results = executor.map(
+            lambda committee_id: fetch_committee_detail(session, committee_id), found
+        )
+        totals_results = executor.map(
+            lambda request: fetch_committee_totals(session, *request), totals_requests
+        )
+        single_details = dict(zip(found, detail_results))
+        totals = dict(zip(totals_requests, totals_results))
+
+    hydrated = {}
+    for committee_id, committee in committees.items():
+        hydrated[committee_id] = {
+            "details_fetched": False,
+            "totals_fetched": False,
+            "totals": None,
+            "data": None,
+        }
+        if committee_id not in details:
+            continue
+        picked = pick(details[committee_id], DETAILS_FIELDS)
+        if single_details[committee_id]:
+            picked.update(pick(single_details[committee_id], DETAIL_ONLY_FIELDS))
+        else:
+            logging.warning(f"Could not fetch {', '.join(DETAIL_ONLY_FIELDS)} for committee {committee_id}")
+        picked["fec_name"] = details[committee_id]["name"]
+        committee_data = {**committee, **picked}
+
+        cycle_totals = totals[(committee_id, TOTALS_CYCLE)]
+        if cycle_totals:
+            committee_data.update(**pick(cycle_totals, TOTALS_FIELDS))
+        # Newly formed committees have no totals for the earlier cycle, which is fine — they had $0.
+        cash_on_hand_totals = totals[(committee_id, CASH_ON_HAND_CYCLE)]
+        committee_data["last_cash_on_hand_end_period"] = (
+            cash_on_hand_totals.get("last_cash_on_hand_end_period", 0)
+            if cash_on_hand_totals
+            else 0
+        )
+        hydrated[committee_id] = {
+            "details_fetched": True,
+            "totals_fetched": cycle_totals is not None,
+            "totals": cycle_totals,
+            "data": committee_data,
+        }
+
+    to_write = [
+        (committee_id, result["data"])
+        for committee_id, result in hydrated.items()
+        if result["data"] is not None
+    ]
+    for batch_items in chunk(to_write, 500):
+        batch = db.client.batch()
+        for committee_id, committee_data in batch_items:
+            batch.set(db.client.collection("committees").document(committee_id), committee_data)
+        batch.commit()
+    return hydrated
@@ -1,3 +1,4 @@
+from pipeline_core.changelog import diff_records, key_records
 from utils import FEC_fetch, pick
 
 DISBURSEMENT_FIELDS = [
@@ -8,8 +9,27 @@ DISBURSEMENT_FIELDS = [
     "transaction_id",
 ]
 
+# Fields whose values repeat across disbursements, and are interned to save memory (see utils.pick)
+INTERNED_FIELDS = ["disbursement_date", "recipient_committee_id"]
 
-def update_committee_disbursements(db, session):
+
+def get_disbursement_key(disbursement):
+    return "{recipient_committee_id}.{transaction_id}".format(**disbursement)
+
+
+def key_disbursements(disbursements_by_committee):
+    """Key a committee's disbursements by recipient and transaction ID, for diffing."""
+    return key_records(
+        [
+            disbursement
+            for recipient in disbursements_by_committee.values()
+            for disbursement in recipient["disbursements"]
+        ],
+        get_disbursement_key,
+    )
+
+
+def update_committee_disbursements(db, session, changelog=None):
     committees = db.client.collection("committees").stream()
     new_disbursements = {}
     total_receipts = 0
@@ -43,7 +63,9 @@ def update_committee_disbursements(db, session):
                         disbursements[disbursement["recipient_committee_id"]] = {
                             "total": disbursement["disbursement_amount"],
                             "recipient_name": disbursement["recipient_name"],
-                            "disbursements": [pick(disbursement, DISBURSEMENT_FIELDS)],
+                            "disbursements": [
+                                pick(disbursement, DISBURSEMENT_FIELDS, INTERNED_FIELDS)
+                            ],
                         }
                     else:
                         disbursements[disbursement["recipient_committee_id"]][
@@ -51,7 +73,7 @@ def update_committee_disbursements(db, session):
                         ] += disbursement["disbursement_amount"]
                         disbursements[disbursement["recipient_committee_id"]][
                             "disbursements"
-                        ].append(pick(disbursement, DISBURSEMENT_FIELDS))
+                        ].append(pick(disbursement, DISBURSEMENT_FIELDS, INTERNED_FIELDS))
 
                 if disbursements_count >= data["pagination"]["count"]:
                     break
@@ -62,39 +84,16 @@ def update_committee_disbursements(db, session):
                     ]
 
             if disbursements:
-                old_disbursements = committee.get("disbursements_by_committee", {})
-                for recipient_committee_id in disbursements:
-                    if recipient_committee_id not in old_disbursements:
-                        # All disbursements to this committee are new, add them to new_disbursements
-                        for disbursement in disbursements[recipient_committee_id][
-                            "disbursements"
-                        ]:
-                            if committee_id not in new_disbursements:
-                                new_disbursements[committee_id] = {}
-                            new_disbursements[committee_id][
-                                disbursement["transaction_id"]
-                            ] = disbursement
-                    else:
-                        old_disbursement_ids = set(
-                            [
-                                d["transaction_id"]
-                                for d in old_disbursements[recipient_committee_id][
-                                    "disbursements"
-                                ]
-                            ]
-                        )
-                        for disbursement in disbursements[recipient_committee_id][
-                            "disbursements"
-                        ]:
-                            if (
-                                disbursement["transaction_id"]
-                                not in old_disbursement_ids
-                            ):
-                                if committee_id not in new_disbursements:
-                                    new_disbursements[committee_id] = {}
-                                new_disbursements[committee_id][
-                                    disbursement["transaction_id"]
-                                ] = disbursement
+                diff = diff_records(
+                    key_disbursements(committee.get("disbursements_by_committee", {})),
+                    key_disbursements(disbursements),
+                )
+                for disbursement in diff.inserted.values():
+                    new_disbursements.setdefault(committee_id, {})[
+                        disbursement["transaction_id"]
+                    ] = disbursement
+                if changelog is not None:
+                    changelog.record("disbursements", committee_id, diff)
 
             db.client.collection("committees").document(committee_id).set(
                 {"disbursements_by_committee": disbursements}, merge=True
@@ -1,5 +1,13 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from pipeline_core.changelog import diff_records
+from transactions import TransactionStore
 from utils import FEC_fetch, pick, get_expenditure_race_type
 
+MAX_WORKERS = 8  # Concurrent Schedule E streams (processed or efiled, for one committee each)
+
 EXPENDITURE_FIELDS = [
     "expenditure_amount",
     "candidate_office_state",
@@ -28,6 +36,30 @@ EXPENDITURE_FIELDS = [
     "uid",
 ]
 
+# Fields whose values repeat across expenditures, and are interned to save memory (see utils.pick)
+INTERNED_FIELDS = [
+    "candidate_office_state",
+    "expenditure_date",
+    "expenditure_description",
+    "candidate_id",
+    "candidate_first_name",
+    "candidate_last_name",
+    "candidate_middle_name",
+    "candidate_suffix",
+    "candidate_name",
+    "candidate_office",
+    "candidate_office_district",
+    "candidate_party",
+    "category_code",
+    "category_code_full",
+    "dissemination_date",
+    "election_type",
+    "payee_name",
+    "support_oppose_indicator",
+    "subrace",
+    "committee_id",
+]
+
 
 def get_race_name(expenditure):
     race = "{candidate_office_state}-{candidate_office}".format(**expenditure)
@@ -39,125 +71,139 @@ def get_race_name(expenditure):
     return race
 
 
-def update_committee_expenditures(db, session):
-    """
-    Fetch processed transactions, and any transactions that have been efiled but not yet processed.
-    These are stored raw in expenditures.all, and processed later in process_committee_expenditures.py.
-    """
-    committee_ids = [committee["id"] for committee in db.committees.values()]
-    transactions = {}
+def fetch_processed_expenditures(session, committee_id):
+    """Fetch a committee's processed expenditures."""
+    expenditures = []
     last_index = None
     last_expenditure_date = None
     exp_count = 0
-    for committee_id in committee_ids:
-        # First fetch processed expenditures
-        while True:
-            data = FEC_fetch(
-                session,
-                "committee expenditures",
-                "https://api.open.fec.gov/v1/schedules/schedule_e",
-                params={
-                    "committee_id": committee_id,
-                    "per_page": 100,
-                    "is_notice": True,
-                    "most_recent": True,
-                    "cycle": 2026,
-                    "last_index": last_index,
-                    "last_expenditure_date": last_expenditure_date,
-                },
-            )
-
-            if not data:
+    while True:
+        data = FEC_fetch(
+            session,
+            "committee expenditures",
+            "https://api.open.fec.gov/v1/schedules/schedule_e",
+            params={
+                "committee_id": committee_id,
+                "per_page": 100,
+                "is_notice": True,
+                "most_recent": True,
+                "cycle": 2026,
+                "last_index": last_index,
+                "last_expenditure_date": last_expenditure_date,
+            },
+        )
+
+        if not data:
+            continue
+
+        exp_count += data["pagination"]["per_page"]
+
+        for exp in data["results"]:
+            if exp["memoed_subtotal"]:
                 continue
+            exp["subrace"] = get_expenditure_race_type(exp)
+            exp["committee_id"] = committee_id
+            exp["uid"] = "{}-{}".format(exp["committee_id"], exp["transaction_id"])
+            expenditures.append(exp)
+
+        if exp_count >= data["pagination"]["count"]:
+            break
+        else:
+            last_index = data["pagination"]["last_indexes"]["last_index"]
+            last_expenditure_date = data["pagination"]["last_indexes"][
+                "last_expenditure_date"
+            ]
+    return expenditures
+
+
+def fetch_efiled_expenditures(session, committee_id):
+    """Fetch a committee's efiled expenditures, which may not have been processed yet."""
+    expenditures = []
+    page = 1
+    while True:
+        data = FEC_fetch(
+            session,
+            "unprocessed committee expenditures",
+            "https://api.open.fec.gov/v1/schedules/schedule_e/efile",
+            params={
+                "committee_id": committee_id,
+                "per_page": 100,
+                "min_date": "2025-01-01",
+                "sort": "-expenditure_date",
+                "is_notice": True,
+                "most_recent": True,
+                "page": page,
+            },
+        )
+
+        if not data:
+            continue
+
+        results = data["results"]
+        for exp in results:
+            # Efiled expenditures store the candidate last name in the candidate name field, causing problems
+            # down the line. Copy it over to keep consistent.
+            exp["candidate_last_name"] = exp["candidate_name"]
+            exp["subrace"] = get_expenditure_race_type(exp)
+
+            exp["uid"] = "{}-{}".format(exp["committee_id"], exp["transaction_id"])
+            expenditures.append(exp)
+
+        if page >= data["pagination"]["pages"]:
+            break
+        else:
+            page += 1
+    return expenditures
+
+
+def update_committee_expenditures(db, session, changelog=None):
+    """
+    Fetch processed transactions, and any transactions that have been efiled but not yet processed.
+    These are stored raw in expenditures.all, and processed later in process_committee_expenditures.py.
 
-            exp_count += data["pagination"]["per_page"]
-
-            for exp in data["results"]:
-                if exp["memoed_subtotal"]:
-                    continue
-                exp["subrace"] = get_expenditure_race_type(exp)
-                exp["committee_id"] = committee_id
-                uid = "{}-{}".format(exp["committee_id"], exp["transaction_id"])
-                exp["uid"] = uid
-                if exp["amendment_indicator"] == "A":
-                    if uid in transactions and (
-                        transactions[uid]["amendment_indicator"] == "N"
-                        or transactions[uid]["amendment_number"]
-                        < exp["amendment_number"]
-                    ):
-                        transactions[uid] = pick(exp, EXPENDITURE_FIELDS)
-                elif uid not in transactions:
-                    transactions[uid] = pick(exp, EXPENDITURE_FIELDS)
-
-            if exp_count >= data["pagination"]["count"]:
-                break
-            else:
-                last_index = data["pagination"]["last_indexes"]["last_index"]
-                last_expenditure_date = data["pagination"]["last_indexes"][
-                    "last_expenditure_date"
-                ]
-
-        # Now fetch efiled expenditures that may have not yet been processed
-        page = 1
-        while True:
-            data = FEC_fetch(
-                session,
-                "unprocessed committee expenditures",
-                "https://api.open.fec.gov/v1/schedules/schedule_e/efile",
-                params={
-                    "committee_id": committee_id,
-                    "per_page": 100,
-                    "min_date": "2025-01-01",
-                    "sort": "-expenditure_date",
-                    "is_notice": True,
-                    "most_recent": True,
-                    "page": page,
-                },
-            )
+    Each committee's processed and efiled expenditures are fetched concurrently, each stream with its own cursor, and
+    then merged in committee order (processed before efiled) so that amendments are resolved the same way every run.
+    Only MAX_WORKERS committees are fetched ahead of the one being merged, and each committee's raw expenditures are
+    dropped once they've been added to the store.
 
-            if not data:
-                continue
+    Returns the expenditures that weren't present in the previous run. If a Changelog is provided, the added, removed,
+    and amended expenditures are recorded in it.
+    """
+    committee_ids = iter([committee["id"] for committee in db.committees.values()])
+    store = TransactionStore()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+
+        def submit(committee_id):
+            return (
+                executor.submit(fetch_processed_expenditures, session, committee_id),
+                executor.submit(fetch_efiled_expenditures, session, committee_id),
+            )
 
-            results = data["results"]
-            for exp in results:
-                # Efiled expenditures store the candidate last name in the candidate name field, causing problems
-                # down the line. Copy it over to keep consistent.
-                exp["candidate_last_name"] = exp["candidate_name"]
-                exp["subrace"] = get_expenditure_race_type(exp)
-
-                uid = "{}-{}".format(exp["committee_id"], exp["transaction_id"])
-                exp["uid"] = uid
-                if exp["amendment_indicator"] == "A":
-                    if uid in transactions and (
-                        (
-                            not transactions[uid].get("amendment_indicator", None)
-                            or transactions[uid].get("amendment_indicator", None) == "N"
-                        )
-                        or (
-                            not transactions[uid].get("amendment_number", None)
-                            or transactions[uid].get("amendment_number", None)
-                            < exp["amendment_number"]
-                        )
-                    ):
-                        transactions[uid] = pick(exp, EXPENDITURE_FIELDS)
-                elif uid not in transactions:
-                    transactions[uid] = pick(exp, EXPENDITURE_FIELDS)
-
-            if page >= data["pagination"]["pages"]:
-                break
-            else:
-                page += 1
-
-    # Diff with previously stored expenditures
-    # new_transactions = {}
-    # old_transactions = (
-    #     db.client.collection("expenditures").document("all").get().to_dict()
-    # )
-    # if old_transactions:
-    #     old_transaction_ids = set(old_transactions.keys())
-    #     diff_ids = set(transactions.keys()).difference(old_transaction_ids)
-    #     if diff_ids:
-    #         new_transactions = {x: transactions[x] for x in diff_ids}
+        streams = deque(submit(committee_id) for committee_id in islice(committee_ids, MAX_WORKERS))
+        while streams:
+            processed, efiled = streams.popleft()
+            for committee_id in islice(committee_ids, 1):
+                streams.append(submit(committee_id))
+            for exp in processed.result():
+                store.add(exp, record=pick(exp, EXPENDITURE_FIELDS, INTERNED_FIELDS))
+            for exp in efiled.result():
+                store.add(
+                    exp, record=pick(exp, EXPENDITURE_FIELDS, INTERNED_FIELDS), efiled=True
+                )
+            # The futures hold on to the raw expenditures until they're released
+            del processed, efiled
+
+    # Amendments were resolved as the expenditures were added, so only the current version of each is stored
+    transactions = {exp["uid"]: exp for exp in store.records()}
+
+    # Diff with previously stored expenditures. The subrace is filled in later by summarize_races, so it isn't a
+    # meaningful change
+    old_transactions = (
+        db.client.collection("expenditures").document("all").get().to_dict()
+    ) or {}
+    diff = diff_records(old_transactions, transactions, ignore_fields=("subrace",))
+    if changelog is not None:
+        changelog.record("expenditures", "all", diff)
 
     db.client.collection("expenditures").document("all").set(transactions)
-    # return new_transactions
+    return diff.inserted
@@ -0,0 +1,207 @@
+"""
+Persistent store of FEC committee metadata.
+
+Committee metadata (name, type, designation, party, candidate IDs, etc.) is needed for tracked committees when they're
+hydrated, and for the thousands of committees that receive contributions when recipients are enriched. It's kept in a
+local SQLite database and shared by both, so each committee's metadata is downloaded once and reused across runs.
+
+Freshness is tracked per field, since some sources only report some fields (e.g. the PAC totals endpoint reports a
+committee's name, type and designation, but not its party or candidates). A committee is only fetched again if one of
+the fields asked for is missing or stale. Committees can be looked up by ID, or by normalized name.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from unidecode import unidecode
+
+from committee_details import DETAILS_FIELDS
+from utils import FEC_fetch, chunk
+
+COMMITTEE_STORE_PATH = os.environ.get("COMMITTEE_STORE_PATH", "committees.sqlite")
+MAX_AGE = 7 * 24 * 60 * 60  # Seconds before a stored field is stale and fetched again
+REFRESH_BATCH = 500  # Most committees refreshed per run by refresh_stale
+MAX_BATCH_COMMITTEES = 100  # Committee IDs per request to the committees list endpoint
+
+# Fields kept from the committees list endpoint, which are all the fields it reports that are used
+COMMITTEE_FIELDS = ["name", "state", *DETAILS_FIELDS]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS committees (
+    committee_id TEXT PRIMARY KEY,
+    normalized_name TEXT
+);
+CREATE INDEX IF NOT EXISTS committees_by_name ON committees (normalized_name);
+CREATE TABLE IF NOT EXISTS committee_fields (
+    committee_id TEXT,
+    field TEXT,
+    value TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (committee_id, field)
+);
+"""
+
+WORD = re.compile(r"[A-Z0-9]+")
+
+
+def normalize_committee_name(name):
+    """Normalize a committee name for lookups: upper case words, without accents or punctuation."""
+    return " ".join(WORD.findall(unidecode(name or "").upper()))
+
+
+class CommitteeStore:
+    """Committee metadata from the FEC API, persisted in SQLite with a fetch time for each field."""
+
+    def __init__(self, path=COMMITTEE_STORE_PATH, max_age=MAX_AGE):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: Path of the SQLite database, or ":memory:" for a store that isn't persisted
+            max_age: Seconds before a stored field is stale
+        """
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def put(self, committees, fields=COMMITTEE_FIELDS):
+        """
+        Store committee metadata.
+
+        Args:
+            committees: Committee records keyed by field name, each with a committee_id
+            fields: Fields to store. Only the fields a record actually has are stored, so a field its source
+                doesn't report isn't taken to be known, and is still fetched when it's asked for.
+        """
+        now = time.time()
+        committee_rows = []
+        field_rows = []
+        for committee in committees:
+            committee_id = committee["committee_id"]
+            if "name" in fields and "name" in committee:
+                committee_rows.append(
+                    (committee_id, normalize_committee_name(committee["name"]))
+                )
+            for field in fields:
+                if field in committee:
+                    field_rows.append((committee_id, field, json.dumps(committee[field]), now))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO committees VALUES (?, ?)", committee_rows
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO committee_fields VALUES (?, ?, ?, ?)", field_rows
+            )
+
+    def get(self, committee_ids, fields=COMMITTEE_FIELDS, include_stale=False):
+        """
+        Get stored committee metadata.
+
+        Args:
+            committee_ids: IDs of the committees
+            fields: Fields to get
+            include_stale: Also return committees with fields older than max_age
+
+        Returns:
+            Dict of {committee_id: record} for the committees with all of the fields stored (and fresh, unless
+            include_stale is set). Each record has the committee_id and the fields asked for.
+        """
+        fresh_after = float("-inf") if include_stale else time.time() - self.max_age
+        records = {}
+        with self._lock:
+            for ids_chunk in chunk(list(committee_ids), 500):
+                rows = self._connection.execute(
+                    "SELECT committee_id, field, value FROM committee_fields "
+                    "WHERE fetched_at > ? AND committee_id IN ({}) AND field IN ({})".format(
+                        ",".join("?" * len(ids_chunk)), ",".join("?" * len(fields))
+                    ),
+                    [fresh_after, *ids_chunk, *fields],
+                ).fetchall()
+                for committee_id, field, value in rows:
+                    records.setdefault(committee_id, {"committee_id": committee_id})[
+                        field
+                    ] = json.loads(value)
+        return {
+            committee_id: record
+            for committee_id, record in records.items()
+            if len(record) == len(fields) + 1
+        }
+
+    def find(self, name):
+        """Find stored committees by name, ignoring case, accents and punctuation."""
+        normalized_name = normalize_committee_name(name)
+        if not normalized_name:
+            return []
+        with self._lock:
+            committee_ids = [
+                committee_id
+                for committee_id, in self._connection.execute(
+                    "SELECT committee_id FROM committees WHERE normalized_name = ?",
+                    [normalized_name],
+                ).fetchall()
+            ]
+        return list(self.get(committee_ids, include_stale=True).values())
+
+    def fetch(self, session, committee_ids):
+        """Fetch committees from the committees list endpoint, in batches, and store them."""
+        fetched = []
+        for batch in chunk(list(committee_ids), MAX_BATCH_COMMITTEES):
+            page = 1
+            while True:
+                data = FEC_fetch(
+                    session,
+                    "committee details",
+                    "https://api.open.fec.gov/v1/committees/",
+                    params={"committee_id": batch, "per_page": 100, "page": page},
+                )
+                if not data:
+                    break
+                fetched.extend(data.get("results", []))
+                if page >= data["pagination"]["pages"]:
+                    break
+                page += 1
+        self.put(fetched)
+        return fetched
+
+    def get_committees(self, session, committee_ids, fields=COMMITTEE_FIELDS):
+        """
+        Get committee metadata by ID, fetching committees with missing or stale fields from the FEC API.
+
+        Returns:
+            Dict of {committee_id: record} for the committees that were found
+        """
+        committee_ids = list(dict.fromkeys(committee_ids))
+        records = self.get(committee_ids, fields)
+        missing = [committee_id for committee_id in committee_ids if committee_id not in records]
+        if missing:
+            self.fetch(session, missing)
+            records.update(self.get(missing, fields))
+        return records
+
+    def refresh_stale(self, session, limit=REFRESH_BATCH):
+        """
+        Refresh the stored committees with the oldest fields, if those are more than half of max_age old, so that the
+        store is refreshed incrementally rather than all going stale at once.
+
+        Returns:
+            Number of committees refreshed
+        """
+        with self._lock:
+            stale_ids = [
+                committee_id
+                for committee_id, in self._connection.execute(
+                    "SELECT committee_id FROM committee_fields GROUP BY committee_id "
+                    "HAVING MIN(fetched_at) < ? ORDER BY MIN(fetched_at) LIMIT ?",
+                    [time.time() - self.max_age / 2, limit],
+                ).fetchall()
+            ]
+        self.fetch(session, stale_ids)
+        return len(stale_ids)
+
+    def close(self):
+        self._connection.close()
@@ -2,12 +2,14 @@ from fetch_committee_contributions import (
     should_omit,
     get_ids_to_omit,
 )
+from chunked_documents import read_chunked, write_chunked
+from pipeline_core.changelog import diff_records, key_records
 from utils import FEC_fetch, pick
 
 MIN_CONTRIBUTION_AMOUNT = 1000
 
 
-def is_high_level_individual(contrib, allowlists):
+def is_high_level_individual(contrib, occupation_classifier):
     """Check if a contribution is from a high-level individual based on occupation allowlist.
     This mirrors the logic in process_committee_contributions.py's is_redacted function."""
     if contrib.get("claimed", False):
@@ -20,8 +22,7 @@ def is_high_level_individual(contrib, allowlists):
     if not contrib.get("contributor_occupation"):
         # No occupation listed, not a high-level individual
         return False
-    occupation = contrib["contributor_occupation"].upper()
-    return occupation in allowlists["equals"] or allowlists["contains"].search(occupation)
+    return occupation_classifier.is_allowlisted(contrib["contributor_occupation"])
 
 
 PICKED_FIELDS = [
@@ -65,6 +66,26 @@ ADDED_FIELDS = [
 
 CONTRIBUTION_FIELDS = PICKED_FIELDS + COMMITTEE_CONTRIBUTION_FIELDS + ADDED_FIELDS
 
+# Fields whose values repeat across contributions, and are interned to save memory (see utils.pick)
+INTERNED_FIELDS = [
+    "contributor_occupation",
+    "contributor_employer",
+    "committee_id",
+    "contribution_receipt_date",
+    "receipt_type",
+    "receipt_type_full",
+    "entity_type",
+]
+INTERNED_COMMITTEE_FIELDS = [
+    "name",
+    "committee_type",
+    "committee_type_full",
+    "designation",
+    "designation_full",
+    "party",
+    "state",
+]
+
 
 def parse_search_id(term):
     """Parse a search_id term. Returns (stripped_term, is_exact)."""
@@ -82,8 +103,10 @@ def is_exact_match(contrib, exact_terms):
 
 
 def process_contribution(contrib):
-    contribution = pick(contrib, PICKED_FIELDS)
-    committee_fields = pick(contrib["committee"], COMMITTEE_CONTRIBUTION_FIELDS)
+    contribution = pick(contrib, PICKED_FIELDS, INTERNED_FIELDS)
+    committee_fields = pick(
+        contrib["committee"], COMMITTEE_CONTRIBUTION_FIELDS, INTERNED_COMMITTEE_FIELDS
+    )
     committee_fields["committee_name"] = committee_fields["name"]
     del committee_fields["name"]
     contribution.update(committee_fields)
@@ -93,7 +116,7 @@ def process_contribution(contrib):
     return contribution
 
 
-def _should_skip(contrib, contrib_ids, ids_to_omit, exact_terms, search_param, occupation_allowlist):
+def _should_skip(contrib, contrib_ids, ids_to_omit, exact_terms, search_param, occupation_classifier):
     """Check if a contribution should be skipped."""
     if should_omit(contrib, contrib_ids, ids_to_omit):
         return True
@@ -106,22 +129,112 @@ def _should_skip(contrib, contrib_ids, ids_to_omit, exact_terms, search_param, o
         return True
     # If searching by employer, only include high-level individuals
     if search_param == "contributor_employer":
-        if not is_high_level_individual(contrib, occupation_allowlist):
+        if not is_high_level_individual(contrib, occupation_classifier):
             return True
     return False
 
 
-def _fetch_processed(
-    session,
-    search_param,
-    search_values,
-    contributions,
-    contrib_ids,
-    ids_to_omit,
-    exact_terms,
-    occupation_allowlist,
-):
-    """Fetch processed schedule_a contributions for a given search parameter."""
+def get_search_jobs(company, str_id):
+    """
+    Get the searches to run for a company, as (search_param, values, exact_terms) tuples. Exact terms (written as
+    ^term$ in search_id) are searched for like fuzzy ones, and then only rows that match them exactly are kept.
+    """
+    search_id = company.get("search_id", str_id.replace("-", " "))
+    if isinstance(search_id, list):
+        raw_search_ids = search_id
+    else:
+        raw_search_ids = [search_id]
+
+    # Parse into fuzzy and exact groups
+    fuzzy_ids = []
+    exact_ids = []
+    for term in raw_search_ids:
+        stripped, is_exact = parse_search_id(term)
+        if is_exact:
+            exact_ids.append(stripped)
+        else:
+            fuzzy_ids.append(stripped)
+
+    # Build search jobs: (param_name, values, exact_filter_terms or None)
+    search_jobs = []
+    if fuzzy_ids:
+        search_jobs.append(("contributor_name", fuzzy_ids, None))
+        search_jobs.append(("contributor_employer", fuzzy_ids, None))
+    if exact_ids:
+        search_jobs.append(("contributor_name", exact_ids, exact_ids))
+        search_jobs.append(("contributor_employer", exact_ids, exact_ids))
+    return search_jobs
+
+
+def plan_searches(search_jobs_by_company):
+    """
+    Plan the FEC queries for every company's search jobs, so that a search term used by more than one job (by related
+    companies, or as both a fuzzy and an exact term) is only queried once where that doesn't cost extra queries.
+
+    A shared term gets a query of its own, whose results are reused by every job that uses it, if it's used by more jobs
+    than would still need a query for their other terms. Splitting it out then replaces one query per job with the
+    shared query, rather than adding to each job's queries (e.g. jobs for [Alpha, Beta] and [Alpha, Gamma] keep one
+    query each, since splitting out Alpha would need three). The rest of a job's terms are queried together, as before.
+
+    Args:
+        search_jobs_by_company: Search jobs for each company, from get_search_jobs
+
+    Returns:
+        (queries, uses): The queries for each company's jobs, as {company_id: [(search_param, [query values],
+        exact_terms)]}, where each query is a tuple of terms; and the number of jobs using each shared query, keyed by
+        (search_param, query)
+    """
+    jobs = [
+        (str_id, search_param, search_values, exact_terms)
+        for str_id, search_jobs in search_jobs_by_company.items()
+        for search_param, search_values, exact_terms in search_jobs
+    ]
+    job_terms = [
+        {(search_param, term.upper()) for term in search_values}
+        for _, search_param, search_values, _ in jobs
+    ]
+    jobs_using_term = {}
+    for terms in job_terms:
+        for term in terms:
+            jobs_using_term[term] = jobs_using_term.get(term, 0) + 1
+
+    # Split out shared terms used by more jobs than would still need their own query for the rest of their terms. Not
+    # splitting out a term can leave other jobs with terms of their own, so repeat until no more terms are dropped.
+    split = {term for term, count in jobs_using_term.items() if count > 1}
+    while True:
+        jobs_with_rest = {}
+        for terms in job_terms:
+            if not terms <= split:
+                for term in terms & split:
+                    jobs_with_rest[term] = jobs_with_rest.get(term, 0) + 1
+        dropped = {
+            term for term in split if jobs_using_term[term] <= jobs_with_rest.get(term, 0)
+        }
+        if not dropped:
+            break
+        split -= dropped
+
+    queries = {str_id: [] for str_id in search_jobs_by_company}
+    uses = {}
+    for str_id, search_param, search_values, exact_terms in jobs:
+        job_queries = []
+        unshared = []
+        for term in search_values:
+            if (search_param, term.upper()) in split:
+                query = (term.upper(),)
+                if query not in job_queries:
+                    job_queries.append(query)
+                    uses[(search_param, query)] = uses.get((search_param, query), 0) + 1
+            else:
+                unshared.append(term)
+        if unshared:
+            job_queries.append(tuple(unshared))
+        queries[str_id].append((search_param, job_queries, exact_terms))
+    return queries, uses
+
+
+def _fetch_processed(session, search_param, search_values):
+    """Fetch pages of processed schedule_a contributions for a given search parameter."""
     last_index = None
     last_contribution_receipt_date = None
     contribs_count = 0
@@ -144,13 +257,7 @@ def _fetch_processed(
             continue
 
         contribs_count += contribution_data["pagination"]["per_page"]
-        results = contribution_data["results"]
-        ids_to_omit.update(get_ids_to_omit(results))
-        for contrib in results:
-            if _should_skip(contrib, contrib_ids, ids_to_omit, exact_terms, search_param, occupation_allowlist):
-                continue
-            contributions.append(process_contribution(contrib))
-            contrib_ids.add(contrib["transaction_id"])
+        yield contribution_data["results"]
 
         if contribs_count >= contribution_data["pagination"]["count"]:
             break
@@ -161,19 +268,9 @@ def _fetch_processed(
             ]["last_contribution_receipt_date"]
 
 
-def _fetch_efiled(
-    session,
-    search_param,
-    search_values,
-    contributions,
-    contrib_ids,
-    ids_to_omit,
-    exact_terms,
-    occupation_allowlist,
-):
-    """Fetch e-filed schedule_a contributions for a given search parameter."""
+def _fetch_efiled(session, search_param, search_values):
+    """Fetch pages of e-filed schedule_a contributions for a given search parameter."""
     page = 1
-    contribs_count = 0
     while True:
         data = FEC_fetch(
             session,
@@ -192,14 +289,7 @@ def _fetch_efiled(
         if not data:
             continue
 
-        contribs_count += data["pagination"]["per_page"]
-        results = data["results"]
-        ids_to_omit.update(get_ids_to_omit(results))
-        for contrib in results:
-            if _should_skip(contrib, contrib_ids, ids_to_omit, exact_terms, search_param, occupation_allowlist):
-                continue
-            contributions.append({**process_contribution(contrib), "efiled": True})
-            contrib_ids.add(contrib["transaction_id"])
+        yield data["results"]
 
         if page >= data["pagination"]["pages"]:
             break
@@ -207,12 +297,80 @@ def _fetch_efiled(
             page += 1
 
 
-def update_spending_by_company(db, session):
+def _get_pages(session, search_param, query, efiled, uses, shared_pages):
+    """
+    Get the pages of results for a planned query. Results of shared queries are kept until the last job using them
+    has read them.
+    """
+    fetch = _fetch_efiled if efiled else _fetch_processed
+    key = (search_param, query)
+    if key not in uses:
+        return fetch(session, search_param, list(query))
+    cache_key = (search_param, query, efiled)
+    if cache_key not in shared_pages:
+        shared_pages[cache_key] = [uses[key], list(fetch(session, search_param, list(query)))]
+    entry = shared_pages[cache_key]
+    entry[0] -= 1
+    if entry[0] == 0:
+        del shared_pages[cache_key]
+    return entry[1]
+
+
+def _add_contributions(
+    results,
+    contributions,
+    contrib_ids,
+    ids_to_omit,
+    exact_terms,
+    search_param,
+    occupation_classifier,
+    efiled,
+):
+    """Add a page of results to a company's contributions."""
+    ids_to_omit.update(get_ids_to_omit(results))
+    for contrib in results:
+        if _should_skip(contrib, contrib_ids, ids_to_omit, exact_terms, search_param, occupation_classifier):
+            continue
+        if efiled:
+            contributions.append({**process_contribution(contrib), "efiled": True})
+        else:
+            contributions.append(process_contribution(contrib))
+        contrib_ids.add(contrib["transaction_id"])
+
+
+def update_spending_by_company(
+    db, session, company_ids=None, changes=None, checkpoint=None, changelog=None
+):
+    """
+    Fetch contributions made by each tracked company and its employees into rawCompanyContributions.
+
+    Searches are planned across all companies first (see plan_searches), so search terms shared between companies are
+    only queried once. If company_ids is provided, only those companies are fetched. If a ChangeSet is provided,
+    companies whose stored contributions changed are recorded in it. If a TaskCheckpoint is provided, companies
+    completed by a failed earlier attempt are skipped. If a Changelog is provided, added, removed, and amended
+    contributions are recorded in it.
+    """
+    if changes is not None:
+        changes.track("companies")
+    search_jobs_by_company = {}
     for str_id, company in db.companies.items():
+        if company_ids is not None and str_id not in company_ids:
+            continue
+        if checkpoint is not None and checkpoint.is_completed(str_id):
+            if changes is not None:
+                # Whether this company changed was only known to the failed attempt
+                changes.invalidate("companies")
+            continue
+        search_jobs_by_company[str_id] = get_search_jobs(company, str_id)
+    queries, uses = plan_searches(search_jobs_by_company)
+    shared_pages = {}
+
+    for str_id in search_jobs_by_company:
+        company = db.companies[str_id]
         # Sync companies with the constants dict
         related_individuals = [
             individual
-            for str_id, individual in db.individuals.items()
+            for individual in db.individuals.values()
             if company["name"] in individual.get("company", [])
         ]
         related_individuals.sort(key=lambda x: x.get("title", "zzz"))
@@ -222,58 +380,45 @@ def update_spending_by_company(db, session):
                 "relatedIndividuals": related_individuals,
             }
         )
-        search_id = company.get("search_id", str_id.replace("-", " "))
-        if isinstance(search_id, list):
-            raw_search_ids = search_id
-        else:
-            raw_search_ids = [search_id]
-
-        # Parse into fuzzy and exact groups
-        fuzzy_ids = []
-        exact_ids = []
-        for term in raw_search_ids:
-            stripped, is_exact = parse_search_id(term)
-            if is_exact:
-                exact_ids.append(stripped)
-            else:
-                fuzzy_ids.append(stripped)
-
-        # Build search jobs: (param_name, values, exact_filter_terms or None)
-        search_jobs = []
-        if fuzzy_ids:
-            search_jobs.append(("contributor_name", fuzzy_ids, None))
-            search_jobs.append(("contributor_employer", fuzzy_ids, None))
-        if exact_ids:
-            search_jobs.append(("contributor_name", exact_ids, exact_ids))
-            search_jobs.append(("contributor_employer", exact_ids, exact_ids))
 
         contributions = []
         contrib_ids = set()
         # Initialize with company-specific duplicates from database (same as individuals.py)
         ids_to_omit = set(db.duplicate_contributions.get(str_id, []))
 
-        for search_param, search_values, exact_terms in search_jobs:
-            _fetch_processed(
-                session,
-                search_param,
-                search_values,
-                contributions,
-                contrib_ids,
-                ids_to_omit,
-                exact_terms,
-                db.occupation_allowlist,
-            )
-            _fetch_efiled(
-                session,
-                search_param,
-                search_values,
-                contributions,
-                contrib_ids,
-                ids_to_omit,
-                exact_terms,
-                db.occupation_allowlist,
+        for search_param, job_queries, exact_terms in queries[str_id]:
+            for efiled in (False, True):
+                for query in job_queries:
+                    for results in _get_pages(
+                        session, search_param, query, efiled, uses, shared_pages
+                    ):
+                        _add_contributions(
+                            results,
+                            contributions,
+                            contrib_ids,
+                            ids_to_omit,
+                            exact_terms,
+                            search_param,
+                            db.occupation_classifier,
+                            efiled,
+                        )
+
+        if changes is not None or changelog is not None:
+            old = read_chunked(db, "rawCompanyContributions", str_id)
+            diff = diff_records(
+                key_records(old["contributions"], "transaction_id") if old else None,
+                key_records(contributions, "transaction_id"),
             )
-
-        db.client.collection("rawCompanyContributions").document(str_id).set(
-            {"contributions": contributions}
+            if changes is not None and (not old or diff):
+                changes.record("companies", [str_id])
+            if changelog is not None:
+                changelog.record("rawCompanyContributions", str_id, diff)
+        write_chunked(
+            db,
+            "rawCompanyContributions",
+            str_id,
+            {"contributions": contributions},
+            "contributions",
         )
+        if checkpoint is not None:
+            checkpoint.mark_completed(str_id)
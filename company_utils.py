@@ -5,6 +5,31 @@ from requests_cache import CachedSession
 from get_missing_recipients import get_missing_recipient_data
 
 
+def get_company_ids_for_individuals(db, individual_ids):
+    """
+    Get the IDs of companies associated with any of the given individuals.
+
+    Individuals reference companies by name, so this maps those names back to company IDs.
+
+    Args:
+        db: Database instance with constants loaded
+        individual_ids: Iterable of individual IDs
+
+    Returns:
+        set: IDs of the associated companies
+    """
+    company_names = set()
+    for ind_id in individual_ids:
+        individual = db.individuals.get(ind_id)
+        if individual and "company" in individual:
+            company_names.update(individual["company"])
+    return {
+        company_id
+        for company_id, company in db.companies.items()
+        if company["name"] in company_names
+    }
+
+
 def update_company_contributions_selective(db, company_ids):
     """
     Update company contributions for only specific companies.
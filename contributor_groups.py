@@ -0,0 +1,125 @@
+"""
+Resolve the group a contribution is listed under on a committee's page, and the page the group links to.
+
+Contributions are grouped by employer, or by contributor when the employer isn't meaningful (self-employed, retired,
+etc.). Groups are linked to the tracked company, committee, or individual they match, if any.
+"""
+
+from utils import compare_names_lastfirst
+
+
+class ContributorGroupResolver:
+    """
+    Memoized resolution of (employer, contributor name) to (group, link), shared by the processing stages.
+
+    The same employers and contributors recur across every committee's contributions, so each distinct pair is only
+    resolved once per run. The memo is cleared if the constants it depends on are replaced on the Database (as the
+    commands do when processing a single company or individual).
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.hits = 0
+        self.misses = 0
+        self._sources = None
+        self._groups = {}
+        self._normalized_names = {}
+        self._company_links = {}
+        self._committee_links = {}
+
+    def _check_sources(self):
+        db = self.db
+        sources = (
+            db.individual_employers,
+            db.company_aliases,
+            db.companies,
+            db.committees,
+            db.individuals,
+        )
+        if self._sources is not None and all(a is b for a, b in zip(sources, self._sources)):
+            return
+        self._sources = sources
+        self._groups = {}
+        # Companies and committees are matched by upper case name; the first match wins, as when searching in order
+        self._company_links = {}
+        for company in db.companies.values():
+            for name in [company["name"]] + company.get("aliases", []):
+                self._company_links.setdefault(name.upper(), "/companies/" + company["id"])
+        self._committee_links = {}
+        for committee in db.committees.values():
+            self._committee_links.setdefault(committee["name"].upper(), "/committees/" + committee["id"])
+
+    def resolve(self, employer, contributor_name):
+        """
+        Get the group for a contribution and the page it links to.
+
+        Args:
+            employer: contributor_employer of the contribution
+            contributor_name: contributor_name of the contribution
+
+        Returns:
+            (group, link): link is None if the group isn't a tracked company, committee, or individual
+        """
+        self._check_sources()
+        key = (employer, contributor_name)
+        resolved = self._groups.get(key)
+        if resolved is not None:
+            self.hits += 1
+            return resolved
+        self.misses += 1
+        group = self._get_group(employer, contributor_name)
+        resolved = (group, self._get_link(group))
+        self._groups[key] = resolved
+        return resolved
+
+    def _get_group(self, employer, contributor_name):
+        db = self.db
+        if employer and employer != "N/A":
+            group = employer
+        else:
+            group = contributor_name
+        if group and group in db.individual_employers:
+            group = contributor_name
+        elif not group:
+            group = "UNKNOWN"
+        elif group in db.company_aliases:
+            group = db.company_aliases[group]
+        return group
+
+    def _get_link(self, group):
+        link = self._company_links.get(group) or self._committee_links.get(group)
+        if not link and group and "," in group:
+            for individual in self.db.individuals.values():
+                if compare_names_lastfirst(individual["name"], group):
+                    link = "/individuals/" + individual["id"]
+                    break
+        return link
+
+    def normalize_name(self, contributor_name):
+        """
+        Normalize a contributor name for grouping contributions by contributor: upper case, and without middle names
+        ("LAST, FIRST MIDDLE" -> "LAST, FIRST").
+        """
+        normalized = self._normalized_names.get(contributor_name)
+        if normalized is not None:
+            self.hits += 1
+            return normalized
+        self.misses += 1
+        normalized = contributor_name.upper()
+        if ", " in contributor_name:
+            parts = contributor_name.split(", ", 1)
+            if len(parts) == 2:
+                last = parts[0].upper()
+                first_parts = parts[1].split()
+                if first_parts:
+                    first = first_parts[0].upper()
+                    normalized = f"{last}, {first}"
+        self._normalized_names[contributor_name] = normalized
+        return normalized
+
+    def format_stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0
+        return "{} lookups, {:.1%} hit rate, {} groups and {} names memoized".format(
+            lookups, hit_rate, len(self._groups), len(self._normalized_names)
+        )
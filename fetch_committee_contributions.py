@@ -1,4 +1,6 @@
-from utils import FEC_fetch, pick
+from chunked_documents import read_chunked, write_chunked
+from pipeline_core.changelog import diff_records, key_records
+from utils import FEC_fetch, intern_fields, pick
 import re
 
 CONTRIBUTION_FIELDS = [
@@ -20,6 +22,26 @@ CONTRIBUTION_FIELDS = [
     "transaction_id",
 ]
 
+# Fields whose values repeat across a committee's contributions, and are interned to save memory (see utils.pick)
+INTERNED_FIELDS = [
+    "contributor_occupation",
+    "contributor_employer",
+    "entity_type",
+    "contribution_receipt_date",
+    "line_number",
+    "receipt_type",
+    "receipt_type_full",
+]
+
+
+CHILD_TRANSACTION_ID = re.compile(r"^(.*?)\.\d$")
+
+
+def get_parent_id(transaction_id):
+    """Get the ID of the transaction that this one is a more granular report of (SA17.4457.0 -> SA17.4457), if any."""
+    m = CHILD_TRANSACTION_ID.match(transaction_id)
+    return m.group(1) if m else None
+
 
 def get_ids_to_omit(contribs):
     """Dedupe contributions, refunds, etc."""
@@ -30,15 +52,73 @@ def get_ids_to_omit(contribs):
         # These are typically instances in which the committee has reported the dollar equivalent and the in-kind
         # contribution separately for the same contribution, or where a transaction from multiple people has been
         # reported as a group and then individually.
-        m = re.match(r"^(.*?)\.\d$", t_id)
-        if m:
-            if m.group(1) in transaction_ids:
-                to_omit.add(m.group(1))
+        parent_id = get_parent_id(t_id)
+        if parent_id is not None and parent_id in transaction_ids:
+            to_omit.add(parent_id)
     return to_omit
 
 
+class ContributionDeduplicator:
+    """
+    Streaming dedupe of one committee's contributions, across all pages of processed and efiled results.
+
+    Parents of more granularly reported transactions (see get_ids_to_omit) are omitted wherever their children turn up:
+    a parent seen after one of its children is skipped, and a parent that was kept before one of its children turned
+    up on a later page is retracted. Only transaction IDs and the positions of kept contributions are indexed, so
+    nothing has to be buffered beyond the list of contributions being built.
+    """
+
+    def __init__(self, ids_to_omit=()):
+        self.ids_to_omit = set(ids_to_omit)  # Manually excluded transactions, and parents found so far
+        self.contrib_ids = set()  # Processed transactions kept so far, which later duplicates are omitted for
+        self.contributions = []  # Kept contributions, with None in place of retracted ones
+        self.retracted = 0
+        self._positions = {}  # Transaction ID -> positions in contributions
+
+    def add_page(self, results):
+        """Index the transaction IDs in a page of results before its contributions are added."""
+        for contrib in results:
+            parent_id = get_parent_id(contrib["transaction_id"])
+            if parent_id is None or parent_id in self.ids_to_omit:
+                continue
+            self.ids_to_omit.add(parent_id)
+            for position in self._positions.pop(parent_id, []):
+                # Kept before its child turned up on a later page
+                self.contributions[position] = None
+                self.retracted += 1
+
+    def should_omit(self, contrib):
+        return should_omit(contrib, self.contrib_ids, self.ids_to_omit)
+
+    def add(self, contrib, record):
+        """
+        Keep a contribution.
+
+        Args:
+            contrib: Contribution as returned by the FEC API
+            record: What to store for it
+        """
+        self._positions.setdefault(contrib["transaction_id"], []).append(
+            len(self.contributions)
+        )
+        self.contributions.append(record)
+        if not record.get("efiled"):
+            # Efiled contributions are only checked against processed ones
+            self.contrib_ids.add(contrib["transaction_id"])
+
+    def records(self):
+        """Get the kept contributions, in the order they were added."""
+        if not self.retracted:
+            return self.contributions
+        return [record for record in self.contributions if record is not None]
+
+
 def should_omit(contrib, other_contribs, ids_to_omit):
     """Omit any duplicate contributions, refunds, etc."""
+    if contrib["transaction_id"] in ids_to_omit:
+        # Manually excluded transaction, or a parent of a more granularly reported transaction. Checked first, since
+        # parents are often line 17 in-kind contributions, which would otherwise be kept below.
+        return True
     if contrib["line_number"] in ["15", "16"]:
         return True
     if contrib["line_number"] == "17":
@@ -49,9 +129,6 @@ def should_omit(contrib, other_contribs, ids_to_omit):
             if "CONTRIBUTION" in receipt_type_full.upper():
                 return False
         return True
-    if contrib["transaction_id"] in ids_to_omit:
-        # Manually excluded transaction, or a parent of a more granularly reported transaction
-        return True
     if contrib["transaction_id"] in other_contribs:
         # Duplicate of a transaction we've already encountered
         return True
@@ -63,27 +140,37 @@ def should_omit(contrib, other_contribs, ids_to_omit):
     return False
 
 
-def update_committee_contributions(db, session):
+def update_committee_contributions(
+    db, session, changes=None, checkpoint=None, changelog=None
+):
     """
-    This stores contributions (with a trimmed set of fields) in the "rawContributions" collection in Firestore. Those
+    This stores contributions (with a trimmed set of fields) in the "rawContributions" collection in Firestore, split
+    into chunks (see chunked_documents.py). Those
     contributions will later be processed in process_committee_contributions.py into a format that saves computation
     on the frontend (doing rollups, redactions, etc.)
 
     This function fetches both processed and efiled contributions.
+
+    If a ChangeSet is provided, committees whose stored transactions changed are recorded in it. If a TaskCheckpoint
+    is provided, each committee is checkpointed once stored, and committees completed by a failed earlier attempt are
+    skipped. If a Changelog is provided, inserted, updated, and deleted transactions are recorded in it.
     """
+    if changes is not None:
+        changes.track("committees")
 
     committee_ids = [committee["id"] for committee in db.committees.values()]
     new_contributions = {}
     for committee_id in committee_ids:
-        contributions = []
+        if checkpoint is not None and checkpoint.is_completed(committee_id):
+            if changes is not None:
+                # Whether this committee changed was only known to the failed attempt
+                changes.invalidate("committees")
+            continue
         last_index = None
         last_contribution_receipt_date = None
         contribs_count = 0
-        contrib_ids = set()
-        ids_to_omit = (
-            set(db.duplicate_contributions[committee_id])
-            if committee_id in db.duplicate_contributions
-            else set()
+        dedupe = ContributionDeduplicator(
+            db.duplicate_contributions.get(committee_id, [])
         )
 
         # First fetch processed contributions
@@ -107,14 +194,11 @@ def update_committee_contributions(db, session):
 
             contribs_count += data["pagination"]["per_page"]
             results = data["results"]
-            ids_to_omit = ids_to_omit.union(get_ids_to_omit(results))
-            # TODO Edge case with duplicates that exist across pages?
-
+            dedupe.add_page(results)
             for contrib in results:
-                if should_omit(contrib, contrib_ids, ids_to_omit):
+                if dedupe.should_omit(contrib):
                     continue
-                contributions.append(pick(contrib, CONTRIBUTION_FIELDS))
-                contrib_ids.add(contrib["transaction_id"])
+                dedupe.add(contrib, pick(contrib, CONTRIBUTION_FIELDS, INTERNED_FIELDS))
 
             # Fetch more pages if they exist, or break
             if contribs_count >= data["pagination"]["count"]:
@@ -147,9 +231,9 @@ def update_committee_contributions(db, session):
 
             contribs_count += data["pagination"]["per_page"]
             results = data["results"]
-            ids_to_omit = ids_to_omit.union(get_ids_to_omit(results))
+            dedupe.add_page(results)
             for contrib in results:
-                if should_omit(contrib, contrib_ids, ids_to_omit):
+                if dedupe.should_omit(contrib):
                     continue
                 picked = pick(contrib, CONTRIBUTION_FIELDS)
                 picked["efiled"] = True
@@ -161,7 +245,7 @@ def update_committee_contributions(db, session):
 
                 # When the contributor name is a company, it has trailing commas. Strip them.
                 picked["contributor_name"] = picked["contributor_name"].strip(",")
-                contributions.append(picked)
+                dedupe.add(contrib, intern_fields(picked, INTERNED_FIELDS))
 
             # Fetch more pages if they exist, or break
             if page >= data["pagination"]["pages"]:
@@ -169,22 +253,29 @@ def update_committee_contributions(db, session):
             else:
                 page += 1
 
+        contributions = dedupe.records()
+
         # Diff with previously stored transactions and store any new transactions
-        old = (
-            db.client.collection("rawContributions")
-            .document(committee_id)
-            .get()
-            .to_dict()
+        old = read_chunked(db, "rawContributions", committee_id)
+        diff = diff_records(
+            key_records(old["transactions"], "transaction_id") if old else None,
+            key_records(contributions, "transaction_id"),
         )
         if old:
-            old_ids = set([x["transaction_id"] for x in old["transactions"]])
-            diff_ids = contrib_ids.difference(old_ids)
-            if diff_ids:
-                for diff_id in diff_ids:
-                    new_contributions[diff_id] = next(
-                        x for x in contributions if x["transaction_id"] == diff_id
-                    )
-        db.client.collection("rawContributions").document(committee_id).set(
-            {"transactions": contributions}
+            for contrib in diff.inserted.values():
+                new_contributions[contrib["transaction_id"]] = contrib
+        if changes is not None and (not old or diff):
+            # Catches amended and removed transactions as well as new ones
+            changes.record("committees", [committee_id])
+        if changelog is not None:
+            changelog.record("rawContributions", committee_id, diff)
+        write_chunked(
+            db,
+            "rawContributions",
+            committee_id,
+            {"transactions": contributions},
+            "transactions",
         )
+        if checkpoint is not None:
+            checkpoint.mark_completed(committee_id)
     return new_contributions
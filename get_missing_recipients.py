@@ -1,36 +1,83 @@
 import logging
 from states import SINGLE_MEMBER_STATES
-from utils import chunk, FEC_fetch, pick
+from utils import pick
 
+RECIPIENT_COMMITTEE_FIELDS = [
+    "name",
+    "party",
+    "state",
+    "designation_full",
+    "committee_type_full",
+    "candidate_ids",
+    "sponsor_candidate_ids",
+]
 
-def race_has_candidate(race, candidate_id):
-    return any(
-        candidate_id == c.get("candidate_id", None) for c in race["candidates"].values()
-    )
+
+def build_race_index(race_docs):
+    """
+    Index the candidates in raceDetails by the races they're in.
+
+    Args:
+        race_docs: raceDetails documents, as streamed
+
+    Returns:
+        Dict of {candidate_id: set of race IDs}, with race IDs like "AZ-S" or "AZ-H-01-special"
+    """
+    race_index = {}
+    for doc in race_docs:
+        state, state_data = doc.id, doc.to_dict() or {}
+        for race_key, race in state_data.items():
+            for candidate in race.get("candidates", {}).values():
+                candidate_id = candidate.get("candidate_id")
+                if candidate_id:
+                    race_index.setdefault(candidate_id, set()).add(f"{state}-{race_key}")
+    return race_index
+
+
+def get_race_index(db):
+    """Get the race index, streaming raceDetails to build it the first time it's needed in a run."""
+    if db.race_index is None:
+        db.race_index = build_race_index(db.client.collection("raceDetails").stream())
+    return db.race_index
+
+
+def get_race_link(race_index, candidate_id, candidate):
+    """Get the link to the race a candidate is running in: the regular election if they're in it, else the special."""
+    races = race_index.get(candidate_id)
+    if not races:
+        return None
+    if candidate["office"] == "S":
+        race_id = f"{candidate['state']}-S"
+    elif candidate["office"] == "H":
+        district = (
+            candidate["district"] if candidate["state"] not in SINGLE_MEMBER_STATES else "01"
+        )
+        race_id = f"{candidate['state']}-H-{district}"
+    else:
+        return None
+    for race_id in (race_id, f"{race_id}-special"):
+        if race_id in races:
+            return f"/elections/{race_id}"
+    return None
 
 
 def get_missing_recipient_data(recipients, db, session):
     committee_data = {}
 
     needs_data_ids = [k for k, v in recipients.items() if v.get("needs_data", False)]
-    for ids_chunk in chunk(needs_data_ids, 10):
-        data = FEC_fetch(
-            session,
-            "committee",
-            "https://api.open.fec.gov/v1/committees/",
-            params={"committee_id": ids_chunk},
-        )
-        for committee in data["results"]:
-            committee_id = committee["committee_id"]
-            committee_data[committee_id] = {
-                "committee_name": committee["name"],
-                "party": committee["party"],
-                "state": committee["state"],
-                "designation_full": committee["designation_full"],
-                "committee_type_full": committee["committee_type_full"],
-                "candidate_ids": committee["candidate_ids"],
-                "sponsor_candidate_ids": committee["sponsor_candidate_ids"],
-            }
+    committees = db.committee_store.get_committees(
+        session, needs_data_ids, RECIPIENT_COMMITTEE_FIELDS
+    )
+    for committee_id, committee in committees.items():
+        committee_data[committee_id] = {
+            "committee_name": committee["name"],
+            "party": committee["party"],
+            "state": committee["state"],
+            "designation_full": committee["designation_full"],
+            "committee_type_full": committee["committee_type_full"],
+            "candidate_ids": committee["candidate_ids"],
+            "sponsor_candidate_ids": committee["sponsor_candidate_ids"],
+        }
 
     candidate_data = {}
     for recipient_id in recipients.keys():
@@ -72,66 +119,27 @@ def get_missing_recipient_data(recipients, db, session):
                 ):
                     candidate_data[candidate_id] = {}
 
-    for ids_chunk in chunk(list(candidate_data.keys()), 10):
-        data = FEC_fetch(
-            session,
-            "candidate",
-            "https://api.open.fec.gov/v1/candidates/",
-            params={"candidate_id": ids_chunk},
+    candidates = db.candidate_store.get_candidates(session, candidate_data.keys())
+    race_index = get_race_index(db) if candidates else {}
+    for candidate_id, candidate in candidates.items():
+        candidate_data[candidate_id] = pick(
+            candidate,
+            [
+                "name",
+                "party",
+                "state",
+                "office",
+                "district",
+                "incumbent_challenge",
+                "election_years",
+            ],
+        )
+        candidate_data[candidate_id]["isRunningThisCycle"] = (
+            2026 in candidate["election_years"]
         )
-        for candidate in data["results"]:
-            candidate_id = candidate["candidate_id"]
-            candidate_data[candidate_id] = pick(
-                candidate,
-                [
-                    "name",
-                    "party",
-                    "state",
-                    "office",
-                    "district",
-                    "incumbent_challenge",
-                    "election_years",
-                ],
-            )
-            candidate_data[candidate_id]["isRunningThisCycle"] = (
-                2026 in candidate["election_years"]
-            )
-            race_doc = (
-                db.client.collection("raceDetails").document(candidate["state"]).get()
-            )
-            race_data = race_doc.to_dict() if race_doc.exists else None
-            if race_data:
-                if candidate["office"] == "S":
-                    if "S" in race_data and race_has_candidate(
-                        race_data["S"], candidate_id
-                    ):
-                        candidate_data[candidate_id][
-                            "race_link"
-                        ] = f"/elections/{candidate['state']}-S"
-                    elif "S-special" in race_data and race_has_candidate(
-                        race_data["S-special"], candidate_id
-                    ):
-                        candidate_data[candidate_id][
-                            "race_link"
-                        ] = f"/elections/{candidate['state']}-S-special"
-                elif candidate["office"] == "H":
-                    district = (
-                        candidate["district"]
-                        if candidate["state"] not in SINGLE_MEMBER_STATES
-                        else "01"
-                    )
-                    if f"H-{district}" in race_data and race_has_candidate(
-                        race_data[f"H-{district}"], candidate_id
-                    ):
-                        candidate_data[candidate_id][
-                            "race_link"
-                        ] = f"/elections/{candidate['state']}-H-{district}"
-                    elif f"H-{district}-special" in race_data and race_has_candidate(
-                        race_data[f"H-{district}-special"], candidate_id
-                    ):
-                        candidate_data[candidate_id][
-                            "race_link"
-                        ] = f"/elections/{candidate['state']}-H-{district}-special"
+        race_link = get_race_link(race_index, candidate_id, candidate)
+        if race_link:
+            candidate_data[candidate_id]["race_link"] = race_link
 
     for recipient_id in recipients.keys():
         related_candidates = recipients[recipient_id].get("candidate_ids", []) or []
@@ -1,5 +1,15 @@
+import re
+from unidecode import unidecode
+
+from chunked_documents import read_chunked, write_chunked
 from company_spending import parse_search_id, process_contribution
-from utils import FEC_fetch
+from pipeline_core.changelog import diff_records, key_records
+from utils import FEC_fetch, chunk
+
+MAX_BATCH_NAMES = 10  # Individuals searched for in one multi-name Schedule A query
+EXCLUDED_COMMITTEES = ["C00694323", "C00401224"]  # WinRed & ActBlue
+
+WORD = re.compile(r"[A-Z0-9]+")
 
 
 def get_associated_company_ids(individual, companies):
@@ -54,128 +64,264 @@ def get_individual_search_params(individual, companies, efiled=False):
     return search_params
 
 
-def update_spending_by_individuals(db, session):
-    for str_id, individual in db.individuals.items():
-        old_contributions_dict = (
-            db.client.collection("rawIndividualContributions")
-            .document(str_id)
-            .get()
-            .to_dict()
+def get_words(value):
+    return set(WORD.findall(unidecode(str(value)).upper()))
+
+
+def matches_words(term_words, value_words):
+    """Check that every word of a term starts one of the value's words, e.g. "SAM" matches "SAMUEL"."""
+    return all(
+        term_word in value_words
+        or any(value_word.startswith(term_word) for value_word in value_words)
+        for term_word in term_words
+    )
+
+
+def matches_search_term(value, terms):
+    """
+    Match a value the way the FEC's full-text filters do: every word of one of the terms is a prefix of a word in it,
+    in any order. For example, "Sam Bankman Fried" matches "BANKMAN-FRIED, SAMUEL", and "New York" matches
+    "NEW YORK CITY".
+    """
+    if not value:
+        return False
+    value_words = get_words(value)
+    return any(matches_words(get_words(term), value_words) for term in terms)
+
+
+def matches_search_params(contrib, search_params):
+    """Check whether a contribution would have been returned by a Schedule A query with these search params."""
+    for param, values in search_params.items():
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        value = contrib.get(param)
+        if param == "contributor_zip":
+            if not value or not any(str(value).startswith(prefix) for prefix in values):
+                return False
+        elif not matches_search_term(value, values):
+            return False
+    return True
+
+
+def get_search_batches(search_params_by_id, max_names=MAX_BATCH_NAMES):
+    """
+    Group individuals into multi-name Schedule A queries.
+
+    Individuals are batched together if they're searched for with the same kinds of filters (e.g. name and zip code,
+    or name and employer). A batch's query searches for any of their names, with any of their filter values, so it
+    returns everything their separate queries would have, plus some rows (e.g. one individual's name at another's
+    employer) that are dropped when the results are matched back to each individual.
+
+    Args:
+        search_params_by_id: Search params for each individual, from get_individual_search_params
+        max_names: Most individuals to search for in one query
+
+    Returns:
+        List of (individual IDs, search params) for each query
+    """
+    groups = {}
+    for str_id, search_params in search_params_by_id.items():
+        filters = tuple(
+            sorted(k for k, v in search_params.items() if k != "contributor_name" and v)
         )
-        if old_contributions_dict:
-            old_contribution_ids = set(
-                x["transaction_id"]
-                for x in old_contributions_dict.get("contributions", [])
-            )
+        groups.setdefault(filters, []).append(str_id)
+
+    batches = []
+    for filters, str_ids in groups.items():
+        for batch_ids in chunk(str_ids, max_names):
+            batch_params = {}
+            for str_id in batch_ids:
+                for param in ("contributor_name",) + filters:
+                    values = search_params_by_id[str_id][param]
+                    batch_values = batch_params.setdefault(param, [])
+                    for value in values if isinstance(values, list) else [values]:
+                        if value not in batch_values:
+                            batch_values.append(value)
+            batches.append((batch_ids, batch_params))
+    return batches
+
+
+def fetch_processed_contributions(session, search_params):
+    """Fetch processed Schedule A contributions matching the search params."""
+    last_index = None
+    last_contribution_receipt_date = None
+    contribs_count = 0
+    while True:
+        contribution_data = FEC_fetch(
+            session,
+            "committee contributions",
+            "https://api.open.fec.gov/v1/schedules/schedule_a/",
+            params={
+                **search_params,
+                "two_year_transaction_period": "2026",
+                "per_page": "100",
+                "sort": "-contribution_receipt_date",
+                "last_index": last_index,
+                "last_contribution_receipt_date": last_contribution_receipt_date,
+                "min_amount": 1000
+            },
+        )
+        if not contribution_data:
+            continue
+
+        contribs_count += contribution_data["pagination"]["per_page"]
+        yield from contribution_data["results"]
+
+        # Fetch more pages if they exist, or break
+        if contribs_count >= contribution_data["pagination"]["count"]:
+            break
+        else:
+            last_index = contribution_data["pagination"]["last_indexes"]["last_index"]
+            last_contribution_receipt_date = contribution_data["pagination"][
+                "last_indexes"
+            ]["last_contribution_receipt_date"]
+
+
+def fetch_efiled_contributions(session, search_params):
+    """Fetch efiled Schedule A contributions matching the search params."""
+    page = 1
+    while True:
+        data = FEC_fetch(
+            session,
+            "unprocessed committee contributions",
+            "https://api.open.fec.gov/v1/schedules/schedule_a/efile",
+            params={
+                **search_params,
+                "min_date": "2025-01-01",
+                "per_page": 100,
+                "sort": "-contribution_receipt_date",
+                "page": page,
+                "min_amount": 1000
+            },
+        )
+
+        if not data:
+            continue
+
+        yield from data["results"]
+
+        # Fetch more pages if they exist, or break
+        if page >= data["pagination"]["pages"]:
+            break
         else:
-            old_contribution_ids = set()
+            page += 1
+
+
+def fetch_batch_contributions(session, search_params_by_id, ids_to_omit, contributions, efiled=False):
+    """
+    Fetch contributions for a set of individuals with multi-name queries, and add each one to the contributions of the
+    individual(s) it matches.
+
+    Args:
+        session: Requests session
+        search_params_by_id: Search params for each individual
+        ids_to_omit: Transaction IDs to skip for each individual
+        contributions: Lists of contributions for each individual, added to in place
+        efiled: Whether to fetch from the efiled endpoint
+    """
+    fetch = fetch_efiled_contributions if efiled else fetch_processed_contributions
+    for batch_ids, batch_params in get_search_batches(search_params_by_id):
+        for contrib in fetch(session, batch_params):
+            if contrib["committee_id"] in EXCLUDED_COMMITTEES:
+                continue
+            processed = None
+            for str_id in batch_ids:
+                if contrib["transaction_id"] in ids_to_omit[str_id]:
+                    # Duplicate transaction
+                    continue
+                if len(batch_ids) > 1 and not matches_search_params(
+                    contrib, search_params_by_id[str_id]
+                ):
+                    continue
+                if processed is None:
+                    processed = process_contribution(contrib)
+                    if efiled:
+                        processed["efiled"] = True
+                contributions[str_id].append(processed)
+
+
+def update_spending_by_individuals(
+    db, session, individual_ids=None, changes=None, checkpoint=None, changelog=None
+):
+    """
+    Fetch processed and efiled contributions for each tracked individual into rawIndividualContributions.
 
-        new_contributions = []
-        contributions_data = {"contributions": [], "associatedCompany": []}
+    Individuals are searched for in batches, with multi-name queries (see get_search_batches), and the results are
+    matched back to each individual. If individual_ids is provided, only those individuals are fetched. If a ChangeSet
+    is provided, individuals whose stored contributions changed are recorded in it. If a TaskCheckpoint is provided,
+    individuals completed by a failed earlier attempt are skipped. If a Changelog is provided, added, removed, and
+    amended contributions are recorded in it.
+    Returns the list of contributions not seen in a previous run.
+    """
+    if changes is not None:
+        changes.track("individuals")
+    new_contributions = []
+    search_params_by_id = {}
+    efiled_search_params_by_id = {}
+    associated_companies_by_id = {}
+    for str_id, individual in db.individuals.items():
+        if individual_ids is not None and str_id not in individual_ids:
+            continue
+        if checkpoint is not None and checkpoint.is_completed(str_id):
+            if changes is not None:
+                # Whether this individual changed was only known to the failed attempt
+                changes.invalidate("individuals")
+            continue
         associated_companies = get_associated_company_ids(
             individual, db.companies.values()
         )
-        if associated_companies:
-            contributions_data["associatedCompany"] = associated_companies
-
-        ids_to_omit = set(db.duplicate_contributions.get(str_id, []))
-        last_index = None
-        last_contribution_receipt_date = None
-        contribs_count = 0
-        search_params = get_individual_search_params(
-            individual, [db.companies[company] for company in associated_companies]
+        companies = [db.companies[company] for company in associated_companies]
+        associated_companies_by_id[str_id] = associated_companies
+        search_params_by_id[str_id] = get_individual_search_params(individual, companies)
+        efiled_search_params_by_id[str_id] = get_individual_search_params(
+            individual, companies, efiled=True
         )
 
-        # Get regularly filed contributions for individual
-        while True:
-            contribution_data = FEC_fetch(
-                session,
-                "committee contributions",
-                "https://api.open.fec.gov/v1/schedules/schedule_a/",
-                params={
-                    **search_params,
-                    "two_year_transaction_period": "2026",
-                    "per_page": "100",
-                    "sort": "-contribution_receipt_date",
-                    "last_index": last_index,
-                    "last_contribution_receipt_date": last_contribution_receipt_date,
-                    "min_amount": 1000
-                },
-            )
-            if not contribution_data:
-                continue
-
-            contribs_count += contribution_data["pagination"]["per_page"]
-            results = contribution_data["results"]
-            for contrib in results:
-                if contrib["transaction_id"] in ids_to_omit or contrib[
-                    "committee_id"
-                ] in ["C00694323", "C00401224"]:
-                    # Duplicate transactions, or contributions to WinRed & ActBlue
-                    continue
-                processed = process_contribution(contrib)
-                contributions_data["contributions"].append(processed)
-                new_contributions.append(processed)
-                if contrib["transaction_id"] not in old_contribution_ids:
-                    new_contributions.append(processed)
-
-            # Fetch more pages if they exist, or break
-            if contribs_count >= contribution_data["pagination"]["count"]:
-                break
-            else:
-                last_index = contribution_data["pagination"]["last_indexes"][
-                    "last_index"
-                ]
-                last_contribution_receipt_date = contribution_data["pagination"][
-                    "last_indexes"
-                ]["last_contribution_receipt_date"]
-
-        # Get efiled contributions for individual
-        page = 1
-        contribs_count = 0
-        search_params = get_individual_search_params(
-            individual,
-            [db.companies[company] for company in associated_companies],
+    # Individuals are written (and checkpointed) a batch of processed queries at a time
+    for batch_ids, _ in get_search_batches(search_params_by_id):
+        ids_to_omit = {
+            str_id: set(db.duplicate_contributions.get(str_id, [])) for str_id in batch_ids
+        }
+        contributions = {str_id: [] for str_id in batch_ids}
+        # Get regularly filed contributions for the individuals
+        fetch_batch_contributions(
+            session,
+            {str_id: search_params_by_id[str_id] for str_id in batch_ids},
+            ids_to_omit,
+            contributions,
+        )
+        # Get efiled contributions for the individuals
+        fetch_batch_contributions(
+            session,
+            {str_id: efiled_search_params_by_id[str_id] for str_id in batch_ids},
+            ids_to_omit,
+            contributions,
             efiled=True,
         )
-        while True:
-            data = FEC_fetch(
-                session,
-                "unprocessed committee contributions",
-                "https://api.open.fec.gov/v1/schedules/schedule_a/efile",
-                params={
-                    **search_params,
-                    "min_date": "2025-01-01",
-                    "per_page": 100,
-                    "sort": "-contribution_receipt_date",
-                    "page": page,
-                    "min_amount": 1000
-                },
-            )
 
-            if not data:
-                continue
+        for str_id in batch_ids:
+            old_contributions_dict = read_chunked(db, "rawIndividualContributions", str_id)
+            contributions_data = {
+                "contributions": contributions[str_id],
+                "associatedCompany": associated_companies_by_id[str_id],
+            }
 
-            contribs_count += data["pagination"]["per_page"]
-            results = data["results"]
-            for contrib in results:
-                if contrib["transaction_id"] in ids_to_omit or contrib[
-                    "committee_id"
-                ] in ["C00694323", "C00401224"]:
-                    # Duplicate transactions, or contributions to WinRed & ActBlue
-                    continue
-                processed = {**process_contribution(contrib), "efiled": True}
-                contributions_data["contributions"].append(processed)
-                if contrib["transaction_id"] not in old_contribution_ids:
-                    new_contributions.append(processed)
-
-            # Fetch more pages if they exist, or break
-            if page >= data["pagination"]["pages"]:
-                break
-            else:
-                page += 1
-
-        db.client.collection("rawIndividualContributions").document(str_id).set(
-            contributions_data
-        )
+            diff = diff_records(
+                key_records(
+                    (old_contributions_dict or {}).get("contributions", []), "transaction_id"
+                ),
+                key_records(contributions_data["contributions"], "transaction_id"),
+            )
+            new_contributions.extend(diff.inserted.values())
+            if changes is not None and old_contributions_dict != contributions_data:
+                changes.record("individuals", [str_id])
+            if changelog is not None:
+                changelog.record("rawIndividualContributions", str_id, diff)
+            write_chunked(
+                db, "rawIndividualContributions", str_id, contributions_data, "contributions"
+            )
+            if checkpoint is not None:
+                checkpoint.mark_completed(str_id)
     return new_contributions
@@ -0,0 +1,103 @@
+"""
+Classify contributor occupations against the occupationAllowlist constant.
+
+The allowlist has "contains" terms, which match anywhere in an occupation, and "equals" terms, which must match the
+whole occupation. Contributions from individuals with allowlisted occupations are shown unredacted, and are the only
+individual contributions kept in company searches.
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+
+# "contains" terms with these characters are treated as regular expressions rather than literal substrings
+REGEX_METACHARACTERS = re.compile(r"[\\^$.|?*+()\[\]{}]")
+
+# Distinct occupation strings are few compared to contributions, so this comfortably holds them all
+CACHE_SIZE = 8192
+
+
+def build_automaton(terms):
+    """
+    Build an Aho-Corasick automaton matching any of the terms.
+
+    Returns:
+        (transitions, matches, failures): transitions[state] maps a character to the next state, matches[state] is True
+        if reaching the state means some term has matched, and failures[state] is the state to fall back to when
+        there's no transition for the next character
+    """
+    transitions = [{}]
+    matches = [False]
+    for term in terms:
+        state = 0
+        for char in term:
+            if char not in transitions[state]:
+                transitions.append({})
+                matches.append(False)
+                transitions[state][char] = len(transitions) - 1
+            state = transitions[state][char]
+        matches[state] = True
+
+    # Link each state to the state for its longest proper suffix that's also a prefix of some term
+    failures = [0] * len(transitions)
+    queue = deque(transitions[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in transitions[state].items():
+            queue.append(next_state)
+            failure = failures[state]
+            while failure and char not in transitions[failure]:
+                failure = failures[failure]
+            failures[next_state] = transitions[failure].get(char, 0) if state else 0
+            matches[next_state] = matches[next_state] or matches[failures[next_state]]
+    return transitions, matches, failures
+
+
+class OccupationClassifier:
+    """
+    Decides whether occupations are allowlisted.
+
+    "contains" terms are matched together in a single pass with an Aho-Corasick automaton, and decisions are memoized
+    per raw occupation string, since the same few thousand occupations recur across every committee and company.
+    """
+
+    def __init__(self, contains, equals, cache_size=CACHE_SIZE):
+        """
+        Args:
+            contains: Terms that allowlist an occupation when they appear anywhere in it, case-insensitively. Terms
+                containing regular expression syntax are matched as regular expressions.
+            equals: Upper case occupations that are allowlisted when they match exactly
+            cache_size: Number of occupation decisions to memoize
+        """
+        self.equals = set(equals)
+        literal_terms = [term.upper() for term in contains if not REGEX_METACHARACTERS.search(term)]
+        pattern_terms = [term for term in contains if REGEX_METACHARACTERS.search(term)]
+        self._transitions, self._matches, self._failures = build_automaton(literal_terms)
+        self._pattern = (
+            re.compile("({})".format("|".join(pattern_terms)), re.IGNORECASE)
+            if pattern_terms
+            else None
+        )
+        self.is_allowlisted = lru_cache(maxsize=cache_size)(self._is_allowlisted)
+
+    def contains_term(self, occupation):
+        """Check whether any "contains" term appears in an upper case occupation."""
+        transitions, matches, failures = self._transitions, self._matches, self._failures
+        if matches[0]:
+            # An empty term matches everything
+            return True
+        state = 0
+        for char in occupation:
+            while state and char not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(char, 0)
+            if matches[state]:
+                return True
+        return bool(self._pattern and self._pattern.search(occupation))
+
+    def _is_allowlisted(self, occupation):
+        occupation = occupation.upper()
+        return occupation in self.equals or self.contains_term(occupation)
+
+    def cache_info(self):
+        return self.is_allowlisted.cache_info()
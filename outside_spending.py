@@ -1,4 +1,5 @@
 import logging
+from transactions import TransactionStore
 from utils import FEC_fetch, pick, get_expenditure_race_type
 
 SCHEDULE_E_FIELDS = [
@@ -15,12 +16,47 @@ SCHEDULE_E_FIELDS = [
     "subrace",
 ]
 
+# Fields whose values repeat across expenditures, and are interned to save memory (see utils.pick)
+INTERNED_FIELDS = [
+    "expenditure_date",
+    "expenditure_description",
+    "support_oppose_indicator",
+    "candidate_id",
+    "category_code",
+    "category_code_full",
+    "committee_id",
+    "subrace",
+]
+
 
 def split_into_chunks(array):
     """Split into chunks of max length 10, to handle limit on number of candidate IDs"""
     return [array[i : i + 10] for i in range(0, len(array), 10)]
 
 
+def is_in_race(expenditure, is_special_race):
+    """Check whether an expenditure is for the special race (election_type "S...") or the regular race, as given."""
+    exp_election_type = expenditure.get("election_type") or ""
+    return exp_election_type.startswith("S") == is_special_race
+
+
+def add_outside_spending(outside_spending, candidate_name, expenditure):
+    if candidate_name not in outside_spending:
+        outside_spending[candidate_name] = {
+            "support": [],
+            "oppose": [],
+            "support_total": 0,
+            "oppose_total": 0,
+        }
+    candidate_spending = outside_spending[candidate_name]
+    if expenditure["support_oppose_indicator"] == "S":
+        candidate_spending["support"].append(expenditure)
+        candidate_spending["support_total"] += expenditure["expenditure_amount"]
+    elif expenditure["support_oppose_indicator"] == "O":
+        candidate_spending["oppose"].append(expenditure)
+        candidate_spending["oppose_total"] += expenditure["expenditure_amount"]
+
+
 def update_candidate_outside_spending(db, session):
     try:
         race_docs = db.client.collection("raceDetails").stream()
@@ -50,11 +86,12 @@ def update_candidate_outside_spending(db, session):
                     and f"{base_race_id}-special" in state_data
                 )
 
+                # Amendments are resolved as expenditures are added, so each is counted once, as its current version
+                spending = TransactionStore()
                 for chunk in candidate_id_chunks:
                     last_index = None
                     last_expenditure_date = None
                     result_count = 0
-                    transaction_ids = set()
                     while True:
                         candidate_data = FEC_fetch(
                             session,
@@ -79,54 +116,14 @@ def update_candidate_outside_spending(db, session):
                             # When a race has both a regular and special
                             # counterpart, route each expenditure to the
                             # correct one based on election_type.
-                            if has_both_races:
-                                exp_election_type = result.get("election_type") or ""
-                                exp_is_special = exp_election_type.startswith("S")
-                                if is_special_race and not exp_is_special:
-                                    continue
-                                if not is_special_race and exp_is_special:
-                                    continue
+                            if has_both_races and not is_in_race(result, is_special_race):
+                                continue
                             result["subrace"] = get_expenditure_race_type(
                                 result, race_data["races"]
                             )
-                            candidate_id = result["candidate_id"]
-                            match = next(
-                                candidate["common_name"]
-                                for candidate in race_data["candidates"].values()
-                                if candidate.get("candidate_id") == candidate_id
+                            spending.add(
+                                result, record=pick(result, SCHEDULE_E_FIELDS, INTERNED_FIELDS)
                             )
-                            if match:
-                                if match not in outside_spending:
-                                    outside_spending[match] = {
-                                        "support": [],
-                                        "oppose": [],
-                                        "support_total": 0,
-                                        "oppose_total": 0,
-                                    }
-                                if result["support_oppose_indicator"] == "S":
-                                    outside_spending[match]["support"].append(
-                                        pick(result, SCHEDULE_E_FIELDS)
-                                    )
-                                    outside_spending[match]["support_total"] += result[
-                                        "expenditure_amount"
-                                    ]
-                                    transaction_ids.add(result["transaction_id"])
-                                elif result["support_oppose_indicator"] == "O":
-                                    outside_spending[match]["oppose"].append(
-                                        pick(result, SCHEDULE_E_FIELDS)
-                                    )
-                                    outside_spending[match]["oppose_total"] += result[
-                                        "expenditure_amount"
-                                    ]
-                                    transaction_ids.add(result["transaction_id"])
-
-                            else:
-                                logging.error(
-                                    f"Couldn't find candidate for outside expenditure: {candidate_id}"
-                                )
-                                print(
-                                    f"Couldn't find candidate for outside expenditure: {candidate_id}"
-                                )
 
                         # Fetch another page if needed
                         if result_count <= candidate_data["pagination"]["count"]:
@@ -155,122 +152,18 @@ def update_candidate_outside_spending(db, session):
                             },
                         )
                         for result in candidate_data["results"]:
-                            amendment = False
-                            if result["transaction_id"] in transaction_ids:
-                                if result["amendment_indicator"] == "A":
-                                    # This was amended, so replace the transaction from above.
-                                    amendment = True
-                                else:
-                                    continue
                             # Same special/regular filtering as the main loop above.
-                            if has_both_races:
-                                exp_election_type = result.get("election_type") or ""
-                                exp_is_special = exp_election_type.startswith("S")
-                                if is_special_race and not exp_is_special:
-                                    continue
-                                if not is_special_race and exp_is_special:
-                                    continue
+                            if has_both_races and not is_in_race(result, is_special_race):
+                                continue
                             result["subrace"] = get_expenditure_race_type(
                                 result, race_data["races"]
                             )
-                            candidate_id = result["candidate_id"]
-                            match = next(
-                                candidate["common_name"]
-                                for candidate in race_data["candidates"].values()
-                                if candidate.get("candidate_id") == candidate_id
+                            # Efiled expenditures already fetched above only replace them if they're amendments
+                            spending.add(
+                                result,
+                                record=pick(result, SCHEDULE_E_FIELDS, INTERNED_FIELDS),
+                                efiled=True,
                             )
-                            if match:
-                                if match not in outside_spending:
-                                    outside_spending[match] = {
-                                        "support": [],
-                                        "oppose": [],
-                                        "support_total": 0,
-                                        "oppose_total": 0,
-                                    }
-                                if result["support_oppose_indicator"] == "S":
-                                    if amendment:
-                                        try:
-                                            old_index = next(
-                                                i
-                                                for i, item in enumerate(
-                                                    outside_spending[match]["support"]
-                                                )
-                                                if item["transaction_id"]
-                                                == result["transaction_id"]
-                                            )
-                                            outside_spending[match][
-                                                "support_total"
-                                            ] -= outside_spending[match]["support"][
-                                                old_index
-                                            ][
-                                                "expenditure_amount"
-                                            ]
-                                            outside_spending[match]["support"][
-                                                old_index
-                                            ] = pick(result, SCHEDULE_E_FIELDS)
-                                            outside_spending[match][
-                                                "support_total"
-                                            ] += result["expenditure_amount"]
-                                        except StopIteration:
-                                            outside_spending[match]["support"].append(
-                                                pick(result, SCHEDULE_E_FIELDS)
-                                            )
-                                            outside_spending[match][
-                                                "support_total"
-                                            ] += result["expenditure_amount"]
-                                    else:
-                                        outside_spending[match]["support"].append(
-                                            pick(result, SCHEDULE_E_FIELDS)
-                                        )
-                                        outside_spending[match][
-                                            "support_total"
-                                        ] += result["expenditure_amount"]
-                                elif result["support_oppose_indicator"] == "O":
-                                    if amendment:
-                                        try:
-                                            old_index = next(
-                                                i
-                                                for i, item in enumerate(
-                                                    outside_spending[match]["oppose"]
-                                                )
-                                                if item["transaction_id"]
-                                                == result["transaction_id"]
-                                            )
-                                            outside_spending[match][
-                                                "oppose_total"
-                                            ] -= outside_spending[match]["oppose"][
-                                                old_index
-                                            ][
-                                                "expenditure_amount"
-                                            ]
-                                            outside_spending[match]["oppose"][
-                                                old_index
-                                            ] = pick(result, SCHEDULE_E_FIELDS)
-                                            outside_spending[match][
-                                                "oppose_total"
-                                            ] += result["expenditure_amount"]
-                                        except:
-                                            outside_spending[match]["oppose"].append(
-                                                pick(result, SCHEDULE_E_FIELDS)
-                                            )
-                                            outside_spending[match][
-                                                "oppose_total"
-                                            ] += result["expenditure_amount"]
-                                    else:
-                                        outside_spending[match]["oppose"].append(
-                                            pick(result, SCHEDULE_E_FIELDS)
-                                        )
-                                        outside_spending[match][
-                                            "oppose_total"
-                                        ] += result["expenditure_amount"]
-
-                            else:
-                                logging.error(
-                                    f"Couldn't find candidate for outside expenditure: {candidate_id}"
-                                )
-                                print(
-                                    f"Couldn't find candidate for outside expenditure: {candidate_id}"
-                                )
 
                         # Fetch another page if needed
                         if page < candidate_data["pagination"]["pages"]:
@@ -278,6 +171,23 @@ def update_candidate_outside_spending(db, session):
                         else:
                             break
 
+                for expenditure in spending.records():
+                    candidate_id = expenditure["candidate_id"]
+                    match = next(
+                        candidate["common_name"]
+                        for candidate in race_data["candidates"].values()
+                        if candidate.get("candidate_id") == candidate_id
+                    )
+                    if match:
+                        add_outside_spending(outside_spending, match, expenditure)
+                    else:
+                        logging.error(
+                            f"Couldn't find candidate for outside expenditure: {candidate_id}"
+                        )
+                        print(
+                            f"Couldn't find candidate for outside expenditure: {candidate_id}"
+                        )
+
                 for candidate_name, candidate_spending in outside_spending.items():
                     state_data[race_id]["candidates"][candidate_name][
                         "outside_spending"
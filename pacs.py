@@ -13,6 +13,23 @@ FIELDS = [
     "last_cash_on_hand_end_period",
 ]
 
+# Committee metadata reported by the PAC totals endpoint, as named in the committee store
+STORED_FIELDS = {
+    "committee_name": "name",
+    "committee_type": "committee_type",
+    "committee_type_full": "committee_type_full",
+    "committee_designation": "designation",
+    "committee_designation_full": "designation_full",
+}
+
+
+def get_committee_metadata(pac):
+    metadata = {"committee_id": pac["committee_id"]}
+    for field, stored_field in STORED_FIELDS.items():
+        if field in pac:
+            metadata[stored_field] = pac[field]
+    return metadata
+
 
 def get_pac_data(pac, db):
     pac_data = pick(pac, FIELDS)
@@ -34,6 +51,10 @@ def get_top_raised_by_type(db, session, committee_type=None):
     )
     if top_raised_data and "results" in top_raised_data:
         top_raised = top_raised_data["results"]
+        db.committee_store.put(
+            [get_committee_metadata(pac) for pac in top_raised],
+            list(STORED_FIELDS.values()),
+        )
         return [get_pac_data(pac, db) for pac in top_raised]
     return []
 
@@ -10,11 +10,17 @@ Usage:
     python pipeline.py --skip task1,task2        # Run all tasks except these
     python pipeline.py --clear-cache            # Clear HTTP cache before running
     python pipeline.py --verbose                # Enable verbose logging
+    python pipeline.py --individual-ids a,b     # Restrict individual tasks to these individuals
+    python pipeline.py --run-dir runs/debug     # Write the performance report to this directory
+    python pipeline.py --profile wall           # Profile each task, writing profiles to the run directory
+    python pipeline.py --full-rebuild           # Rebuild processed data from scratch instead of incrementally
 """
 
 import argparse
 import logging
+import os
 import sys
+from datetime import datetime
 
 import google.cloud.logging
 from requests_cache import CachedSession
@@ -58,6 +64,10 @@ Examples:
   %(prog)s --skip fetch_ads,process_contribs  Skip specific tasks
   %(prog)s --clear-cache --force              Clear cache and re-run everything
   %(prog)s --tasks failing_task --skip-deps   Run specific task without dependencies
+  %(prog)s --tasks process_individual_contributions --individual-ids john-doe
+                                              Fetch and process only these individuals
+  %(prog)s --tasks summarize_recipients --skip-deps --profile cpu
+                                              Profile a slow task
         """,
     )
 
@@ -122,6 +132,33 @@ Examples:
         help="Comma-separated list of individual IDs to process (for individual-related tasks)",
     )
 
+    parser.add_argument(
+        "--run-dir",
+        type=str,
+        help="Directory for run artifacts such as the performance report (default: runs/<timestamp>)",
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also track peak Python memory per task with tracemalloc (slows down allocation-heavy tasks)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cpu",
+        choices=["cpu", "wall"],
+        help="Profile each task and write .pstats and collapsed-stack files to the run directory "
+        "(cpu: CPU time only, the default; wall: include time waiting on the network and Firestore)",
+    )
+
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="Rebuild processed data from scratch rather than updating it with only what changed",
+    )
+
     return parser.parse_args()
 
 
@@ -209,6 +246,12 @@ def main():
         session=session,
         registry=registry,
         verbose=args.verbose,
+        individual_ids=individual_ids,
+        run_dir=args.run_dir
+        or os.path.join("runs", datetime.now().strftime("%Y%m%d-%H%M%S")),
+        trace_memory=args.trace_memory,
+        profile=args.profile,
+        full_rebuild=args.full_rebuild,
     )
 
     try:
@@ -1,11 +1,34 @@
+from .changelog import (
+    Changelog,
+    RecordDiff,
+    diff_records,
+    key_records,
+    prune_changelog,
+    read_changes,
+)
+from .changes import ChangeSet
+from .checkpoint import TaskCheckpoint
 from .context import TaskContext
+from .metrics import MetricsCollector, TaskMetrics
+from .profiling import TaskProfiler
 from .task import Task, task
 from .registry import TaskRegistry
 from .state import StateTracker
 from .orchestrator import PipelineOrchestrator
 
 __all__ = [
+    "Changelog",
+    "RecordDiff",
+    "diff_records",
+    "key_records",
+    "read_changes",
+    "prune_changelog",
+    "ChangeSet",
+    "TaskCheckpoint",
     "TaskContext",
+    "MetricsCollector",
+    "TaskMetrics",
+    "TaskProfiler",
     "Task",
     "task",
     "TaskRegistry",
@@ -0,0 +1,201 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from chunked_documents import CHUNK_COLLECTION, is_chunked, read_chunked, write_chunked
+
+RETENTION_DAYS = 30  # Runs' changes are deleted once they're older than this
+
+
+@dataclass
+class RecordDiff:
+    """Records inserted, updated, and deleted between two versions of a raw document, keyed by record ID."""
+
+    inserted: Dict[str, Any] = field(default_factory=dict)
+    updated: Dict[str, Any] = field(default_factory=dict)  # New version of each updated record
+    deleted: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "inserted": len(self.inserted),
+            "updated": len(self.updated),
+            "deleted": len(self.deleted),
+        }
+
+
+def key_records(
+    records: Iterable[Dict[str, Any]], key: Union[str, Callable[[Dict[str, Any]], str]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Key a list of raw records by ID, for diffing.
+
+    FEC data sometimes reports the same transaction more than once (e.g. an efiled transaction and its amendment), so
+    repeats of an ID are keyed as "ID#1", "ID#2", etc. in the order they appear.
+
+    Args:
+        records: Raw records
+        key: Field holding each record's ID, or a function that returns it
+    """
+    get_key = key if callable(key) else lambda record: record.get(key)
+    keyed = {}
+    for record in records:
+        record_key = str(get_key(record))
+        if record_key in keyed:
+            suffix = 1
+            while f"{record_key}#{suffix}" in keyed:
+                suffix += 1
+            record_key = f"{record_key}#{suffix}"
+        keyed[record_key] = record
+    return keyed
+
+
+def diff_records(
+    old: Optional[Dict[str, Any]],
+    new: Dict[str, Any],
+    ignore_fields: Iterable[str] = (),
+) -> RecordDiff:
+    """
+    Diff two versions of a set of records, each keyed by record ID (see key_records).
+
+    Args:
+        old: Previously stored records, or None if there were none
+        new: Records about to be stored
+        ignore_fields: Fields filled in by later stages rather than by the fetch, which don't make a record updated
+    """
+    old = old or {}
+    ignore_fields = set(ignore_fields)
+
+    def strip(record):
+        if not ignore_fields or not isinstance(record, dict):
+            return record
+        return {k: v for k, v in record.items() if k not in ignore_fields}
+
+    diff = RecordDiff()
+    for record_key, record in new.items():
+        if record_key not in old:
+            diff.inserted[record_key] = record
+        elif old[record_key] != record and strip(old[record_key]) != strip(record):
+            diff.updated[record_key] = record
+    diff.deleted = [record_key for record_key in old if record_key not in new]
+    return diff
+
+
+class Changelog:
+    """
+    Change data capture for raw FEC data, persisted in the _changelog collection.
+
+    Fetch tasks diff what they're about to store against what was stored before, and record the inserted, updated,
+    and deleted records here. Entries are partitioned by run: each run has a _changelog/{run_id} document with a
+    "changes" subcollection holding one document per changed raw document, with its list of changes split into
+    chunks (see chunked_documents) so that large diffs stay within Firestore's document limit. Downstream tasks and
+    external consumers can read just the changes for a run rather than re-diffing whole documents.
+    """
+
+    COLLECTION_NAME = "_changelog"
+
+    def __init__(self, db, run_id: Optional[str] = None):
+        """
+        Initialize the changelog.
+
+        Args:
+            db: Database instance with Firestore client
+            run_id: ID of the run to record changes under (defaults to the current UTC time)
+        """
+        self.db = db
+        self.started_at = datetime.now(timezone.utc)
+        self.run_id = run_id or self.started_at.strftime("%Y%m%dT%H%M%S%fZ")
+        self.run_ref = db.client.collection(self.COLLECTION_NAME).document(self.run_id)
+        self.changes_path = f"{self.COLLECTION_NAME}/{self.run_id}/changes"
+        self._run_recorded = False
+
+    def record(self, source: str, doc_id: str, diff: RecordDiff):
+        """
+        Record the changes to one raw document. Nothing is written if nothing changed. Errors writing the changes
+        are raised, so that the task fails rather than its changes going unrecorded.
+
+        Args:
+            source: Raw data the document belongs to, e.g. "rawContributions"
+            doc_id: ID of the changed document (committee, individual, company, etc.)
+            diff: Changes from diff_records
+        """
+        if not diff:
+            return
+        changes = (
+            [{"op": "insert", "key": k, "record": v} for k, v in diff.inserted.items()]
+            + [{"op": "update", "key": k, "record": v} for k, v in diff.updated.items()]
+            + [{"op": "delete", "key": k} for k in diff.deleted]
+        )
+        if not self._run_recorded:
+            self.run_ref.set({"run_id": self.run_id, "started_at": self.started_at})
+            self._run_recorded = True
+        # Keyed by source and document, so a retried task overwrites rather than duplicates its entries
+        write_chunked(
+            self.db,
+            self.changes_path,
+            f"{source}.{doc_id}",
+            {
+                "source": source,
+                "document": doc_id,
+                "recorded_at": datetime.now(timezone.utc),
+                **diff.counts(),
+                "changes": changes,
+            },
+            "changes",
+            key="key",
+        )
+
+
+def read_changes(db, run_id: str, source: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read the changes recorded during a run.
+
+    Args:
+        db: Database instance with Firestore client
+        run_id: ID of the run
+        source: Only read changes to this raw data (e.g. "rawContributions")
+
+    Returns:
+        List of changelog entries, each with source, document, counts, and the list of changes
+    """
+    changes_path = f"{Changelog.COLLECTION_NAME}/{run_id}/changes"
+    query = db.client.collection(changes_path)
+    if source is not None:
+        query = query.where("source", "==", source)
+    return [read_chunked(db, changes_path, doc.id, doc.to_dict()) for doc in query.stream()]
+
+
+def prune_changelog(db, retention_days: int = RETENTION_DAYS) -> int:
+    """
+    Delete the changes recorded by runs that started more than retention_days ago.
+
+    Args:
+        db: Database instance with Firestore client
+        retention_days: Days to keep each run's changes for
+
+    Returns:
+        Number of runs deleted
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    runs_ref = db.client.collection(Changelog.COLLECTION_NAME)
+    pruned = 0
+    for run in runs_ref.where("started_at", "<", cutoff).stream():
+        changes_ref = db.client.collection(f"{Changelog.COLLECTION_NAME}/{run.id}/changes")
+        references = []
+        for doc in changes_ref.stream():
+            data = doc.to_dict()
+            if is_chunked(data):
+                chunks_ref = changes_ref.document(doc.id).collection(CHUNK_COLLECTION)
+                references.extend(chunks_ref.document(chunk_id) for chunk_id in set(data["chunks"]))
+            references.append(changes_ref.document(doc.id))
+        # The run document goes last, so that an interrupted prune is picked up again next time
+        references.append(runs_ref.document(run.id))
+        for i in range(0, len(references), 500):
+            batch = db.client.batch()
+            for reference in references[i : i + 500]:
+                batch.delete(reference)
+            batch.commit()
+        pruned += 1
+    return pruned
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Set
+
+CHANGE_KINDS = ("committees", "individuals", "companies")
+
+
+@dataclass
+class ChangeSet:
+    """
+    Records which documents changed during a pipeline run.
+
+    Fetch tasks record the committees, individuals and companies whose raw data changed, and processing
+    tasks use this to recompute only the affected documents.
+
+    Each kind starts as None, meaning "unknown" (for example, because the fetch task that would have populated it
+    was skipped this run). Processing tasks must treat None as "everything may have changed" and fall back to a
+    full rebuild. Once a fetch task starts tracking a kind, it becomes a set, which may legitimately be empty.
+    """
+
+    committees: Optional[Set[str]] = None
+    individuals: Optional[Set[str]] = None
+    companies: Optional[Set[str]] = None
+
+    def _check_kind(self, kind: str):
+        if kind not in CHANGE_KINDS:
+            raise ValueError(f"Unknown change kind: '{kind}'")
+
+    def track(self, kind: str):
+        """Start tracking changes for a kind, so that an absence of changes is distinguishable from unknown."""
+        self._check_kind(kind)
+        if getattr(self, kind) is None:
+            setattr(self, kind, set())
+
+    def record(self, kind: str, ids: Iterable[str]):
+        """
+        Record that the given documents changed.
+
+        Recording into a kind that isn't being tracked is a no-op, since an unknown kind already implies that
+        everything may have changed.
+
+        Args:
+            kind: One of CHANGE_KINDS
+            ids: Document IDs that changed
+        """
+        self._check_kind(kind)
+        changed = getattr(self, kind)
+        if changed is not None:
+            changed.update(ids)
+
+    def invalidate(self, kind: str):
+        """Mark a kind as unknown, forcing downstream tasks to do a full rebuild."""
+        self._check_kind(kind)
+        setattr(self, kind, None)
+
+    def get(self, kind: str) -> Optional[Set[str]]:
+        """Get the changed IDs for a kind, or None if changes for that kind are unknown."""
+        self._check_kind(kind)
+        return getattr(self, kind)
+
+    def affects(self, kind: str, doc_id: str) -> bool:
+        """Check whether a document may have changed."""
+        changed = self.get(kind)
+        return changed is None or doc_id in changed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the change set for logging or storing with task results."""
+        summary: Dict[str, Any] = {}
+        for kind in CHANGE_KINDS:
+            changed = getattr(self, kind)
+            summary[kind] = "unknown" if changed is None else sorted(changed)
+        return summary
+
+
+def union_changes(*change_sets: Optional[Set[str]]) -> Optional[Set[str]]:
+    """Combine several sets of changed IDs. If any of them is unknown (None), the result is unknown."""
+    result: Set[str] = set()
+    for changed in change_sets:
+        if changed is None:
+            return None
+        result.update(changed)
+    return result
+
@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+
+class TaskCheckpoint:
+    """
+    Per-entity progress for a long-running task, persisted in the task's _pipeline_state document.
+
+    Tasks that loop over many entities (committees, individuals, companies) call mark_completed() after finishing each
+    one. If the task fails partway through, the next run resumes from the same checkpoint run, and is_completed()
+    reports the entities that were already finished so they can be skipped. Once the task completes, its checkpoints
+    are cleared, so the next run starts fresh.
+    """
+
+    FIELD_NAME = "checkpoints"
+
+    def __init__(
+        self,
+        db,
+        doc_ref,
+        run_started_at: datetime,
+        completed: Optional[Set[str]] = None,
+    ):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            db: Database instance with Firestore client
+            doc_ref: Reference to the task's _pipeline_state document
+            run_started_at: Start of the checkpoint run; entities checkpointed before this are not considered completed
+            completed: Entities already completed during this checkpoint run
+        """
+        self.db = db
+        self.doc_ref = doc_ref
+        self.run_started_at = run_started_at
+        self.completed = set(completed or [])
+        self.resumed = bool(self.completed)
+
+    def is_completed(self, entity_id: str) -> bool:
+        """Check whether an entity was already completed in this checkpoint run."""
+        return entity_id in self.completed
+
+    def mark_completed(self, entity_id: str):
+        """
+        Record that an entity has been completed.
+
+        Args:
+            entity_id: ID of the committee, individual, company, etc. that was completed
+        """
+        self.completed.add(entity_id)
+        try:
+            self.doc_ref.update(
+                {
+                    self.db.client.field_path(self.FIELD_NAME, entity_id): datetime.now(
+                        timezone.utc
+                    )
+                }
+            )
+        except Exception as e:
+            # A missed checkpoint only means the entity is fetched again on resume
+            logging.error(f"Error saving checkpoint for '{entity_id}': {e}")
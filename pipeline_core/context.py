@@ -1,5 +1,9 @@
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Set
+
+from .changelog import Changelog
+from .changes import ChangeSet
+from .checkpoint import TaskCheckpoint
 
 
 @dataclass
@@ -9,6 +13,23 @@ class TaskContext:
     db: Any  # Database instance
     session: Any  # CachedSession instance
     verbose: bool = False
+    individual_ids: Optional[List[str]] = None  # Restrict individual-related tasks to these IDs
+    changes: ChangeSet = field(default_factory=ChangeSet)  # Documents changed so far in this run
+    checkpoint: Optional[TaskCheckpoint] = None  # Checkpoint for the currently executing task
+    full_rebuild: bool = False  # Rebuild processed data from scratch instead of updating it incrementally
+    changelog: Optional[Changelog] = None  # Records changes to raw data for this run
+    previous_run_completed: bool = False  # Whether the currently executing task completed the last time it ran
+
+    def get_changes(self, kind: str) -> Optional[Set[str]]:
+        """
+        Get the documents of a kind that the currently executing task needs to recompute, or None for all of them.
+
+        Changes are only recorded for the current run, so if the task failed (or never ran) after an earlier run's
+        fetch task stored new data, those changes are no longer known, and it falls back to a full rebuild.
+        """
+        if not self.previous_run_completed:
+            return None
+        return self.changes.get(kind)
 
     def log(self, message: str):
         """Log a message if verbose mode is enabled."""
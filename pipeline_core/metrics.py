@@ -0,0 +1,353 @@
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class TaskMetrics:
+    """Resource usage attributed to a single task."""
+
+    task_name: str
+    wall_seconds: float = 0
+    http_requests: int = 0
+    http_bytes: int = 0
+    http_seconds: float = 0
+    cache_hits: int = 0
+    firestore_reads: int = 0
+    firestore_writes: int = 0
+    documents_written: int = 0
+    bytes_written: int = 0
+    peak_traced_bytes: Optional[int] = None
+    peak_rss_bytes: int = 0  # The process's peak RSS so far, which may have been reached by an earlier task
+    rss_increase_bytes: int = 0  # How far the task raised the process's peak RSS
+
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        if not self.http_requests:
+            return None
+        return self.cache_hits / self.http_requests
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["wall_seconds"] = round(self.wall_seconds, 3)
+        data["http_seconds"] = round(self.http_seconds, 3)
+        data["cache_hit_ratio"] = (
+            round(self.cache_hit_ratio, 4) if self.cache_hit_ratio is not None else None
+        )
+        return data
+
+
+def get_peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def estimate_size(data: Any) -> int:
+    """Rough size in bytes of a document written to Firestore."""
+    if data is None:
+        return 0
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class MetricsCollector:
+    """
+    Singleton that attributes HTTP and Firestore activity to the currently executing task.
+
+    The orchestrator calls start_task() and end_task() around each task. FEC_fetch and the instrumented Firestore
+    client call the record_* methods, which are no-ops when no task is running. Tasks can fetch from several threads
+    at once, so the record_* methods update the counters under a lock.
+    """
+
+    _instance: Optional["MetricsCollector"] = None
+
+    def __init__(self):
+        self.current: Optional[TaskMetrics] = None
+        self.completed: List[TaskMetrics] = []
+        self.trace_memory = False
+        self._task_start = None
+        self._task_start_rss = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "MetricsCollector":
+        """Get the singleton instance of the collector."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset(cls):
+        """Reset the singleton instance (useful for testing)."""
+        cls._instance = None
+
+    def start_task(self, task_name: str):
+        """Begin attributing activity to a task."""
+        self.current = TaskMetrics(task_name=task_name)
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._task_start_rss = get_peak_rss_bytes()
+        self._task_start = time.perf_counter()
+
+    def end_task(self) -> Optional[TaskMetrics]:
+        """Stop attributing activity to the current task and return its metrics."""
+        metrics = self.current
+        if metrics is None:
+            return None
+        metrics.wall_seconds = time.perf_counter() - self._task_start
+        if self.trace_memory and tracemalloc.is_tracing():
+            metrics.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+        metrics.peak_rss_bytes = get_peak_rss_bytes()
+        metrics.rss_increase_bytes = metrics.peak_rss_bytes - self._task_start_rss
+        self.completed.append(metrics)
+        self.current = None
+        return metrics
+
+    def stop(self):
+        """Stop memory tracing, if it was started."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def record_http_response(self, response):
+        """Record an HTTP response, whether it came from the network or the requests-cache."""
+        size = len(response.content or b"")
+        with self._lock:
+            if self.current is None:
+                return
+            self.current.http_requests += 1
+            self.current.http_bytes += size
+            if getattr(response, "from_cache", False):
+                self.current.cache_hits += 1
+            elif response.elapsed is not None:
+                self.current.http_seconds += response.elapsed.total_seconds()
+
+    def record_reads(self, count: int = 1):
+        """Record Firestore document reads."""
+        with self._lock:
+            if self.current is not None:
+                self.current.firestore_reads += count
+
+    def record_write(self, documents: int = 1, size: int = 0):
+        """Record a Firestore write operation affecting the given number of documents."""
+        with self._lock:
+            if self.current is not None:
+                self.current.firestore_writes += 1
+                self.current.documents_written += documents
+                self.current.bytes_written += size
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Get metrics for every completed task."""
+        return [m.to_dict() for m in self.completed]
+
+    def write_report(self, path: str):
+        """Write the report as JSON."""
+        with open(path, "w") as f:
+            json.dump({"tasks": self.report()}, f, indent=2)
+        logging.info(f"Wrote performance report to {path}")
+
+    def format_table(self) -> str:
+        """Format the report as a plain-text table."""
+        headers = [
+            "Task",
+            "Time (s)",
+            "HTTP",
+            "HTTP MB",
+            "Cache hit",
+            "FS reads",
+            "FS writes",
+            "Docs written",
+            "MB written",
+            "Peak traced MB",
+            "RSS +MB",
+            "Process peak RSS MB",
+        ]
+        rows = []
+        for m in self.completed:
+            ratio = m.cache_hit_ratio
+            rows.append(
+                [
+                    m.task_name,
+                    f"{m.wall_seconds:.1f}",
+                    str(m.http_requests),
+                    f"{m.http_bytes / 1e6:.1f}",
+                    f"{ratio:.0%}" if ratio is not None else "-",
+                    str(m.firestore_reads),
+                    str(m.firestore_writes),
+                    str(m.documents_written),
+                    f"{m.bytes_written / 1e6:.1f}",
+                    f"{m.peak_traced_bytes / 1e6:.1f}"
+                    if m.peak_traced_bytes is not None
+                    else "-",
+                    f"{m.rss_increase_bytes / 1e6:.1f}",
+                    f"{m.peak_rss_bytes / 1e6:.1f}",
+                ]
+            )
+        widths = [
+            max(len(row[i]) for row in [headers] + rows) for i in range(len(headers))
+        ]
+        lines = [
+            "  ".join(
+                cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i])
+                for i, cell in enumerate(row)
+            )
+            for row in [headers] + rows
+        ]
+        lines.insert(1, "-" * len(lines[0]))
+        return "\n".join(lines)
+
+
+class InstrumentedReference:
+    """
+    Wraps a Firestore collection, document, or query so that reads and writes are recorded by the MetricsCollector.
+
+    Anything not instrumented here is delegated to the wrapped object.
+    """
+
+    def __init__(self, wrapped, collector: MetricsCollector):
+        self._wrapped = wrapped
+        self._collector = collector
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def _wrap(self, result):
+        return InstrumentedReference(result, self._collector)
+
+    def collection(self, *args, **kwargs):
+        return self._wrap(self._wrapped.collection(*args, **kwargs))
+
+    def document(self, *args, **kwargs):
+        return self._wrap(self._wrapped.document(*args, **kwargs))
+
+    def where(self, *args, **kwargs):
+        return self._wrap(self._wrapped.where(*args, **kwargs))
+
+    def order_by(self, *args, **kwargs):
+        return self._wrap(self._wrapped.order_by(*args, **kwargs))
+
+    def limit(self, *args, **kwargs):
+        return self._wrap(self._wrapped.limit(*args, **kwargs))
+
+    def select(self, *args, **kwargs):
+        return self._wrap(self._wrapped.select(*args, **kwargs))
+
+    def get(self, *args, **kwargs):
+        result = self._wrapped.get(*args, **kwargs)
+        # Documents return a single snapshot, collections and queries return a list
+        self._collector.record_reads(len(result) if isinstance(result, list) else 1)
+        return result
+
+    def stream(self, *args, **kwargs):
+        for snapshot in self._wrapped.stream(*args, **kwargs):
+            self._collector.record_reads()
+            yield snapshot
+
+    def set(self, document_data, *args, **kwargs):
+        self._collector.record_write(size=estimate_size(document_data))
+        return self._wrapped.set(document_data, *args, **kwargs)
+
+    def update(self, field_updates, *args, **kwargs):
+        self._collector.record_write(size=estimate_size(field_updates))
+        return self._wrapped.update(field_updates, *args, **kwargs)
+
+    def create(self, document_data, *args, **kwargs):
+        self._collector.record_write(size=estimate_size(document_data))
+        return self._wrapped.create(document_data, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self._collector.record_write()
+        return self._wrapped.delete(*args, **kwargs)
+
+
+def unwrap(reference):
+    """Get the underlying Firestore object from a possibly-instrumented reference."""
+    if isinstance(reference, InstrumentedReference):
+        return reference._wrapped
+    return reference
+
+
+class InstrumentedBatch:
+    """Wraps a Firestore WriteBatch, recording each document written when the batch is committed."""
+
+    def __init__(self, batch, collector: MetricsCollector):
+        self._batch = batch
+        self._collector = collector
+        self._documents = 0
+        self._size = 0
+
+    def __getattr__(self, name):
+        return getattr(self._batch, name)
+
+    def _add(self, data=None):
+        self._documents += 1
+        self._size += estimate_size(data)
+
+    def set(self, reference, document_data, *args, **kwargs):
+        self._add(document_data)
+        return self._batch.set(unwrap(reference), document_data, *args, **kwargs)
+
+    def update(self, reference, field_updates, *args, **kwargs):
+        self._add(field_updates)
+        return self._batch.update(unwrap(reference), field_updates, *args, **kwargs)
+
+    def create(self, reference, document_data, *args, **kwargs):
+        self._add(document_data)
+        return self._batch.create(unwrap(reference), document_data, *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self._add()
+        return self._batch.delete(unwrap(reference), *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        self._collector.record_write(documents=self._documents, size=self._size)
+        self._documents = 0
+        self._size = 0
+        return self._batch.commit(*args, **kwargs)
+
+
+class InstrumentedClient:
+    """
+    Wraps a Firestore client so that every read and write made through it is attributed to the running task.
+
+    Install with db.client = InstrumentedClient(db.client). Anything not instrumented here is delegated to the
+    wrapped client.
+    """
+
+    def __init__(self, client, collector: Optional[MetricsCollector] = None):
+        self._client = client
+        self._collector = collector or MetricsCollector.get_instance()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def collection(self, *args, **kwargs):
+        return InstrumentedReference(
+            self._client.collection(*args, **kwargs), self._collector
+        )
+
+    def document(self, *args, **kwargs):
+        return InstrumentedReference(
+            self._client.document(*args, **kwargs), self._collector
+        )
+
+    def batch(self):
+        return InstrumentedBatch(self._client.batch(), self._collector)
+
+    def get_all(self, references, *args, **kwargs):
+        for snapshot in self._client.get_all(
+            [unwrap(ref) for ref in references], *args, **kwargs
+        ):
+            self._collector.record_reads()
+            yield snapshot
@@ -1,9 +1,13 @@
 import logging
+import os
 import traceback
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from .changelog import Changelog, prune_changelog
 from .context import TaskContext
+from .metrics import InstrumentedClient, MetricsCollector
+from .profiling import TaskProfiler
 from .registry import TaskRegistry
 from .state import StateTracker
 from .task import Task
@@ -15,7 +19,18 @@ class PipelineOrchestrator:
     Handles dependency resolution, state tracking, and error handling.
     """
 
-    def __init__(self, db, session, registry: Optional[TaskRegistry] = None, verbose: bool = False):
+    def __init__(
+        self,
+        db,
+        session,
+        registry: Optional[TaskRegistry] = None,
+        verbose: bool = False,
+        individual_ids: Optional[List[str]] = None,
+        run_dir: Optional[str] = None,
+        trace_memory: bool = False,
+        profile: Optional[str] = None,
+        full_rebuild: bool = False,
+    ):
         """
         Initialize the orchestrator.
 
@@ -24,13 +39,37 @@ class PipelineOrchestrator:
             session: CachedSession instance
             registry: TaskRegistry instance (uses singleton if not provided)
             verbose: Enable verbose logging
+            individual_ids: Restrict individual-related tasks to these individual IDs
+            run_dir: Directory to write the performance report and profiles to (not written if None)
+            trace_memory: Also track peak Python memory use per task with tracemalloc, which slows down
+                allocation-heavy tasks. Peak RSS is always recorded.
+            profile: Profile each task, measuring "cpu" or "wall" time. Requires run_dir.
+            full_rebuild: Rebuild processed data from scratch instead of updating it incrementally
         """
+        self.metrics = MetricsCollector.get_instance()
+        self.metrics.trace_memory = trace_memory
+        if not isinstance(db.client, InstrumentedClient):
+            db.client = InstrumentedClient(db.client, self.metrics)
+        self.run_dir = run_dir
+        self.profiler = None
+        if profile:
+            if not run_dir:
+                raise ValueError("Profiling requires a run directory")
+            self.profiler = TaskProfiler(profile, run_dir)
+
         self.db = db
         self.session = session
         self.registry = registry or TaskRegistry.get_instance()
         self.state_tracker = StateTracker(db)
         self.verbose = verbose
-        self.context = TaskContext(db=db, session=session, verbose=verbose)
+        self.context = TaskContext(
+            db=db,
+            session=session,
+            verbose=verbose,
+            individual_ids=individual_ids,
+            full_rebuild=full_rebuild,
+            changelog=Changelog(db),
+        )
 
     def build_execution_plan(
         self,
@@ -92,6 +131,7 @@ class PipelineOrchestrator:
         plan: List[Task],
         dry_run: bool = False,
         stop_on_failure: bool = True,
+        resume: bool = True,
     ) -> Dict[str, Any]:
         """
         Execute a list of tasks in order.
@@ -100,6 +140,7 @@ class PipelineOrchestrator:
             plan: List of tasks to execute (in order)
             dry_run: If True, only print what would be executed
             stop_on_failure: If True, stop execution on first failure
+            resume: If True, tasks that previously failed resume from their checkpoints
 
         Returns:
             Dictionary with execution results:
@@ -141,26 +182,43 @@ class PipelineOrchestrator:
             if task.description:
                 print(f"    {task.description}")
 
+            task_metrics = None
             try:
-                # Mark task as started
+                # Load any checkpoints left by a failed run, then mark task as started
+                state = self.state_tracker.get_state(task.name) or {}
+                self.context.previous_run_completed = state.get("status") == "completed"
+                self.context.checkpoint = self.state_tracker.get_checkpoint(task, resume, state)
+                if self.context.checkpoint.resumed:
+                    print(
+                        f"    Resuming from checkpoint "
+                        f"({len(self.context.checkpoint.completed)} entities already completed)"
+                    )
                 self.state_tracker.mark_started(task)
 
                 # Execute the task
-                task_start = datetime.now()
-                result = task.execute(self.context)
-                task_duration = (datetime.now() - task_start).total_seconds()
+                self.metrics.start_task(task.name)
+                try:
+                    if self.profiler:
+                        result = self.profiler.execute(task, self.context)
+                    else:
+                        result = task.execute(self.context)
+                finally:
+                    task_metrics = self.metrics.end_task()
 
                 # Mark task as completed
-                self.state_tracker.mark_completed(task, result)
+                self.state_tracker.mark_completed(task, result, task_metrics.to_dict())
 
                 executed.append(task.name)
                 results[task.name] = result
 
-                print(f"    ✓ Completed in {task_duration:.1f}s")
+                print(f"    ✓ Completed in {task_metrics.wall_seconds:.1f}s")
+                self.context.log(f"Changes after {task.name}: {self.context.changes.to_dict()}")
 
             except Exception as e:
                 # Mark task as failed
-                self.state_tracker.mark_failed(task, e)
+                self.state_tracker.mark_failed(
+                    task, e, task_metrics.to_dict() if task_metrics else None
+                )
                 failed.append(task.name)
 
                 print(f"    ✗ Failed: {e}")
@@ -194,6 +252,15 @@ class PipelineOrchestrator:
 
         print(f"{'='*60}\n")
 
+        try:
+            pruned = prune_changelog(self.db)
+            if pruned:
+                logging.info(f"Deleted the changelog of {pruned} old runs")
+        except Exception as e:
+            logging.error(f"Error pruning changelog: {e}")
+
+        self._report()
+
         return {
             "executed": executed,
             "skipped": skipped,
@@ -201,6 +268,25 @@ class PipelineOrchestrator:
             "results": results,
         }
 
+    def _report(self):
+        """Print the per-task performance report, and write it to the run directory."""
+        self.metrics.stop()
+        if not self.metrics.completed:
+            return
+
+        print("Performance Report")
+        print(self.metrics.format_table())
+        print()
+
+        if self.run_dir:
+            try:
+                os.makedirs(self.run_dir, exist_ok=True)
+                path = os.path.join(self.run_dir, "report.json")
+                self.metrics.write_report(path)
+                print(f"Performance report written to {path}\n")
+            except OSError as e:
+                logging.error(f"Error writing performance report: {e}")
+
     def run(
         self,
         task_names: Optional[List[str]] = None,
@@ -227,4 +313,4 @@ class PipelineOrchestrator:
             Dictionary with execution results
         """
         plan = self.build_execution_plan(task_names, force, skip_deps, skip_tasks)
-        return self.execute(plan, dry_run, stop_on_failure)
+        return self.execute(plan, dry_run, stop_on_failure, resume=not force)
@@ -0,0 +1,213 @@
+import cProfile
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+PROFILE_MODES = ("cpu", "wall")
+
+
+class StackSampler:
+    """
+    Periodically samples the call stacks of every thread, counting identical stacks. Each stack starts with the name of
+    its thread, so work done on worker threads (e.g. FEC fetches on a ThreadPoolExecutor) can be told apart from the
+    thread waiting on it.
+
+    In "cpu" mode, samples are taken on SIGPROF, and only threads that have used CPU time since the previous sample are
+    recorded, so only time spent running on the CPU is sampled. In "wall" mode (or where SIGPROF isn't available), a
+    background thread samples on a fixed interval, so time spent waiting on the network or Firestore is sampled too.
+    """
+
+    def __init__(self, mode: str = "wall", interval: float = 0.005):
+        """
+        Initialize the sampler.
+
+        Args:
+            mode: "cpu" or "wall"
+            interval: Seconds between samples
+        """
+        self.mode = mode
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._cpu_times = {}
+        self._stop_event = None
+        self._sampler_thread = None
+        self._previous_handler = None
+
+    def _uses_signal(self) -> bool:
+        return (
+            self.mode == "cpu"
+            and hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    def start(self):
+        """Start sampling."""
+        self.counts = Counter()
+        self._cpu_times = {}
+        if self.mode == "cpu":
+            # Threads that are already running are only sampled once they've used more CPU time
+            for thread_id in sys._current_frames():
+                self._used_cpu(thread_id)
+        if self._uses_signal():
+            self._previous_handler = signal.signal(signal.SIGPROF, self._handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._stop_event = threading.Event()
+            self._sampler_thread = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler_thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        if self._sampler_thread is not None:
+            self._stop_event.set()
+            self._sampler_thread.join()
+            self._sampler_thread = None
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    def _handle_signal(self, signum, frame):
+        self._sample()
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        sampler_id = threading.get_ident() if self._sampler_thread is not None else None
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_id:
+                continue
+            if self.mode == "cpu" and not self._used_cpu(thread_id):
+                continue
+            self._record(names.get(thread_id, str(thread_id)), frame)
+
+    def _used_cpu(self, thread_id) -> bool:
+        """Check whether a thread has used CPU time since it was last checked."""
+        try:
+            cpu_time = time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+        except (AttributeError, OSError):
+            # Per-thread CPU clocks aren't available, so only the thread being profiled can be told to be running
+            return thread_id == threading.main_thread().ident
+        previous = self._cpu_times.get(thread_id)
+        self._cpu_times[thread_id] = cpu_time
+        return previous is None or cpu_time > previous
+
+    def _record(self, thread_name, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        stack.append(thread_name)
+        self.counts[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str):
+        """Write the samples in collapsed-stack format, as read by flamegraph.pl and speedscope."""
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class TaskProfiler:
+    """
+    Profiles task execution, writing per-task profiles to the run directory.
+
+    For each task, writes <task>.pstats (deterministic profile, readable with pstats or snakeviz) and <task>.collapsed
+    (sampled stacks for flamegraph rendering), and prints the top hotspots.
+
+    Threads the task starts, like ThreadPoolExecutor workers, are profiled too. From Python 3.12, cProfile traces every
+    thread; before that, each thread started during the task gets its own profile, merged into the task's. In wall
+    mode, time spent on concurrent threads adds up, so functions' totals can exceed the task's wall time.
+    """
+
+    def __init__(self, mode: str, run_dir: str, top: int = 20):
+        """
+        Initialize the profiler.
+
+        Args:
+            mode: "cpu" to measure CPU time, or "wall" to measure wall-clock time (including I/O waits)
+            run_dir: Directory to write profiles to
+            top: Number of hotspots to print after each task
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: '{mode}'")
+        self.mode = mode
+        self.run_dir = run_dir
+        self.top = top
+
+    def execute(self, task, context) -> Any:
+        """
+        Execute a task under the profiler.
+
+        Args:
+            task: The task to execute
+            context: TaskContext passed to the task
+
+        Returns:
+            The task's result
+        """
+        timer = time.process_time if self.mode == "cpu" else time.perf_counter
+        profile = cProfile.Profile(timer)
+        thread_profiles = []
+        sampler = StackSampler(self.mode)
+
+        def profile_thread(*args):
+            # Called on a new thread's first profiling event: replace this hook with a profile of the thread
+            thread_profile = cProfile.Profile(timer)
+            thread_profiles.append(thread_profile)
+            thread_profile.enable()
+
+        sampler.start()
+        if sys.version_info < (3, 12):
+            threading.setprofile(profile_thread)
+        profile.enable()
+        try:
+            return task.execute(context)
+        finally:
+            profile.disable()
+            if sys.version_info < (3, 12):
+                threading.setprofile(None)
+            sampler.stop()
+            stats = pstats.Stats(profile)
+            for thread_profile in thread_profiles:
+                stats.add(thread_profile)
+            self._write(task.name, stats, sampler)
+
+    def _write(self, task_name: str, stats: pstats.Stats, sampler: StackSampler):
+        try:
+            os.makedirs(self.run_dir, exist_ok=True)
+            pstats_path = os.path.join(self.run_dir, f"{task_name}.pstats")
+            collapsed_path = os.path.join(self.run_dir, f"{task_name}.collapsed")
+            stats.dump_stats(pstats_path)
+            sampler.write_collapsed(collapsed_path)
+        except OSError as e:
+            logging.error(f"Error writing profile for task '{task_name}': {e}")
+            pstats_path = collapsed_path = None
+
+        print(self.format_hotspots(stats))
+        if pstats_path:
+            print(f"    Profile written to {pstats_path} and {collapsed_path}")
+
+    def format_hotspots(self, stats: pstats.Stats) -> str:
+        """Format the functions with the most time spent in their own code."""
+        label = "CPU" if self.mode == "cpu" else "wall"
+        lines = [
+            f"    Top {self.top} hotspots ({label} time):",
+            f"    {'own (s)':>9}  {'total (s)':>9}  {'calls':>9}  function",
+        ]
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        for func, (_, ncalls, tottime, cumtime, _) in rows[: self.top]:
+            lines.append(
+                f"    {tottime:9.3f}  {cumtime:9.3f}  {ncalls:9d}  {pstats.func_std_string(func)}"
+            )
+        return "\n".join(lines)
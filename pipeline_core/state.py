@@ -1,8 +1,10 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from google.cloud import firestore
 
+from .checkpoint import TaskCheckpoint
+
 
 class StateTracker:
     """
@@ -121,6 +123,58 @@ class StateTracker:
             logging.error(f"Error getting state for task '{task_name}': {e}")
             return None
 
+    def get_checkpoint(
+        self,
+        task: "Task",  # noqa: F821
+        resume: bool = True,
+        state: Optional[Dict[str, Any]] = None,
+    ) -> TaskCheckpoint:
+        """
+        Get the checkpoint for a task that is about to run.
+
+        If the previous run of the task failed or was interrupted, the checkpoint run is resumed, and entities
+        checkpointed since that run started are reported as completed. Otherwise a new checkpoint run starts now.
+
+        Args:
+            task: The task about to run
+            resume: If False, always start a new checkpoint run
+            state: The task's state, if it's already been read
+
+        Returns:
+            TaskCheckpoint for the task
+        """
+        doc_ref = self.collection.document(task.name)
+        if state is None:
+            state = self.get_state(task.name) or {}
+        run_started_at = state.get("checkpoint_run_started_at")
+
+        if resume and run_started_at and state.get("status") in ("failed", "running"):
+            completed = {
+                entity_id
+                for entity_id, checkpointed_at in state.get(
+                    TaskCheckpoint.FIELD_NAME, {}
+                ).items()
+                if checkpointed_at and checkpointed_at >= run_started_at
+            }
+            if completed:
+                logging.info(
+                    f"Resuming task '{task.name}' with {len(completed)} completed entities"
+                )
+            return TaskCheckpoint(self.db, doc_ref, run_started_at, completed)
+
+        run_started_at = datetime.now(timezone.utc)
+        try:
+            doc_ref.set(
+                {
+                    "checkpoint_run_started_at": run_started_at,
+                    TaskCheckpoint.FIELD_NAME: firestore.DELETE_FIELD,
+                },
+                merge=True,
+            )
+        except Exception as e:
+            logging.error(f"Error starting checkpoint run for task '{task.name}': {e}")
+        return TaskCheckpoint(self.db, doc_ref, run_started_at)
+
     def mark_started(self, task: "Task"):  # noqa: F821
         """
         Mark a task as started.
@@ -142,48 +196,66 @@ class StateTracker:
         except Exception as e:
             logging.error(f"Error marking task '{task.name}' as started: {e}")
 
-    def mark_completed(self, task: "Task", result: Any = None):  # noqa: F821
+    def mark_completed(
+        self,
+        task: "Task",  # noqa: F821
+        result: Any = None,
+        metrics: Optional[Dict[str, Any]] = None,
+    ):
         """
         Mark a task as completed.
 
         Args:
             task: The task that completed
             result: Optional result data from the task
+            metrics: Optional performance metrics from the task's execution
         """
         try:
             data = {
                 "status": "completed",
                 "completed_at": firestore.SERVER_TIMESTAMP,
                 "task_name": task.name,
+                # The next run starts a new checkpoint run
+                "checkpoint_run_started_at": firestore.DELETE_FIELD,
+                TaskCheckpoint.FIELD_NAME: firestore.DELETE_FIELD,
             }
 
             if result is not None:
                 data["result"] = result
+            if metrics is not None:
+                data["metrics"] = metrics
 
             self.collection.document(task.name).set(data, merge=True)
             logging.debug(f"Marked task '{task.name}' as completed")
         except Exception as e:
             logging.error(f"Error marking task '{task.name}' as completed: {e}")
 
-    def mark_failed(self, task: "Task", error: Exception):  # noqa: F821
+    def mark_failed(
+        self,
+        task: "Task",  # noqa: F821
+        error: Exception,
+        metrics: Optional[Dict[str, Any]] = None,
+    ):
         """
         Mark a task as failed.
 
         Args:
             task: The task that failed
             error: The exception that caused the failure
+            metrics: Optional performance metrics from the task's execution up to the failure
         """
         try:
-            self.collection.document(task.name).set(
-                {
-                    "status": "failed",
-                    "failed_at": firestore.SERVER_TIMESTAMP,
-                    "task_name": task.name,
-                    "error": str(error),
-                    "error_type": type(error).__name__,
-                },
-                merge=True,
-            )
+            data = {
+                "status": "failed",
+                "failed_at": firestore.SERVER_TIMESTAMP,
+                "task_name": task.name,
+                "error": str(error),
+                "error_type": type(error).__name__,
+            }
+            if metrics is not None:
+                data["metrics"] = metrics
+
+            self.collection.document(task.name).set(data, merge=True)
             logging.debug(f"Marked task '{task.name}' as failed")
         except Exception as e:
             logging.error(f"Error marking task '{task.name}' as failed: {e}")
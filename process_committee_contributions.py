@@ -2,9 +2,13 @@
 Process committee contributions from rawContributions to contributions collection.
 """
 
+import hashlib
+import json
 import logging
 from datetime import datetime
-from utils import pick, compare_names_lastfirst
+from chunked_documents import stream_records, write_chunked
+from fetch_committee_contributions import CONTRIBUTION_FIELDS as RAW_CONTRIBUTION_FIELDS
+from utils import pick, get_documents
 
 SHARED_CONTRIBUTION_FIELDS = [
     "contributor_first_name",
@@ -38,6 +42,24 @@ ROLLUP_CONTRIBUTION_FIELDS = [
 
 ROLLUP_THRESHOLD = 10000
 
+# Fields compared to detect transactions that were amended since they were last processed
+FINGERPRINT_FIELDS = RAW_CONTRIBUTION_FIELDS + ["efiled"]
+
+# Fields of each transaction kept in the aggregation state, to retract it from the aggregates if it's removed or
+# amended
+RETRACTION_FIELDS = [
+    "contribution_receipt_amount",
+    "contribution_receipt_date",
+    "transaction_id",
+    "line_number",
+]
+
+# Fields of each rollup kept in the aggregation state: what's shown for it, and what's needed to add to it
+ROLLUP_STATE_FIELDS = CONTRIBUTION_FIELDS + ROLLUP_CONTRIBUTION_FIELDS
+
+# Bump when the stored aggregation state changes shape, to force a rebuild
+AGGREGATION_STATE_VERSION = 2
+
 
 def get_contribution_id(contrib):
     """Generate a unique identifier for a contribution for manual review matching."""
@@ -53,14 +75,18 @@ def get_contribution_id(contrib):
     return f"rollup_{name}_{amount}_{date}"
 
 
-def load_manually_reviewed_contributions(db, committee_id):
-    """Load existing manually reviewed contributions from the processed contributions."""
+def load_manually_reviewed_contributions(db, committee_id, data=None):
+    """
+    Load existing manually reviewed contributions from the processed contributions. Pass the processed contributions
+    as data if they've already been loaded.
+    """
     try:
-        existing = db.client.collection("contributions").document(committee_id).get()
-        if not existing.exists:
-            return {}
+        if data is None:
+            existing = db.client.collection("contributions").document(committee_id).get()
+            if not existing.exists:
+                return {}
+            data = existing.to_dict()
 
-        data = existing.to_dict()
         manually_reviewed = {}
 
         # Check all groups for manually reviewed contributions
@@ -110,7 +136,7 @@ def pick_and_redact_contribution(d, keys):
     return res
 
 
-def is_redacted(contrib, allowlists):
+def is_redacted(contrib, occupation_classifier):
     """Redact any names for occupations not captured within the occupationAllowlist."""
     if contrib.get("claimed", False):
         return False
@@ -122,10 +148,7 @@ def is_redacted(contrib, allowlists):
     if not contrib["contributor_occupation"]:
         # Redact if the contributor is missing, just in case
         return True
-    occupation = contrib["contributor_occupation"].upper()
-    return occupation not in allowlists["equals"] and not allowlists["contains"].search(
-        occupation
-    )
+    return not occupation_classifier.is_allowlisted(contrib["contributor_occupation"])
 
 
 def get_claimed_contributions(individuals, committee_id):
@@ -141,50 +164,152 @@ def get_claimed_contributions(individuals, committee_id):
     return claimed_contributions
 
 
-def process_contribution(contrib, db, donorMap):
-    redacted = is_redacted(contrib, db.occupation_allowlist)
+def get_contribution_records(transactions, claimed):
+    """
+    Key a committee's transactions and claimed contributions for matching against the aggregation state. If a
+    committee reports the same transaction more than once (as happens with amended efilings), later copies get a
+    numbered suffix.
+    """
+    records = {}
+    for prefix, contribs in (("", transactions), ("claimed_", claimed)):
+        for contrib in contribs:
+            key = prefix + get_contribution_id(contrib)
+            if key in records:
+                suffix = 1
+                while f"{key}#{suffix}" in records:
+                    suffix += 1
+                key = f"{key}#{suffix}"
+            records[key] = contrib
+    return records
+
+
+def get_fingerprint(contrib):
+    """A short hash of the raw fields of a contribution, to tell whether it was amended since it was aggregated."""
+    return hashlib.sha1(
+        json.dumps([contrib.get(field) for field in FINGERPRINT_FIELDS], default=str).encode()
+    ).hexdigest()[:16]
+
+
+def get_constants_fingerprint(db):
+    """Fingerprint the constants that contribution grouping, linking and redaction depend on."""
+    constants = [
+        db.occupation_allowlist,
+        sorted(db.individual_employers),
+        db.company_aliases,
+        sorted(
+            [company["id"], company["name"], company.get("aliases", [])]
+            for company in db.companies.values()
+        ),
+        sorted([committee["id"], committee["name"]] for committee in db.committees.values()),
+        sorted(
+            [individual["id"], individual["name"]] for individual in db.individuals.values()
+        ),
+    ]
+    return hashlib.sha1(
+        json.dumps(constants, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_sources_fingerprint(constants_fingerprint, claimed, manually_reviewed):
+    """
+    Fingerprint everything besides the committee's transactions that its aggregates depend on. If this changes, the
+    aggregates are rebuilt rather than updated.
+    """
+    return hashlib.sha1(
+        json.dumps(
+            [constants_fingerprint, claimed, manually_reviewed], sort_keys=True, default=str
+        ).encode()
+    ).hexdigest()
+
+
+def is_transfer(contrib):
+    # Transfers from other committees shouldn't be double counted
+    return (
+        contrib.get("line_number") == "12"
+        or (contrib.get("line_number") or "").lower() == "11c"
+    )
+
+
+def get_receipt_date(contrib):
+    return contrib.get("contribution_receipt_date", "0")
+
+
+def annotate_contribution(contrib, db):
+    """Mark a contribution for redaction if needed and link it to its group's page. Returns the group and link."""
+    redacted = is_redacted(contrib, db.occupation_classifier)
     if redacted:
         # Mark to redact later
         contrib["redacted"] = True
 
-    # Get group name
-    group = None
-    if (
-        "contributor_employer" in contrib
-        and contrib["contributor_employer"]
-        and contrib["contributor_employer"] != "N/A"
-    ):
-        group = contrib["contributor_employer"]
-    else:
-        group = contrib["contributor_name"]
-    if group and group in db.individual_employers:
-        group = contrib["contributor_name"]
-    elif not group:
-        group = "UNKNOWN"
-    elif group in db.company_aliases:
-        group = db.company_aliases[group]
-
-    link = None
-    for company in db.companies.values():
-        if company["name"].upper() == group or any(
-            alias.upper() == group for alias in company.get("aliases", [])
-        ):
-            link = "/companies/" + company["id"]
-            break
-    if not link:
-        for committee in db.committees.values():
-            if committee["name"].upper() == group:
-                link = "/committees/" + committee["id"]
-                break
-    if not link:
-        if "," in group:
-            for individual in db.individuals.values():
-                if compare_names_lastfirst(individual["name"], group):
-                    link = "/individuals/" + individual["id"]
-                    break
+    group, link = db.group_resolver.resolve(
+        contrib.get("contributor_employer"), contrib["contributor_name"]
+    )
 
     if link:
         contrib["link"] = link
+    return group, link
+
+
+def get_rollup_name(contrib):
+    # Normalize the rollup key to handle variations across filings:
+    # - Middle names/initials lumped into first name ("RAVI" vs "RAVI PRAKASH")
+    # - Trailing whitespace in name fields
+    # Use only the first word of first_name + last_name, matching the approach
+    # in process_company_contributions.py
+    if contrib.get("contributor_last_name") and contrib.get("contributor_first_name"):
+        first_name = contrib["contributor_first_name"].strip().upper().split()[0]
+        last_name = contrib["contributor_last_name"].strip().upper()
+        return f"{last_name}, {first_name}"
+    rollup_name = contrib["contributor_name"].strip().upper()
+    if ", " in rollup_name:
+        parts = rollup_name.split(", ", 1)
+        if len(parts) == 2:
+            first_parts = parts[1].split()
+            if first_parts:
+                rollup_name = f"{parts[0]}, {first_parts[0]}"
+    return rollup_name
+
+
+def add_to_rollup(rollups, rollup_name, contrib):
+    # Note we don't redact here, that happens later
+    if rollup_name not in rollups:
+        # Initialize the rollup group
+        rollups[rollup_name] = {
+            **contrib,
+            "oldest": contrib["contribution_receipt_date"],
+            "newest": contrib["contribution_receipt_date"],
+            "total": 1,
+            "total_receipt_amount": round(contrib["contribution_receipt_amount"], 2),
+        }
+        return
+
+    rollup = rollups[rollup_name]
+    rollup["total"] += 1
+    rollup["total_receipt_amount"] += round(contrib["contribution_receipt_amount"], 2)
+
+    # Set newest/oldest dates
+    if contrib["contribution_receipt_date"] < rollup["oldest"]:
+        rollup["oldest"] = contrib["contribution_receipt_date"]
+    if contrib["contribution_receipt_date"] > rollup["newest"]:
+        rollup["newest"] = contrib["contribution_receipt_date"]
+
+    # Update the aggregate YTD contribution if this is a new high
+    if "contributor_aggregate_ytd" in contrib:
+        current_aggregate = contrib["contributor_aggregate_ytd"] or 0
+        existing_aggregate = rollup.get("contributor_aggregate_ytd") or 0
+
+        if current_aggregate > existing_aggregate:
+            rollup["contributor_aggregate_ytd"] = contrib["contributor_aggregate_ytd"]
+
+
+def process_contribution(contrib, db, donorMap, applied=None):
+    """
+    Add a contribution to the totals, groups and rollups in donorMap.
+
+    If applied is provided, the group and rollup (None for contributions listed individually) that the contribution
+    was added to are recorded in it.
+    """
+    group, link = annotate_contribution(contrib, db)
 
     # Add group to map if the group isn't already in there
     if group not in donorMap["groups"]:
@@ -210,11 +335,7 @@ def process_contribution(contrib, db, donorMap):
                 )
             )
 
-    if (
-        contrib.get("line_number") == "12"
-        or contrib.get("line_number", "").lower() == "11c"
-    ):
-        # This was a transfer from another committee and shouldn't be double counted
+    if is_transfer(contrib):
         donorMap["total_transferred"] = round(
             donorMap["total_transferred"] + contrib["contribution_receipt_amount"],
             2,
@@ -225,76 +346,14 @@ def process_contribution(contrib, db, donorMap):
             2,
         )
 
+    rollup_name = None
     if contrib["contribution_receipt_amount"] >= ROLLUP_THRESHOLD:
         # Record the individual contribution if it's large
         donorMap["groups"][group]["contributions"].append(redact_contribution(contrib))
     else:
         # Add the contribution to a rollup.
-        # Note we don't redact here, that happens later
-
-        # Normalize the rollup key to handle variations across filings:
-        # - Middle names/initials lumped into first name ("RAVI" vs "RAVI PRAKASH")
-        # - Trailing whitespace in name fields
-        # Use only the first word of first_name + last_name, matching the approach
-        # in process_company_contributions.py
-        if contrib.get("contributor_last_name") and contrib.get(
-            "contributor_first_name"
-        ):
-            first_name = contrib["contributor_first_name"].strip().upper().split()[0]
-            last_name = contrib["contributor_last_name"].strip().upper()
-            rollup_name = f"{last_name}, {first_name}"
-        else:
-            rollup_name = contrib["contributor_name"].strip().upper()
-            if ", " in rollup_name:
-                parts = rollup_name.split(", ", 1)
-                if len(parts) == 2:
-                    first_parts = parts[1].split()
-                    if first_parts:
-                        rollup_name = f"{parts[0]}, {first_parts[0]}"
-
-        if rollup_name not in donorMap["groups"][group]["rollup"]:
-            # Initialize the rollup group
-            donorMap["groups"][group]["rollup"][rollup_name] = {
-                **contrib,
-                "oldest": contrib["contribution_receipt_date"],
-                "newest": contrib["contribution_receipt_date"],
-                "total": 1,
-                "total_receipt_amount": round(
-                    contrib["contribution_receipt_amount"], 2
-                ),
-            }
-        else:
-            donorMap["groups"][group]["rollup"][rollup_name]["total"] += 1
-            donorMap["groups"][group]["rollup"][rollup_name][
-                "total_receipt_amount"
-            ] += round(contrib["contribution_receipt_amount"], 2)
-
-            # Set newest/oldest dates
-            if (
-                contrib["contribution_receipt_date"]
-                < donorMap["groups"][group]["rollup"][rollup_name]["oldest"]
-            ):
-                donorMap["groups"][group]["rollup"][rollup_name]["oldest"] = contrib[
-                    "contribution_receipt_date"
-                ]
-            if (
-                contrib["contribution_receipt_date"]
-                > donorMap["groups"][group]["rollup"][rollup_name]["newest"]
-            ):
-                donorMap["groups"][group]["rollup"][rollup_name]["newest"] = contrib[
-                    "contribution_receipt_date"
-                ]
-
-            # Update the aggregate YTD contribution if this is a new high
-            if "contributor_aggregate_ytd" in contrib:
-                current_aggregate = contrib["contributor_aggregate_ytd"] or 0
-                rollup_entry = donorMap["groups"][group]["rollup"][rollup_name]
-                existing_aggregate = rollup_entry.get("contributor_aggregate_ytd") or 0
-
-                if current_aggregate > existing_aggregate:
-                    rollup_entry["contributor_aggregate_ytd"] = contrib[
-                        "contributor_aggregate_ytd"
-                    ]
+        rollup_name = get_rollup_name(contrib)
+        add_to_rollup(donorMap["groups"][group]["rollup"], rollup_name, contrib)
 
     # Update the total contributions count and amount for the group, regardless of whether this is going in
     # a rollup
@@ -303,206 +362,512 @@ def process_contribution(contrib, db, donorMap):
         2,
     )
     donorMap["contributions_count"] += 1
+    if applied is not None:
+        applied["group"] = group
+        applied["rollup"] = rollup_name
     return contrib
 
 
-def process_committee_contributions(db):
-    raw_committee_contributions = db.client.collection("rawContributions").stream()
-    individuals = (
-        db.client.collection("constants").document("individuals").get().to_dict()
+def apply_contribution(key, contrib, db, donorMap, state, manually_reviewed_ids):
+    """Process a contribution and record it in the aggregation state. Returns False if it was skipped."""
+    # Skip if this contribution has been manually reviewed
+    if get_contribution_id(contrib) in manually_reviewed_ids:
+        return False
+
+    # Skip if marked as omit
+    if should_skip_contribution(contrib):
+        return False
+
+    applied = {
+        "key": key,
+        "fingerprint": get_fingerprint(contrib),
+        "retraction": [contrib.get(field) for field in RETRACTION_FIELDS],
+    }
+    process_contribution(contrib, db, donorMap, applied)
+    if applied["rollup"] is not None:
+        members = donorMap["groups"][applied["group"]].setdefault("members", {})
+        members.setdefault(applied["rollup"], []).append(key)
+    state["transactions"][key] = applied
+    return True
+
+
+def is_same_contribution(contrib, other):
+    return (
+        other.get("transaction_id") == contrib["transaction_id"]
+        and other.get("contribution_receipt_date") == contrib["contribution_receipt_date"]
+        and other.get("contribution_receipt_amount") == contrib["contribution_receipt_amount"]
     )
-    for doc in raw_committee_contributions:
-        committee_id, contributions = doc.id, doc.to_dict()
 
-        # Load existing manually reviewed contributions
-        manually_reviewed = load_manually_reviewed_contributions(db, committee_id)
-        manually_reviewed_ids = set(manually_reviewed.keys())
-
-        all_contribs = []
-        donorMap = {
-            "contributions_count": 0,
-            "groups": {},
-            "by_date": [],
-            "total_contributed": 0,
-            "total_transferred": 0,
-        }
 
-        redacted_count = 0
-        for contrib in contributions["transactions"]:
-            # Skip if this contribution has been manually reviewed
-            contrib_id = get_contribution_id(contrib)
-            if contrib_id in manually_reviewed_ids:
-                continue
+def bisect_by_date(by_date, date, after=False):
+    """
+    Find where a contribution from the given date belongs in by_date, which is sorted by descending date. The position
+    is before any contributions from the same date, or after them if after is True.
+    """
+    lo, hi = 0, len(by_date)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mid_date = get_receipt_date(by_date[mid])
+        if mid_date > date or (after and mid_date == date):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
 
-            # Skip if marked as omit
-            if should_skip_contribution(contrib):
-                continue
 
-            details = process_contribution(contrib, db, donorMap)
-            if details is not None:
-                all_contribs.append(details)
-                if details.get("redacted"):
-                    redacted_count += 1
+def insert_by_date(by_date, contrib):
+    date = get_receipt_date(contrib)
+    by_date.insert(bisect_by_date(by_date, date, after=True), contrib)
 
-        # Get any claimed contributions
-        claimed = get_claimed_contributions(individuals, committee_id)
-        for contrib in claimed:
-            # Skip if this contribution has been manually reviewed
-            contrib_id = get_contribution_id(contrib)
-            if contrib_id in manually_reviewed_ids:
-                continue
 
-            # Skip if marked as omit
-            if should_skip_contribution(contrib):
-                continue
+def remove_by_date(by_date, contrib):
+    date = get_receipt_date(contrib)
+    for ind in range(bisect_by_date(by_date, date), len(by_date)):
+        if get_receipt_date(by_date[ind]) != date:
+            break
+        if is_same_contribution(contrib, by_date[ind]):
+            del by_date[ind]
+            return
+
+
+def retract_contribution(key, donorMap, state, by_date):
+    """
+    Remove a contribution that was processed in an earlier run, using the fields kept in the aggregation state.
+
+    Returns the group and rollup it was removed from. Rollups can't be adjusted in place (the oldest and newest dates
+    may have come from the removed contribution), so they need to be recomputed from their remaining members after.
+    """
+    applied = state["transactions"].pop(key)
+    contrib = dict(zip(RETRACTION_FIELDS, applied["retraction"]))
+    amount = contrib["contribution_receipt_amount"]
+    if is_transfer(contrib):
+        donorMap["total_transferred"] = round(donorMap["total_transferred"] - amount, 2)
+    else:
+        donorMap["total_contributed"] = round(donorMap["total_contributed"] - amount, 2)
+    donorMap["contributions_count"] -= 1
+
+    group = donorMap["groups"][applied["group"]]
+    group["total"] = round(group["total"] - amount, 2)
+    if applied["rollup"] is None:
+        for ind, other in enumerate(group["contributions"]):
+            if is_same_contribution(contrib, other):
+                del group["contributions"][ind]
+                break
+    else:
+        group["members"][applied["rollup"]].remove(key)
+    remove_by_date(by_date, contrib)
+    return applied["group"], applied["rollup"]
+
+
+def recompute_rollup(group, rollup_name, records, db):
+    """Rebuild a rollup from its remaining members."""
+    del group["rollup"][rollup_name]
+    members = group["members"][rollup_name]
+    if not members:
+        del group["members"][rollup_name]
+        return
+    for key in members:
+        contrib = dict(records[key])
+        annotate_contribution(contrib, db)
+        add_to_rollup(group["rollup"], rollup_name, contrib)
+
+
+def get_group_contributions(group):
+    """Combine a group's individually listed contributions with its rollups."""
+    contributions = list(group["contributions"])
+    for rollup in group["rollup"].values():
+        if rollup["total"] == 1:
+            # If there's only one contribution, don't roll up. Throw away rollup fields.
+            contributions.append(pick_and_redact_contribution(rollup, CONTRIBUTION_FIELDS))
+        else:
+            # Throw away fields that only pertain to one contribution, since this will be a rollup
+            contributions.append(
+                pick_and_redact_contribution(
+                    rollup, SHARED_CONTRIBUTION_FIELDS + ROLLUP_CONTRIBUTION_FIELDS
+                )
+            )
+    return contributions
+
+
+def sort_group_contributions(contributions):
+    return sorted(
+        contributions,
+        key=lambda x: (
+            x.get("contribution_receipt_amount")
+            if "contribution_receipt_amount" in x
+            else x.get("total_receipt_amount", 0),
+            x.get("contribution_receipt_date")
+            if "contribution_receipt_date" in x
+            else "0",
+        ),
+        reverse=True,
+    )
 
-            all_contribs.append(contrib)
-            process_contribution(contrib, db, donorMap)
-
-        for group, data in donorMap["groups"].items():
-            # Combine the rollups with the contributions list
-            for name in data["rollup"]:
-                if data["rollup"][name]["total"] == 1:
-                    # If there's only one contribution, don't roll up. Throw away rollup fields.
-                    data["rollup"][name] = pick_and_redact_contribution(
-                        data["rollup"][name], CONTRIBUTION_FIELDS
-                    )
-                else:
-                    # Throw away fields that only pertain to one contribution, since this will be a rollup
-                    data["rollup"][name] = pick_and_redact_contribution(
-                        data["rollup"][name],
-                        SHARED_CONTRIBUTION_FIELDS + ROLLUP_CONTRIBUTION_FIELDS,
-                    )
-
-                # Add to contribs
-                donorMap["groups"][group]["contributions"].append(data["rollup"][name])
-
-            # Delete the rollup dict, we've merged it into contributions
-            del donorMap["groups"][group]["rollup"]
-
-        # Merge manually reviewed contributions back in
-        for contrib_id, contrib in manually_reviewed.items():
-            status = contrib.get("manualReview", {}).get("status")
-
-            # For "omit" contributions, store minimal data to preserve the manual review decision
-            # This prevents them from being reprocessed on subsequent runs
-            if status == "omit":
-                # Create minimal contribution with just ID fields and manualReview
-                minimal_contrib = {
-                    "manualReview": contrib["manualReview"],
-                }
 
-                # Include description if present (top-level field)
-                if "description" in contrib:
-                    minimal_contrib["description"] = contrib["description"]
-
-                # Include ID fields needed for matching
-                if "transaction_id" in contrib:
-                    minimal_contrib["transaction_id"] = contrib["transaction_id"]
-                if "contributor_name" in contrib:
-                    minimal_contrib["contributor_name"] = contrib["contributor_name"]
-                if "contribution_receipt_amount" in contrib:
-                    minimal_contrib["contribution_receipt_amount"] = contrib[
-                        "contribution_receipt_amount"
-                    ]
-                elif "total_receipt_amount" in contrib:
-                    minimal_contrib["total_receipt_amount"] = contrib[
-                        "total_receipt_amount"
-                    ]
-                if "contribution_receipt_date" in contrib:
-                    minimal_contrib["contribution_receipt_date"] = contrib[
-                        "contribution_receipt_date"
-                    ]
-                elif "oldest" in contrib:
-                    minimal_contrib["oldest"] = contrib["oldest"]
-
-                # Add to a special OMITTED group that frontend will filter out
-                if "OMITTED" not in donorMap["groups"]:
-                    donorMap["groups"]["OMITTED"] = {
-                        "contributions": [],
-                        "rollup": {},
-                        "total": 0,
-                    }
-                donorMap["groups"]["OMITTED"]["contributions"].append(minimal_contrib)
-                continue
+def get_manual_amount(contrib):
+    return contrib.get("contribution_receipt_amount") or contrib.get(
+        "total_receipt_amount", 0
+    )
 
-            # Only merge back full contributions with status "verified"
-            if status != "verified":
-                continue
 
-            # Get group name (same logic as in process_contribution)
-            group = contrib.get("contributor_employer") or contrib.get(
-                "contributor_name", "UNKNOWN"
+def load_aggregation_state(db, committee_id):
+    """
+    Load the state needed to update a committee's contributions incrementally: the group and rollup each transaction
+    was added to, and the groups' individually listed contributions and rollups before they were merged for display.
+    Returns None if there's no usable state.
+    """
+    doc = db.client.collection("contributionAggregates").document(committee_id).get()
+    if not doc.exists:
+        return None
+    stored = doc.to_dict()
+    if stored.get("version") != AGGREGATION_STATE_VERSION:
+        return None
+
+    transactions = {}
+    groups = {}
+    for entry in stream_records(db, "contributionAggregates", committee_id, stored, "entries"):
+        kind = entry.pop("kind")
+        if kind == "group":
+            group = {"contributions": [], "rollup": {}, "members": {}, "total": entry["total"]}
+            if "link" in entry:
+                group["link"] = entry["link"]
+            groups[entry["key"]] = group
+        elif kind == "contribution":
+            groups[entry["group"]]["contributions"].append(entry["contribution"])
+        elif kind == "rollup":
+            groups[entry["group"]]["rollup"][entry["name"]] = entry["contribution"]
+            groups[entry["group"]]["members"][entry["name"]] = []
+        else:
+            transactions[entry["key"]] = entry
+            if entry["rollup"] is not None:
+                groups[entry["group"]]["members"][entry["rollup"]].append(entry["key"])
+    return {
+        "sources": stored["sources"],
+        "totals": stored["totals"],
+        "transactions": transactions,
+        "groups": groups,
+    }
+
+
+def store_aggregation_state(db, committee_id, state):
+    # Stored as a list of small entries (each group followed by its listed contributions and rollups, then each
+    # transaction) split into chunks, since a large committee's state would otherwise pass Firestore's 1 MiB document
+    # limit. Only chunks with changed entries are rewritten. Rollup members aren't stored, since they're the
+    # transactions added to each rollup, in order.
+    entries = []
+    for name, group in state["groups"].items():
+        entry = {"kind": "group", "key": name, "total": group["total"]}
+        if "link" in group:
+            entry["link"] = group["link"]
+        entries.append(entry)
+        for contrib in group["contributions"]:
+            entries.append(
+                {
+                    "kind": "contribution",
+                    "key": get_contribution_id(contrib),
+                    "group": name,
+                    "contribution": contrib,
+                }
             )
-            if group in db.individual_employers:
-                group = contrib.get("contributor_name", "UNKNOWN")
-            elif group in db.company_aliases:
-                group = db.company_aliases[group]
-
-            # Add group if it doesn't exist
-            if group not in donorMap["groups"]:
-                donorMap["groups"][group] = {
+        for rollup_name, rollup in group["rollup"].items():
+            entries.append(
+                {
+                    "kind": "rollup",
+                    "key": f"{name}#{rollup_name}",
+                    "group": name,
+                    "name": rollup_name,
+                    "contribution": pick(rollup, ROLLUP_STATE_FIELDS),
+                }
+            )
+    for transaction in state["transactions"].values():
+        entries.append({"kind": "transaction", **transaction})
+    write_chunked(
+        db,
+        "contributionAggregates",
+        committee_id,
+        {
+            "version": AGGREGATION_STATE_VERSION,
+            "sources": state["sources"],
+            "totals": state["totals"],
+            "entries": entries,
+        },
+        "entries",
+        key="key",
+    )
+
+
+def get_totals(donorMap):
+    return [
+        donorMap["contributions_count"],
+        donorMap["total_contributed"],
+        donorMap["total_transferred"],
+    ]
+
+
+def rebuild_contributions(db, records, manually_reviewed):
+    """
+    Process all of a committee's contributions from scratch.
+
+    Returns:
+        (donorMap, state): The contributions document, and the aggregation state to update it from later
+    """
+    manually_reviewed_ids = set(manually_reviewed.keys())
+    state = {"transactions": {}, "groups": {}}
+    donorMap = {
+        "contributions_count": 0,
+        "groups": state["groups"],
+        "by_date": [],
+        "total_contributed": 0,
+        "total_transferred": 0,
+    }
+
+    all_contribs = []
+    for key, contrib in records.items():
+        if apply_contribution(key, contrib, db, donorMap, state, manually_reviewed_ids):
+            all_contribs.append(contrib)
+
+    # Combine the rollups with the contributions lists. The groups in the state keep their separate rollups, for
+    # updating later.
+    groups = {}
+    for group, data in state["groups"].items():
+        groups[group] = {
+            "contributions": get_group_contributions(data),
+            "total": data["total"],
+        }
+        if "link" in data:
+            groups[group]["link"] = data["link"]
+
+    # Merge manually reviewed contributions back in
+    for contrib_id, contrib in manually_reviewed.items():
+        status = contrib.get("manualReview", {}).get("status")
+
+        # For "omit" contributions, store minimal data to preserve the manual review decision
+        # This prevents them from being reprocessed on subsequent runs
+        if status == "omit":
+            # Create minimal contribution with just ID fields and manualReview
+            minimal_contrib = {
+                "manualReview": contrib["manualReview"],
+            }
+
+            # Include description if present (top-level field)
+            if "description" in contrib:
+                minimal_contrib["description"] = contrib["description"]
+
+            # Include ID fields needed for matching
+            if "transaction_id" in contrib:
+                minimal_contrib["transaction_id"] = contrib["transaction_id"]
+            if "contributor_name" in contrib:
+                minimal_contrib["contributor_name"] = contrib["contributor_name"]
+            if "contribution_receipt_amount" in contrib:
+                minimal_contrib["contribution_receipt_amount"] = contrib[
+                    "contribution_receipt_amount"
+                ]
+            elif "total_receipt_amount" in contrib:
+                minimal_contrib["total_receipt_amount"] = contrib[
+                    "total_receipt_amount"
+                ]
+            if "contribution_receipt_date" in contrib:
+                minimal_contrib["contribution_receipt_date"] = contrib[
+                    "contribution_receipt_date"
+                ]
+            elif "oldest" in contrib:
+                minimal_contrib["oldest"] = contrib["oldest"]
+
+            # Add to a special OMITTED group that frontend will filter out
+            if "OMITTED" not in groups:
+                groups["OMITTED"] = {
                     "contributions": [],
-                    "rollup": {},
                     "total": 0,
                 }
-                if "link" in contrib:
-                    donorMap["groups"][group]["link"] = contrib["link"]
+            groups["OMITTED"]["contributions"].append(minimal_contrib)
+            continue
 
-            # Add to contributions list
-            donorMap["groups"][group]["contributions"].append(contrib)
+        # Only merge back full contributions with status "verified"
+        if status != "verified":
+            continue
 
-            # Update group total
-            amount = contrib.get("contribution_receipt_amount") or contrib.get(
-                "total_receipt_amount", 0
-            )
-            donorMap["groups"][group]["total"] = round(
-                donorMap["groups"][group]["total"] + amount, 2
-            )
+        # Get group name (same logic as in process_contribution)
+        group, _ = db.group_resolver.resolve(
+            contrib.get("contributor_employer"), contrib.get("contributor_name")
+        )
 
-            # Add to all_contribs for by_date list
-            all_contribs.append(contrib)
+        # Add group if it doesn't exist
+        if group not in groups:
+            groups[group] = {
+                "contributions": [],
+                "total": 0,
+            }
+            if "link" in contrib:
+                groups[group]["link"] = contrib["link"]
 
-            # Update overall totals
-            donorMap["contributions_count"] += 1
-            if (
-                contrib.get("line_number") == "12"
-                or contrib.get("line_number", "").lower() == "11c"
-            ):
-                donorMap["total_transferred"] = round(
-                    donorMap["total_transferred"] + amount, 2
-                )
-            else:
-                donorMap["total_contributed"] = round(
-                    donorMap["total_contributed"] + amount, 2
-                )
+        # Add to contributions list
+        groups[group]["contributions"].append(contrib)
+
+        # Update group total
+        amount = get_manual_amount(contrib)
+        groups[group]["total"] = round(groups[group]["total"] + amount, 2)
 
-        # Re-sort contributions within each group after adding manually reviewed ones
-        for group in donorMap["groups"].values():
-            group["contributions"] = sorted(
-                group["contributions"],
-                key=lambda x: (
-                    x.get("contribution_receipt_amount")
-                    if "contribution_receipt_amount" in x
-                    else x.get("total_receipt_amount", 0),
-                    x.get("contribution_receipt_date")
-                    if "contribution_receipt_date" in x
-                    else "0",
-                ),
-                reverse=True,
+        # Add to all_contribs for by_date list
+        all_contribs.append(contrib)
+
+        # Update overall totals
+        donorMap["contributions_count"] += 1
+        if is_transfer(contrib):
+            donorMap["total_transferred"] = round(
+                donorMap["total_transferred"] + amount, 2
             )
+        else:
+            donorMap["total_contributed"] = round(
+                donorMap["total_contributed"] + amount, 2
+            )
+
+    # Re-sort contributions within each group after adding manually reviewed ones
+    for group in groups.values():
+        group["contributions"] = sort_group_contributions(group["contributions"])
+
+    # Re-sort by_date after adding manually reviewed contributions
+    donorMap["by_date"] = sorted(all_contribs, key=get_receipt_date, reverse=True)
+
+    # Turn the map of groups into a list, sorted descending by total contributions
+    donor_list = [{"company": company, **data} for company, data in groups.items()]
+    donorMap["groups"] = sorted(donor_list, key=lambda x: x["total"], reverse=True)
+    return donorMap, state
+
+
+def update_contributions(db, records, manually_reviewed_ids, state, existing):
+    """
+    Update a committee's previously processed contributions in place with only the transactions that were added,
+    amended or removed since they were processed.
+
+    Removed and amended transactions are retracted from the totals, groups, rollups and by_date list using the
+    aggregation state, then new and amended transactions are added. Only the groups they touched are re-merged and
+    re-sorted, and by_date stays sorted by inserting into it.
+
+    Returns the updated contributions document, or None if nothing changed.
+    """
+    donorMap = existing
+    by_date = donorMap["by_date"]
+    deltas = {
+        "contributions_count": 0,
+        "groups": state["groups"],
+        "total_contributed": 0,
+        "total_transferred": 0,
+    }
+
+    changed = [
+        key
+        for key, applied in state["transactions"].items()
+        if key not in records or applied["fingerprint"] != get_fingerprint(records[key])
+    ]
+    touched_groups = set()
+    stale_rollups = set()
+    for key in changed:
+        group, rollup_name = retract_contribution(key, deltas, state, by_date)
+        touched_groups.add(group)
+        if rollup_name is not None:
+            stale_rollups.add((group, rollup_name))
+    for group, rollup_name in stale_rollups:
+        recompute_rollup(state["groups"][group], rollup_name, records, db)
+
+    for key, contrib in records.items():
+        if key in state["transactions"]:
+            continue
+        if apply_contribution(key, contrib, db, deltas, state, manually_reviewed_ids):
+            touched_groups.add(state["transactions"][key]["group"])
+            insert_by_date(by_date, contrib)
+
+    if not touched_groups:
+        return None
+
+    donorMap["contributions_count"] += deltas["contributions_count"]
+    for field in ["total_contributed", "total_transferred"]:
+        donorMap[field] = round(donorMap[field] + deltas[field], 2)
+
+    groups = {group["company"]: group for group in donorMap["groups"]}
+    for name in touched_groups:
+        previous = groups.pop(name, {"company": name, "contributions": [], "total": 0})
+        manual = [x for x in previous["contributions"] if "manualReview" in x]
+        data = state["groups"].get(name)
+        if data is not None and not data["contributions"] and not data["rollup"]:
+            # Every contribution in the group was removed
+            del state["groups"][name]
+            data = None
+        if data is None and not manual:
+            continue
+
+        group = {"company": name, "contributions": manual, "total": 0}
+        if data is not None:
+            group["contributions"] = get_group_contributions(data) + manual
+            group["total"] = data["total"]
+            if "link" in data:
+                group["link"] = data["link"]
+        elif "link" in previous:
+            group["link"] = previous["link"]
+        for contrib in manual:
+            group["total"] = round(group["total"] + get_manual_amount(contrib), 2)
+        group["contributions"] = sort_group_contributions(group["contributions"])
+        groups[name] = group
+
+    donorMap["groups"] = sorted(groups.values(), key=lambda x: x["total"], reverse=True)
+    return donorMap
+
+
+def process_committee_contributions(db, committee_ids=None, full_rebuild=False):
+    """
+    Process raw committee contributions into the contributions collection.
+
+    If committee_ids is provided, only those committees are reprocessed; otherwise every committee in
+    rawContributions is reprocessed.
+
+    Committees are updated incrementally from the transactions that changed since they were last processed, using
+    the aggregation state stored alongside them in contributionAggregates. They're rebuilt from scratch instead if
+    full_rebuild is True, if there's no usable state, or if anything else the aggregates depend on (constants, claimed
+    contributions, manual reviews) has changed.
+    """
+    raw_committee_contributions = get_documents(db, "rawContributions", committee_ids)
+    individuals = (
+        db.client.collection("constants").document("individuals").get().to_dict()
+    )
+    constants_fingerprint = get_constants_fingerprint(db)
+    for doc in raw_committee_contributions:
+        if not doc.exists:
+            continue
+        committee_id = doc.id
+
+        # Load existing manually reviewed contributions
+        existing = (
+            db.client.collection("contributions").document(committee_id).get().to_dict()
+        )
+        manually_reviewed = load_manually_reviewed_contributions(
+            db, committee_id, existing or {}
+        )
 
-        # Re-sort by_date after adding manually reviewed contributions
-        donorMap["by_date"] = sorted(
-            all_contribs,
-            key=lambda x: x.get("contribution_receipt_date", "0"),
-            reverse=True,
+        # Get any claimed contributions
+        claimed = get_claimed_contributions(individuals, committee_id)
+        transactions = stream_records(
+            db, "rawContributions", committee_id, doc.to_dict(), "transactions"
         )
+        records = get_contribution_records(transactions, claimed)
+        sources = get_sources_fingerprint(constants_fingerprint, claimed, manually_reviewed)
 
-        # Turn the map of groups into a list, sorted descending by total contributions
-        donor_list = [
-            {"company": company, **data} for company, data in donorMap["groups"].items()
-        ]
-        donorMap["groups"] = sorted(donor_list, key=lambda x: x["total"], reverse=True)
+        state = None if full_rebuild or not existing else load_aggregation_state(db, committee_id)
+        if (
+            state is not None
+            and state["sources"] == sources
+            and state["totals"] == get_totals(existing)
+        ):
+            donorMap = update_contributions(
+                db, records, set(manually_reviewed.keys()), state, existing
+            )
+            if donorMap is None:
+                # Nothing changed
+                continue
+        else:
+            donorMap, state = rebuild_contributions(db, records, manually_reviewed)
 
         db.client.collection("contributions").document(committee_id).set(donorMap)
+        # Stored after the contributions, with their totals, so that a failure in between causes a rebuild next time
+        # rather than applying changes against the wrong state.
+        state["sources"] = sources
+        state["totals"] = get_totals(donorMap)
+        store_aggregation_state(db, committee_id, state)
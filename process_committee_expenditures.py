@@ -1,13 +1,30 @@
+from google.cloud import firestore
+
 from states import SPECIAL_ELECTIONS
 
+PARTY_FIELDS = [
+    "dem_support",
+    "dem_oppose",
+    "rep_support",
+    "rep_oppose",
+    "oppose_benefit_dem",
+    "oppose_benefit_rep",
+    "oppose_benefit_mix",  # Both parties benefit from opposing
+    "oppose_benefit_unk",  # Unknown who benefits from opposing
+]
+
+# Bump when the shape of the snapshot or of the entries in it changes, to force a rebuild
+SNAPSHOT_VERSION = 1
+
+
+def get_date(x):
+    date = x.get("expenditure_date")
+    if not date:
+        date = x.get("dissemination_date")
+    return date if date else "0"
 
-def sort_and_slice(lst, length=10):
-    def get_date(x):
-        date = x.get("expenditure_date")
-        if not date:
-            date = x.get("dissemination_date")
-        return date if date else "0"
 
+def sort_and_slice(lst, length=10):
     return sorted(
         lst,
         key=get_date,
@@ -32,179 +49,290 @@ def get_race_name(expenditure):
     return race
 
 
-def process_expenditures(db):
-    all_expenditures = (
-        db.client.collection("expenditures").document("all").get().to_dict()
-    )
-    states = {}
-    new_opposition_spending = set()
-    all_parties = {
-        "dem_oppose": 0,
-        "dem_support": 0,
-        "rep_oppose": 0,
-        "rep_support": 0,
-        "oppose_benefit_dem": 0,
-        "oppose_benefit_rep": 0,
-        "oppose_benefit_mix": 0,  # Both parties benefit from opposing
-        "oppose_benefit_unk": 0,  # Unknown who benefits from opposing
-    }
-    committees = {}
-    totals = {
-        "all": 0,
-        "by_committee": {},
-    }
-    for uid, expenditure in all_expenditures.items():
-        race = get_race_name(expenditure)
-        committee_id = expenditure["committee_id"]
-        state = expenditure["candidate_office_state"]
-        if state is None:
-            state = "US"
-
-        totals["all"] += expenditure["expenditure_amount"]
-        if committee_id not in totals["by_committee"]:
-            totals["by_committee"][committee_id] = expenditure["expenditure_amount"]
-        else:
-            totals["by_committee"][committee_id] += expenditure["expenditure_amount"]
-
-        # Initialize state and set total
-        if state not in states:
-            states[state] = {
-                "total": expenditure["expenditure_amount"],
-                "by_committee": {},
-                "by_race": {},
-            }
+def get_parties(expenditure, db):
+    """Get the party support/oppose totals that an expenditure counts towards."""
+    parties = []
+    if expenditure["support_oppose_indicator"] == "S":
+        if expenditure["candidate_party"] == "DEM":
+            parties.append("dem_support")
+        elif expenditure["candidate_party"] == "REP":
+            parties.append("rep_support")
+    elif expenditure["support_oppose_indicator"] == "O":
+        if expenditure["candidate_party"] == "DEM":
+            parties.append("dem_oppose")
+        elif expenditure["candidate_party"] == "REP":
+            parties.append("rep_oppose")
+        if expenditure["candidate_id"] in db.opposition_spending:
+            party = db.opposition_spending[expenditure["candidate_id"]]["benefitsParty"]
+            if party in ("DEM", "REP", "MIX"):
+                parties.append("oppose_benefit_" + party.lower())
         else:
-            states[state]["total"] = round(
-                states[state]["total"] + expenditure["expenditure_amount"], 2
-            )
+            parties.append("oppose_benefit_unk")
+    return parties
 
-        # Initialize committee and record
-        if committee_id not in states[state]["by_committee"]:
-            states[state]["by_committee"][committee_id] = {
-                "total": expenditure["expenditure_amount"],
-                "expenditures": [uid],
-            }
-        else:
-            states[state]["by_committee"][committee_id]["total"] = round(
-                states[state]["by_committee"][committee_id]["total"]
-                + expenditure["expenditure_amount"],
-                2,
-            )
-            states[state]["by_committee"][committee_id]["expenditures"].append(uid)
 
-        # Initialize race and record
-        if race not in states[state]["by_race"]:
-            states[state]["by_race"][race] = {
-                "total": expenditure["expenditure_amount"],
+def get_aggregate_entry(expenditure, db):
+    """
+    Summarize how an expenditure counts towards the aggregates. These entries are what's stored in the snapshot and
+    compared between runs, so an expenditure counts as amended only if something the aggregates use has changed.
+    """
+    state = expenditure["candidate_office_state"]
+    if state is None:
+        state = "US"
+    return {
+        "committee_id": expenditure["committee_id"],
+        "state": state,
+        "race": get_race_name(expenditure),
+        "amount": expenditure["expenditure_amount"],
+        "date": get_date(expenditure),
+        "parties": get_parties(expenditure, db),
+    }
+
+
+def add_amount(totals, key, amount):
+    totals[key] = round(totals.get(key, 0) + amount, 2)
+
+
+def apply_entry(aggregates, uid, entry, sign, all_expenditures):
+    """
+    Add (sign=1) or retract (sign=-1) an expenditure's entry to or from the aggregates, removing any state, race, or
+    committee that's left without expenditures.
+    """
+    amount = sign * entry["amount"]
+    committee_id, state, race = entry["committee_id"], entry["state"], entry["race"]
+    aggregates["touched_states"].add(state)
+    aggregates["touched_committees"].add(committee_id)
+
+    totals = aggregates["totals"]
+    totals["all"] = round(totals["all"] + amount, 2)
+    add_amount(totals["by_committee"], committee_id, amount)
+
+    # Record party support/oppose for all committees, and per-committee
+    committee_parties = aggregates["committees"].setdefault(
+        committee_id, {party: 0 for party in PARTY_FIELDS}
+    )
+    for party in entry["parties"]:
+        add_amount(aggregates["all_parties"], party, amount)
+        add_amount(committee_parties, party, amount)
+
+    states = aggregates["states"]
+    if sign > 0:
+        # Initialize state, committee and race as needed, and record
+        state_data = states.setdefault(
+            state, {"total": 0, "by_committee": {}, "by_race": {}}
+        )
+        committee_data = state_data["by_committee"].setdefault(
+            committee_id, {"total": 0, "expenditures": []}
+        )
+        if race not in state_data["by_race"]:
+            expenditure = all_expenditures[uid]
+            state_data["by_race"][race] = {
+                "total": 0,
                 "details": {
                     "candidate_office": expenditure["candidate_office"],
                     "candidate_office_district": expenditure[
                         "candidate_office_district"
                     ],
                 },
-                "expenditures": [uid],
+                "expenditures": [],
             }
-        else:
-            states[state]["by_race"][race]["total"] = round(
-                states[state]["by_race"][race]["total"]
-                + expenditure["expenditure_amount"],
-                2,
-            )
-            states[state]["by_race"][race]["expenditures"].append(uid)
-
-        # Record party support/oppose for all committees, and per-committee
-        if committee_id not in committees:
-            committees[committee_id] = {
-                "dem_support": 0,
-                "dem_oppose": 0,
-                "rep_support": 0,
-                "rep_oppose": 0,
-                "oppose_benefit_dem": 0,
-                "oppose_benefit_rep": 0,
-                "oppose_benefit_mix": 0,
-                "oppose_benefit_unk": 0,
+        race_data = state_data["by_race"][race]
+        committee_data["expenditures"].append(uid)
+        race_data["expenditures"].append(uid)
+    else:
+        state_data = states[state]
+        committee_data = state_data["by_committee"][committee_id]
+        race_data = state_data["by_race"][race]
+        committee_data["expenditures"].remove(uid)
+        race_data["expenditures"].remove(uid)
+
+    add_amount(state_data, "total", amount)
+    add_amount(committee_data, "total", amount)
+    add_amount(race_data, "total", amount)
+
+    if not committee_data["expenditures"]:
+        del state_data["by_committee"][committee_id]
+    if not race_data["expenditures"]:
+        del state_data["by_race"][race]
+    if not state_data["by_committee"]:
+        del states[state]
+
+
+def load_aggregates(db, snapshot):
+    """Load the aggregates written by the previous run, to apply changes to."""
+    collection = db.client.collection("expenditures")
+    return {
+        "states": collection.document("states").get().to_dict() or {},
+        "totals": collection.document("total").get().to_dict(),
+        "all_parties": collection.document("by_party").get().to_dict(),
+        "recent": collection.document("recent").get().to_dict(),
+        "committees": snapshot["by_party_by_committee"],
+        "touched_states": set(),
+        "touched_committees": set(),
+    }
+
+
+def empty_aggregates():
+    return {
+        "states": {},
+        "totals": {"all": 0, "by_committee": {}},
+        "all_parties": {party: 0 for party in PARTY_FIELDS},
+        "recent": {"all": [], "by_committee": {}},
+        "committees": {},
+        "touched_states": set(),
+        "touched_committees": set(),
+    }
+
+
+def update_recent(recent, all_expenditures, changed, changed_committees, committee_ids, full):
+    """
+    Update the lists of most recent expenditures, overall and for each committee.
+
+    Only committees with changed expenditures are recomputed. The overall list is recomputed only if one of its
+    expenditures was amended or removed; otherwise new expenditures are merged into it.
+    """
+    changed = set(changed)
+    if full or any(uid in changed for uid in recent["all"]):
+        recent["all"] = [x["uid"] for x in sort_and_slice(all_expenditures.values(), 50)]
+    else:
+        candidates = [all_expenditures[uid] for uid in recent["all"]] + [
+            all_expenditures[uid] for uid in changed if uid in all_expenditures
+        ]
+        recent["all"] = [x["uid"] for x in sort_and_slice(candidates, 50)]
+
+    stale = {
+        committee_id
+        for committee_id in committee_ids
+        if full
+        or committee_id in changed_committees
+        or committee_id not in recent["by_committee"]
+    }
+    by_committee = {committee_id: [] for committee_id in stale}
+    if stale:
+        for expenditure in all_expenditures.values():
+            if expenditure["committee_id"] in by_committee:
+                by_committee[expenditure["committee_id"]].append(expenditure)
+    recent["by_committee"] = {
+        committee_id: (
+            [x["uid"] for x in sort_and_slice(by_committee[committee_id])]
+            if committee_id in stale
+            else recent["by_committee"][committee_id]
+        )
+        for committee_id in committee_ids
+    }
+
+
+def process_expenditures(db, full_rebuild=False):
+    """
+    Aggregate expenditures.all into expenditures.states, .total, .by_party and .recent, and each committee's by_party.
+
+    Expenditures are compared against a snapshot of what was aggregated in the previous run (stored in
+    expenditureAggregates), and only the added, removed, and amended ones are applied to the stored aggregates as
+    signed deltas. Only the states and committees they affect are rewritten. Everything is rebuilt from scratch if
+    full_rebuild is True, or if there's no usable snapshot.
+
+    Returns the IDs of opposed candidates for whom it's not yet known which party benefits from the opposition.
+    """
+    all_expenditures = (
+        db.client.collection("expenditures").document("all").get().to_dict()
+    ) or {}
+    committee_ids = [committee["id"] for committee in db.committees.values()]
+
+    entries = {}
+    new_opposition_spending = set()
+    for uid, expenditure in all_expenditures.items():
+        entries[uid] = get_aggregate_entry(expenditure, db)
+        if "oppose_benefit_unk" in entries[uid]["parties"]:
+            new_opposition_spending.add(expenditure["candidate_id"])
+
+    snapshot_ref = db.client.collection("expenditureAggregates").document("snapshot")
+    snapshot = None if full_rebuild else snapshot_ref.get().to_dict()
+    full = not (
+        snapshot
+        and snapshot.get("version") == SNAPSHOT_VERSION
+        and snapshot.get("complete")
+    )
+    if full:
+        previous = {}
+        aggregates = empty_aggregates()
+    else:
+        previous = snapshot["expenditures"]
+        aggregates = load_aggregates(db, snapshot)
+
+    # Removed and amended expenditures, then added ones, in a stable order so rebuilds list them as before
+    changed = [uid for uid in previous if previous[uid] != entries.get(uid)] + [
+        uid for uid in entries if uid not in previous
+    ]
+    if not full and not changed and set(aggregates["recent"]["by_committee"]) == set(committee_ids):
+        return new_opposition_spending
+
+    # Mark the snapshot incomplete while the aggregates are written, so that a failure partway through causes a
+    # rebuild next time rather than applying changes to half-updated aggregates
+    snapshot_ref.set({"complete": False}, merge=True)
+
+    for uid in changed:
+        if uid in previous:
+            apply_entry(aggregates, uid, previous[uid], -1, all_expenditures)
+        if uid in entries:
+            apply_entry(aggregates, uid, entries[uid], 1, all_expenditures)
+    active_committees = {entry["committee_id"] for entry in entries.values()}
+    for committee_id in list(aggregates["totals"]["by_committee"]):
+        if committee_id not in active_committees:
+            del aggregates["totals"]["by_committee"][committee_id]
+
+    states_ref = db.client.collection("expenditures").document("states")
+    if full:
+        states_ref.set(aggregates["states"])
+    elif aggregates["touched_states"]:
+        states_ref.update(
+            {
+                db.client.field_path(state): aggregates["states"].get(
+                    state, firestore.DELETE_FIELD
+                )
+                for state in aggregates["touched_states"]
             }
-        if expenditure["support_oppose_indicator"] == "S":
-            if expenditure["candidate_party"] == "DEM":
-                committees[committee_id]["dem_support"] += expenditure[
-                    "expenditure_amount"
-                ]
-                all_parties["dem_support"] += expenditure["expenditure_amount"]
-            elif expenditure["candidate_party"] == "REP":
-                committees[committee_id]["rep_support"] += expenditure[
-                    "expenditure_amount"
-                ]
-                all_parties["rep_support"] += expenditure["expenditure_amount"]
-        elif expenditure["support_oppose_indicator"] == "O":
-            if expenditure["candidate_party"] == "DEM":
-                committees[committee_id]["dem_oppose"] += expenditure[
-                    "expenditure_amount"
-                ]
-                all_parties["dem_oppose"] += expenditure["expenditure_amount"]
-            elif expenditure["candidate_party"] == "REP":
-                committees[committee_id]["rep_oppose"] += expenditure[
-                    "expenditure_amount"
-                ]
-                all_parties["rep_oppose"] += expenditure["expenditure_amount"]
-            if expenditure["candidate_id"] in db.opposition_spending:
-                party = db.opposition_spending[expenditure["candidate_id"]][
-                    "benefitsParty"
-                ]
-                if party == "DEM":
-                    committees[committee_id]["oppose_benefit_dem"] += expenditure[
-                        "expenditure_amount"
-                    ]
-                    all_parties["oppose_benefit_dem"] += expenditure[
-                        "expenditure_amount"
-                    ]
-                elif party == "REP":
-                    committees[committee_id]["oppose_benefit_rep"] += expenditure[
-                        "expenditure_amount"
-                    ]
-                    all_parties["oppose_benefit_rep"] += expenditure[
-                        "expenditure_amount"
-                    ]
-                elif party == "MIX":
-                    committees[committee_id]["oppose_benefit_mix"] += expenditure[
-                        "expenditure_amount"
-                    ]
-                    all_parties["oppose_benefit_mix"] += expenditure[
-                        "expenditure_amount"
-                    ]
-            else:
-                committees[committee_id]["oppose_benefit_unk"] += expenditure[
-                    "expenditure_amount"
-                ]
-                all_parties["oppose_benefit_unk"] += expenditure["expenditure_amount"]
-                new_opposition_spending.add(expenditure["candidate_id"])
-
-    db.client.collection("expenditures").document("states").set(states)
-    for committee_id, committee_data in committees.items():
+        )
+    for committee_id in aggregates["touched_committees"]:
         db.client.collection("committees").document(committee_id).set(
-            {"by_party": committee_data}, merge=True
+            {"by_party": aggregates["committees"][committee_id]}, merge=True
         )
-    db.client.collection("expenditures").document("total").set(totals)
+    db.client.collection("expenditures").document("total").set(aggregates["totals"])
 
     # Get most recent for committee, all
-    most_recent_all = [x["uid"] for x in sort_and_slice(all_expenditures.values(), 50)]
-    most_recent_by_committee = {}
+    update_recent(
+        aggregates["recent"],
+        all_expenditures,
+        changed,
+        aggregates["touched_committees"],
+        committee_ids,
+        full,
+    )
+    db.client.collection("expenditures").document("recent").set(aggregates["recent"])
+    db.client.collection("expenditures").document("by_party").set(
+        aggregates["all_parties"]
+    )
 
-    committee_ids = [committee["id"] for committee in db.committees.values()]
-    for committee_id in committee_ids:
-        most_recent_by_committee[committee_id] = [
-            x["uid"]
-            for x in sort_and_slice(
-                filter(
-                    lambda x: x["committee_id"] == committee_id,
-                    all_expenditures.values(),
-                )
+    if full:
+        snapshot_ref.set(
+            {
+                "version": SNAPSHOT_VERSION,
+                "complete": True,
+                "expenditures": entries,
+                "by_party_by_committee": aggregates["committees"],
+            }
+        )
+    else:
+        # Only write the entries that changed
+        snapshot_updates = {
+            db.client.field_path("expenditures", uid): entries.get(
+                uid, firestore.DELETE_FIELD
             )
-        ]
-    db.client.collection("expenditures").document("recent").set(
-        {
-            "all": most_recent_all,
-            "by_committee": most_recent_by_committee,
+            for uid in changed
         }
-    )
-    db.client.collection("expenditures").document("by_party").set(all_parties)
+        for committee_id in aggregates["touched_committees"]:
+            snapshot_updates[
+                db.client.field_path("by_party_by_committee", committee_id)
+            ] = aggregates["committees"][committee_id]
+        snapshot_updates["complete"] = True
+        snapshot_ref.update(snapshot_updates)
     return new_opposition_spending
@@ -1,5 +1,6 @@
+from chunked_documents import stream_records
 from get_missing_recipients import get_missing_recipient_data
-from utils import pick, compare_names_lastfirst
+from utils import pick, compare_names_lastfirst, get_documents
 
 ROLLUP_THRESHOLD = 10000
 
@@ -36,16 +37,28 @@ def redact_contribution(d, keys):
     return pick(d, keys)
 
 
-def process_company_contributions(db, session):
+def process_company_contributions(db, session, company_ids=None):
+    """
+    Process raw company contributions, plus contributions by related individuals, into the companies collection.
+
+    If company_ids is provided, only those companies are reprocessed. Other companies keep their stored contributions
+    and party summaries, which still count toward the combined company totals. Reprocessed contributions are kept in
+    memory until recipient data is filled in, so each companies document is written once.
+    """
     recipients_doc = db.client.collection("allRecipients").document("recipients").get()
     all_recipients = recipients_doc.to_dict() if recipients_doc.exists else {}
     if not all_recipients:
         all_recipients = {}
     new_recipients = set()
+    grouped_by_company = {}
 
-    for doc in db.client.collection("rawCompanyContributions").stream():
-        company_id, company = doc.id, doc.to_dict()
-        contributions = company["contributions"]
+    for doc in get_documents(db, "rawCompanyContributions", company_ids):
+        if not doc.exists:
+            continue
+        company_id = doc.id
+        contributions = stream_records(
+            db, "rawCompanyContributions", company_id, doc.to_dict(), "contributions"
+        )
 
         grouped_by_recipient = {}
         for contrib in contributions:
@@ -68,9 +81,7 @@ def process_company_contributions(db, session):
                 "contribution_receipt_amount"
             ]
 
-        db.client.collection("companies").document(company_id).set(
-            {"contributions": grouped_by_recipient}, merge=True
-        )
+        grouped_by_company[company_id] = grouped_by_recipient
 
     # Get recipient data and record any new committees
     recipients = get_missing_recipient_data(all_recipients, db, session)
@@ -82,10 +93,17 @@ def process_company_contributions(db, session):
     companies_list = []
     for doc in db.client.collection("companies").stream():
         company_id, company = doc.id, doc.to_dict()
+        if company_id in grouped_by_company:
+            company["contributions"] = grouped_by_company.pop(company_id)
         companies_list.append((company_id, company))
+        if company_ids is not None and company_id not in company_ids:
+            continue
         related_individuals = company.get("relatedIndividuals", [])
         for ind in related_individuals:
             all_individual_ids.add(ind["id"])
+    # Companies with raw contributions that haven't been written to the companies collection yet
+    for company_id, grouped_by_recipient in grouped_by_company.items():
+        companies_list.append((company_id, {"contributions": grouped_by_recipient}))
 
     # Batch fetch all individuals at once
     individuals_data = {}
@@ -107,6 +125,25 @@ def process_company_contributions(db, session):
     # multiple companies (e.g. a founder of two related companies).
     globally_attributed_individual_transaction_ids = set()
     for company_id, company in companies_list:
+        if company_ids is not None and company_id not in company_ids:
+            # Unchanged since the last run. Its stored summary still counts toward the totals, and its individual
+            # contributions stay attributed to it.
+            stored_contributions = company.get("contributions", [])
+            if isinstance(stored_contributions, dict):
+                stored_contributions = stored_contributions.values()
+            for group_data in stored_contributions:
+                for c in group_data.get("contributions", []):
+                    if c.get("isIndividual") and "transaction_id" in c:
+                        globally_attributed_individual_transaction_ids.add(
+                            c["transaction_id"]
+                        )
+            for party, amount in company.get("party_summary", {}).items():
+                all_companies_total += amount
+                if party not in all_companies_by_party:
+                    all_companies_by_party[party] = 0
+                all_companies_by_party[party] += amount
+            continue
+
         contributions = company.get("contributions", {})
         related_individuals = company.get("relatedIndividuals", [])
 
@@ -171,18 +208,8 @@ def process_company_contributions(db, session):
                 amount = contrib.get("contribution_receipt_amount", 0)
                 contributor_name = contrib.get("contributor_name", "UNKNOWN")
 
-                # Normalize name for grouping (strip middle initials and normalize case)
-                # "LAST, FIRST MIDDLE" -> "LAST, FIRST" for consistent grouping
-                # Convert to uppercase for case-insensitive matching
-                normalized_name = contributor_name.upper()
-                if ", " in contributor_name:
-                    parts = contributor_name.split(", ", 1)
-                    if len(parts) == 2:
-                        last = parts[0].upper()
-                        first_parts = parts[1].split()
-                        if first_parts:
-                            first = first_parts[0].upper()
-                            normalized_name = f"{last}, {first}"
+                # Normalize name for grouping ("LAST, FIRST MIDDLE" -> "LAST, FIRST", upper case)
+                normalized_name = db.group_resolver.normalize_name(contributor_name)
 
                 if amount >= ROLLUP_THRESHOLD:
                     # Large contributions are kept separate
@@ -1,6 +1,9 @@
 import logging
 import re
+from chunked_documents import stream_records, strip_manifest
 from get_missing_recipients import get_missing_recipient_data
+from transactions import TransactionStore
+from utils import get_documents
 
 
 def all_unique(numbers):
@@ -120,52 +123,64 @@ def attribute_earmarked(contrib):
 def dedupe_by_ids(group):
     grouped_by_transaction_id = {}
     for contrib in group:
-        if contrib["transaction_id"] not in grouped_by_transaction_id:
-            grouped_by_transaction_id[contrib["transaction_id"]] = []
-        grouped_by_transaction_id[contrib["transaction_id"]].append(contrib)
+        if contrib["transaction_id"] in grouped_by_transaction_id:
+            grouped_by_transaction_id[contrib["transaction_id"]].append(contrib)
+        else:
+            grouped_by_transaction_id[contrib["transaction_id"]] = [contrib]
+    if len(grouped_by_transaction_id) == len(group):
+        # No transaction ID was reported more than once
+        return list(group)
 
     deduped_by_id = []
     for contribs in grouped_by_transaction_id.values():
         if len(contribs) == 1:
             deduped_by_id.append(contribs[0])
             continue
-        deduped = remove_efiled(contribs)
-        if len(deduped) == 1:
-            deduped_by_id.append(deduped[0])
+        if len({x["committee_id"] for x in contribs}) == 1:
+            deduped_by_id.append(dedupe_transaction(contribs))
             continue
+        # Transaction IDs are only unique within a filer
+        for committee_id in dict.fromkeys(x["committee_id"] for x in contribs):
+            deduped_by_id.append(
+                dedupe_transaction([x for x in contribs if x["committee_id"] == committee_id])
+            )
+    return deduped_by_id
 
-        # If the transaction has been amended, get the most recent. Hopefully that will leave us with just one.
-        amendment_lengths = [len(x["amendment_chain"]) for x in contribs]
-        longest = max(amendment_lengths)
-        contribs = [x for x in contribs if len(x["amendment_chain"]) == longest]
-        if len(contribs) == 1:
-            deduped_by_id.append(contribs[0])
-            continue
-        else:
-            # See if one of the contributions was an earmarked one, in which case it should be removed.
-            reattributed = [
-                x for x in contribs if "EARMARK" not in get_description(x).upper()
-            ]
-            if len(reattributed) == 0:
-                pass
-            elif len(reattributed) < len(contribs):
-                contribs = remove_efiled(reattributed)
-                if len(contribs) == 1:
-                    deduped_by_id.append(contribs[0])
-                    continue
-            else:
-                contribs = reattributed
 
-        # Last ditch, remove all efiled contribs
-        no_efiled = remove_efiled(contribs, True)
-        if len(no_efiled) > 0:
-            deduped_by_id.append(no_efiled[0])
-            continue
+def dedupe_transaction(contribs):
+    """Pick one of the contributions a committee reported with the same transaction ID."""
+    if len(contribs) == 1:
+        return contribs[0]
+    deduped = remove_efiled(contribs)
+    if len(deduped) == 1:
+        return deduped[0]
+
+    # If the transaction has been amended, get the most recent. Hopefully that will leave us with just one.
+    store = TransactionStore()
+    for contrib in contribs:
+        store.add(contrib)
+    contribs = store.latest_records(contribs[0]["committee_id"], contribs[0]["transaction_id"])
+    if len(contribs) == 1:
+        return contribs[0]
+    else:
+        # See if one of the contributions was an earmarked one, in which case it should be removed.
+        reattributed = [
+            x for x in contribs if "EARMARK" not in get_description(x).upper()
+        ]
+        if len(reattributed) == 0:
+            pass
+        elif len(reattributed) < len(contribs):
+            contribs = remove_efiled(reattributed)
+            if len(contribs) == 1:
+                return contribs[0]
         else:
-            deduped_by_id.append(contribs[0])
-            continue
+            contribs = reattributed
 
-    return deduped_by_id
+    # Last ditch, remove all efiled contribs
+    no_efiled = remove_efiled(contribs, True)
+    if len(no_efiled) > 0:
+        return no_efiled[0]
+    return contribs[0]
 
 
 def process_contribution_group(group):
@@ -255,16 +270,29 @@ def process_contribution_group(group):
     return contribs_to_keep
 
 
-def process_individual_contributions(db, session):
+def process_individual_contributions(db, session, individual_ids=None):
+    """
+    Process raw individual contributions into the individuals collection.
+
+    If individual_ids is provided, only those individuals are reprocessed; otherwise every individual in
+    rawIndividualContributions is rebuilt. Processed individuals are kept in memory until recipient data is filled in
+    and their party summaries can be computed, so each individuals document is written once.
+    """
     recipients_doc = db.client.collection("allRecipients").document("recipients").get()
     all_recipients = recipients_doc.to_dict() if recipients_doc.exists else {}
     if not all_recipients:
         all_recipients = {}
     new_recipients = set()
+    processed = {}
 
-    for doc in db.client.collection("rawIndividualContributions").stream():
-        ind_id, ind = doc.id, doc.to_dict()
-        contributions = ind["contributions"]
+    for doc in get_documents(db, "rawIndividualContributions", individual_ids):
+        if not doc.exists:
+            continue
+        ind_id, raw = doc.id, doc.to_dict()
+        ind = strip_manifest(raw)
+        contributions = stream_records(
+            db, "rawIndividualContributions", ind_id, raw, "contributions"
+        )
 
         grouped_by_date = {}
         for contrib in contributions:
@@ -346,13 +374,11 @@ def process_individual_contributions(db, session):
         sorted_contributions = sorted(
             grouped_by_recipient.values(), key=lambda x: x["total"], reverse=True
         )
-        db.client.collection("individuals").document(ind_id).set(
-            {
-                **ind,
-                "contributions": sorted_contributions,
-                "contributions_by_date": by_date,
-            }
-        )
+        processed[ind_id] = {
+            **ind,
+            "contributions": sorted_contributions,
+            "contributions_by_date": by_date,
+        }
 
     # Get recipient data and record any new committees
     recipients = get_missing_recipient_data(all_recipients, db, session)
@@ -360,8 +386,7 @@ def process_individual_contributions(db, session):
 
     # Summarize spending by party
     # Sadly can't do this in the first loop because it relies on data from get_missing_recipient_data
-    for doc in db.client.collection("individuals").stream():
-        ind_id, ind = doc.id, doc.to_dict()
+    for ind_id, ind in processed.items():
         contributions = ind["contributions"]
         party_summary = {}
         for group_data in contributions:
@@ -388,7 +413,7 @@ def process_individual_contributions(db, session):
             party_summary[party] += group_data["total"]
 
         db.client.collection("individuals").document(ind_id).set(
-            {"party_summary": party_summary}, merge=True
+            {**ind, "party_summary": party_summary}
         )
 
     return new_recipients
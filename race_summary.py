@@ -165,17 +165,13 @@ def summarize_races(db, session):
             ):
                 params["district"] = race_id_split[1]
 
-            FEC_candidates_data = FEC_fetch(
-                session,
-                f"candidates data for {state}",
-                "https://api.open.fec.gov/v1/candidates/search",
-                params,
-            )
+            # Served from the candidate store if these candidates were searched for recently
+            FEC_candidates_results = db.candidate_store.search(session, params)
 
             # Map FEC candidate names to formatted candidate names (which are being used as keys)
             names = {}
             # Add relevant FEC data to candidate data
-            for FEC_candidate_data in FEC_candidates_data["results"]:
+            for FEC_candidate_data in FEC_candidates_results:
                 # Try to match FEC candidate result to candidate in our data
                 split_name = FEC_candidate_data["name"].split(", ")
                 last_name = split_name[0]
@@ -232,13 +228,9 @@ def summarize_races(db, session):
                         # (e.g. H8WY00148) resolves to the canonical Senate ID
                         # (e.g. S0WY00137) and matches what allRecipients stores.
                         c_id = db.candidate_aliases.get(c_id, c_id)
-                        FEC_candidates_data = FEC_fetch(
-                            session,
-                            f"candidates data for {state}",
-                            "https://api.open.fec.gov/v1/candidates/search",
-                            {"candidate_id": [c_id]},
-                        )
-                        FEC_candidate_data = FEC_candidates_data["results"][0]
+                        FEC_candidate_data = db.candidate_store.get_candidates(
+                            session, [c_id]
+                        )[c_id]
                         names[FEC_candidate_data["name"]] = entry["common_name"]
                         candidates_data[entry["common_name"]][
                             "candidate_id"
@@ -510,3 +502,5 @@ def summarize_races(db, session):
                     "races"
                 ]
             db.client.collection("raceDetails").document(state).update(updated_data)
+    # Races' candidates have changed, so the race index is rebuilt when it's next needed
+    db.race_index = None
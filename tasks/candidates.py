@@ -33,3 +33,13 @@ def update_outside_spending(context):
     """Fetch outside spending data for candidates."""
     update_candidate_outside_spending(context.db, context.session)
     return {"status": "success"}
+
+
+@task(
+    name="refresh_candidate_store",
+    depends_on=[],
+)
+def refresh_candidate_store(context):
+    """Refresh the oldest records in the local candidate store, a batch per run."""
+    refreshed = context.db.candidate_store.refresh_stale(context.session)
+    return {"refreshed": refreshed}
@@ -1,5 +1,5 @@
+from committee_details import hydrate_committees as hydrate
 from pipeline_core.task import task
-from utils import FEC_fetch, pick
 
 
 @task(
@@ -21,104 +21,25 @@ def hydrate_committees(context):
     }
     committees_processed = 0
 
-    for committee in db.committees.values():
-        details_data = FEC_fetch(
-            session,
-            "committee details",
-            "https://api.open.fec.gov/v1/committee/" + committee["id"],
+    hydrated = hydrate(db, session, db.committees)
+    for committee_id, committee in db.committees.items():
+        result = hydrated[committee_id]
+        if not result["details_fetched"]:
+            continue
+        totals = result["totals"]
+        if totals:
+            combined_committee_totals["receipts"] += totals["receipts"]
+            combined_committee_totals["expenditures"] += totals[
+                "independent_expenditures"
+            ]
+            combined_committee_totals["disbursements"] += totals["disbursements"]
+        combined_committee_totals["cash_on_hand"] += result["data"][
+            "last_cash_on_hand_end_period"
+        ]
+        combined_committee_totals["claimed_committed"] += committee.get(
+            "claimedCommitted", 0
         )
-        if details_data and "results" in details_data and details_data["results"][0]:
-            details = details_data["results"][0]
-            picked = pick(
-                details,
-                [
-                    "affiliated_committee_name",
-                    "candidate_ids",
-                    "committee_type",
-                    "committee_type_full",
-                    "cycles",
-                    "designation",
-                    "designation_full",
-                    "first_f1_date",
-                    "leadership_pac",
-                    "organization_type",
-                    "organization_type_full",
-                    "party",
-                    "party_full",
-                    "party_type",
-                    "party_type_full",
-                    "sponsor_candidate_ids",
-                    "website",
-                ],
-            )
-            picked["fec_name"] = details["name"]
-            committee_data = {**committee, **picked}
-
-            totals_data = FEC_fetch(
-                session,
-                "committee totals",
-                "https://api.open.fec.gov/v1/committee/{}/totals".format(
-                    committee["id"]
-                ),
-                params={"cycle": 2026},
-            )
-            if (
-                totals_data
-                and "results" in totals_data
-                and len(totals_data["results"])
-                and totals_data["results"][0]
-            ):
-                totals = totals_data["results"][0]
-                committee_data.update(
-                    **pick(
-                        totals,
-                        [
-                            "contributions",
-                            "contribution_refunds",
-                            "disbursements",
-                            "net_contributions",
-                            "receipts",
-                            "independent_expenditures",
-                        ],
-                    ),
-                )
-                combined_committee_totals["receipts"] += totals["receipts"]
-                combined_committee_totals["expenditures"] += totals[
-                    "independent_expenditures"
-                ]
-                combined_committee_totals["disbursements"] += totals["disbursements"]
-
-            # Fetch cash on hand from the 2024 cycle to get EOY 2024 balance,
-            # avoiding double-counting 2025 contributions.
-            # Newly formed committees return None here, which is fine — they had $0.
-            cash_on_hand = 0
-            cash_on_hand_data = FEC_fetch(
-                session,
-                "committee EOY 2024 cash on hand",
-                "https://api.open.fec.gov/v1/committee/{}/totals".format(
-                    committee["id"]
-                ),
-                params={"cycle": 2024},
-            )
-            if (
-                cash_on_hand_data
-                and "results" in cash_on_hand_data
-                and len(cash_on_hand_data["results"])
-                and cash_on_hand_data["results"][0]
-            ):
-                cash_on_hand = cash_on_hand_data["results"][0].get(
-                    "last_cash_on_hand_end_period", 0
-                )
-            committee_data["last_cash_on_hand_end_period"] = cash_on_hand
-            combined_committee_totals["cash_on_hand"] += cash_on_hand
-            combined_committee_totals["claimed_committed"] += committee.get(
-                "claimedCommitted", 0
-            )
-
-            db.client.collection("committees").document(committee["id"]).set(
-                committee_data
-            )
-            committees_processed += 1
+        committees_processed += 1
 
     combined_committee_totals["receipts"] = round(
         combined_committee_totals["receipts"], 2
@@ -141,3 +62,13 @@ def hydrate_committees(context):
         "committees_processed": committees_processed,
         "totals": combined_committee_totals,
     }
+
+
+@task(
+    name="refresh_committee_store",
+    depends_on=[],
+)
+def refresh_committee_store(context):
+    """Refresh the committees with the oldest metadata in the local committee store, a batch per run."""
+    refreshed = context.db.committee_store.refresh_stale(context.session)
+    return {"refreshed": refreshed}
@@ -1,8 +1,25 @@
 from pipeline_core.task import task
+from pipeline_core.changes import union_changes
 from company_spending import update_spending_by_company
+from company_utils import get_company_ids_for_individuals
 from process_company_contributions import process_company_contributions as process_comp
 
 
+def get_companies_to_process(context):
+    """
+    Get the companies whose contributions need reprocessing, or None to reprocess all of them.
+
+    A company is affected if its own raw contributions changed, or if any of its related individuals changed.
+    """
+    changed_individuals = context.get_changes("individuals")
+    if changed_individuals is None:
+        return None
+    return union_changes(
+        context.get_changes("companies"),
+        get_company_ids_for_individuals(context.db, changed_individuals),
+    )
+
+
 @task(
     name="fetch_company_spending",
     depends_on=["hydrate_committees"],
@@ -10,7 +27,13 @@ from process_company_contributions import process_company_contributions as proce
 )
 def fetch_company_spending(context):
     """Fetch company spending data."""
-    update_spending_by_company(context.db, context.session)
+    update_spending_by_company(
+        context.db,
+        context.session,
+        changes=context.changes,
+        checkpoint=context.checkpoint,
+        changelog=context.changelog,
+    )
     return {"status": "success"}
 
 
@@ -22,5 +45,12 @@ def fetch_company_spending(context):
 )
 def process_company_contributions(context):
     """Process company contributions."""
-    new_recipient_committees = process_comp(context.db, context.session)
-    return {"new_recipient_committees": new_recipient_committees}
+    company_ids = get_companies_to_process(context)
+    new_recipient_committees = process_comp(
+        context.db, context.session, company_ids=company_ids
+    )
+    context.log(f"Contributor groups: {context.db.group_resolver.format_stats()}")
+    return {
+        "new_recipient_committees": new_recipient_committees,
+        "processed_companies": sorted(company_ids) if company_ids is not None else "all",
+    }
@@ -8,6 +8,7 @@ aggregations are properly updated.
 from pipeline_core.task import task
 from company_spending import update_spending_by_company  
 from process_company_contributions import process_company_contributions
+from company_utils import get_company_ids_for_individuals
 import logging
 
 
@@ -27,36 +28,48 @@ def update_companies_for_individuals(context, individual_ids=None):
     3. Company party summaries are recalculated
     
     Args:
-        individual_ids: List of individual IDs that were updated (optional)
+        individual_ids: List of individual IDs that were updated (optional). Defaults to --individual-ids, or the
+            individuals recorded as changed earlier in this run.
     """
+    if not individual_ids:
+        individual_ids = context.individual_ids
+    if not individual_ids and context.get_changes("individuals") is not None:
+        individual_ids = sorted(context.get_changes("individuals"))
+        if not individual_ids:
+            logging.info("No individuals changed, so no companies are affected")
+            return {"status": "no_companies_affected"}
+
+    affected_companies = None
     if individual_ids:
         logging.info(f"Updating company data for individuals: {individual_ids}")
         
         # Find which companies are affected by these individuals
-        affected_companies = set()
-        for ind_id in individual_ids:
-            if ind_id in context.db.individuals:
-                individual = context.db.individuals[ind_id]
-                if "company" in individual:
-                    affected_companies.update(individual["company"])
+        affected_companies = get_company_ids_for_individuals(context.db, individual_ids)
         
         if affected_companies:
-            logging.info(f"Affected companies: {list(affected_companies)}")
+            logging.info(f"Affected companies: {sorted(affected_companies)}")
         else:
             logging.info("No companies affected by these individuals")
             return {"status": "no_companies_affected"}
     
     # Update company spending data (refreshes relatedIndividuals lists)
     logging.info("Updating company spending data...")
-    update_spending_by_company(context.db, context.session)
+    update_spending_by_company(
+        context.db,
+        context.session,
+        company_ids=affected_companies,
+        changelog=context.changelog,
+    )
     
     # Process company contributions (includes individual contributions)  
     logging.info("Processing company contributions with individual data...")
-    new_recipients = process_company_contributions(context.db, context.session)
+    new_recipients = process_company_contributions(
+        context.db, context.session, company_ids=affected_companies
+    )
     
     return {
         "status": "success",
-        "affected_companies": list(affected_companies) if individual_ids else "all",
+        "affected_companies": sorted(affected_companies) if individual_ids else "all",
         "new_recipients": list(new_recipients),
         "processed_individuals": individual_ids if individual_ids else "all"
     }
@@ -68,7 +81,7 @@ def update_companies_for_individuals(context, individual_ids=None):
     outputs=["companies", "individuals"],
     run_by_default=False,
 )
-def complete_individual_workflow(context, individual_ids):
+def complete_individual_workflow(context, individual_ids=None):
     """
     Complete workflow for adding/updating individuals including all dependencies.
     
@@ -78,8 +91,9 @@ def complete_individual_workflow(context, individual_ids):
     3. Ensures all aggregations are consistent
     
     Args:
-        individual_ids: List of individual IDs to process
+        individual_ids: List of individual IDs to process. Defaults to --individual-ids.
     """
+    individual_ids = individual_ids or context.individual_ids
     logging.info(f"Running complete individual workflow for: {individual_ids}")
     
     # First process the individual contributions
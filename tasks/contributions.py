@@ -10,7 +10,13 @@ from process_committee_contributions import process_committee_contributions as p
 )
 def fetch_committee_contributions(context):
     """Fetch raw committee contributions from FEC API."""
-    new_contributions = update_committee_contributions(context.db, context.session)
+    new_contributions = update_committee_contributions(
+        context.db,
+        context.session,
+        changes=context.changes,
+        checkpoint=context.checkpoint,
+        changelog=context.changelog,
+    )
     return {"new_contributions_count": len(new_contributions)}
 
 
@@ -22,5 +28,12 @@ def fetch_committee_contributions(context):
 )
 def process_committee_contributions(context):
     """Process and aggregate committee contributions."""
-    process_contribs(context.db)
-    return {"status": "success"}
+    committee_ids = context.get_changes("committees")
+    process_contribs(
+        context.db, committee_ids=committee_ids, full_rebuild=context.full_rebuild
+    )
+    context.log(f"Contributor groups: {context.db.group_resolver.format_stats()}")
+    return {
+        "status": "success",
+        "processed_committees": sorted(committee_ids) if committee_ids is not None else "all",
+    }
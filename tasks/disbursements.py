@@ -9,5 +9,8 @@ from committee_disbursements import update_committee_disbursements
 )
 def fetch_committee_disbursements(context):
     """Fetch committee disbursements from FEC API."""
-    diff = update_committee_disbursements(context.db, context.session)
+    diff = update_committee_disbursements(
+        context.db, context.session, changelog=context.changelog
+    )
+    context.changes.record("committees", diff.keys())
     return {"disbursement_diff": diff}
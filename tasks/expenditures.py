@@ -12,8 +12,12 @@ from process_company_state_spending import compute_company_state_spending
 )
 def fetch_committee_expenditures(context):
     """Fetch raw committee expenditures from FEC API."""
-    diff = update_committee_expenditures(context.db, context.session)
-    return {"expenditure_diff": diff}
+    diff = update_committee_expenditures(
+        context.db,
+        context.session,
+        changelog=context.changelog,
+    )
+    return {"new_expenditures_count": len(diff)}
 
 
 @task(
@@ -24,7 +28,9 @@ def fetch_committee_expenditures(context):
 )
 def process_expenditures(context):
     """Process committee expenditures and opposition spending."""
-    new_opposition_spending = process_exp(context.db)
+    new_opposition_spending = process_exp(
+        context.db, full_rebuild=context.full_rebuild
+    )
     return {"new_opposition_spending": new_opposition_spending}
 
 
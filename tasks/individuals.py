@@ -3,6 +3,21 @@ from individuals import update_spending_by_individuals
 from process_individual_contributions import process_individual_contributions as process_ind
 
 
+def get_individuals_to_process(context):
+    """
+    Get the individuals whose contributions need reprocessing, or None to reprocess all of them.
+
+    Prefers the individuals recorded as changed in this run (if this task completed the last time it ran), falling
+    back to any IDs requested with --individual-ids.
+    """
+    changed = context.get_changes("individuals")
+    if changed is not None:
+        return changed
+    if context.individual_ids:
+        return set(context.individual_ids)
+    return None
+
+
 @task(
     name="fetch_individual_spending",
     depends_on=["hydrate_committees"],
@@ -10,8 +25,19 @@ from process_individual_contributions import process_individual_contributions as
 )
 def fetch_individual_spending(context):
     """Fetch individual spending data."""
-    update_spending_by_individuals(context.db, context.session)
-    return {"status": "success"}
+    new_contributions = update_spending_by_individuals(
+        context.db,
+        context.session,
+        individual_ids=context.individual_ids,
+        changes=context.changes,
+        checkpoint=context.checkpoint,
+        changelog=context.changelog,
+    )
+    return {
+        "status": "success",
+        "new_contributions_count": len(new_contributions),
+        "processed_individuals": context.individual_ids or "all",
+    }
 
 
 @task(
@@ -22,5 +48,11 @@ def fetch_individual_spending(context):
 )
 def process_individual_contributions(context):
     """Process individual contributions."""
-    new_recipient_committees = process_ind(context.db, context.session)
-    return {"new_recipient_committees": new_recipient_committees}
+    individual_ids = get_individuals_to_process(context)
+    new_recipient_committees = process_ind(
+        context.db, context.session, individual_ids=individual_ids
+    )
+    return {
+        "new_recipient_committees": new_recipient_committees,
+        "processed_individuals": sorted(individual_ids) if individual_ids is not None else "all",
+    }
@@ -6,6 +6,7 @@ from pipeline_core.task import task
 from individuals import update_spending_by_individuals
 from process_individual_contributions import process_individual_contributions as process_ind
 from company_spending import update_spending_by_company
+from company_utils import get_company_ids_for_individuals
 from process_company_contributions import process_company_contributions
 import logging
 
@@ -21,32 +22,24 @@ def fetch_individual_spending_selective(context, individual_ids=None):
     Fetch individual spending data for specific individuals or all.
     
     Args:
-        individual_ids: List of individual IDs to process, or None for all
+        individual_ids: List of individual IDs to process, or None to use --individual-ids (or all)
     """
+    individual_ids = individual_ids or context.individual_ids
     if individual_ids:
         logging.info(f"Fetching spending for specific individuals: {individual_ids}")
-        
-        # Temporarily filter individuals to only requested ones
-        original_individuals = context.db.individuals.copy()
-        context.db.individuals = {
-            id: individual for id, individual in original_individuals.items()
-            if id in individual_ids
-        }
-        
-        try:
-            new_contributions = update_spending_by_individuals(context.db, context.session)
-            return {
-                "status": "success",
-                "processed_individuals": individual_ids,
-                "new_contributions_count": len(new_contributions)
-            }
-        finally:
-            # Restore full individuals list
-            context.db.individuals = original_individuals
-    else:
-        # Process all individuals (existing behavior)
-        update_spending_by_individuals(context.db, context.session)
-        return {"status": "success", "processed_individuals": "all"}
+
+    new_contributions = update_spending_by_individuals(
+        context.db,
+        context.session,
+        individual_ids=individual_ids or None,
+        changes=context.changes,
+        changelog=context.changelog,
+    )
+    return {
+        "status": "success",
+        "processed_individuals": individual_ids if individual_ids else "all",
+        "new_contributions_count": len(new_contributions),
+    }
 
 
 @task(
@@ -61,14 +54,15 @@ def process_individual_contributions_selective(context, individual_ids=None):
     Process individual contributions for specific individuals or all.
     
     Args:
-        individual_ids: List of individual IDs to process, or None for all
+        individual_ids: List of individual IDs to process, or None to use --individual-ids (or all)
     """
+    individual_ids = individual_ids or context.individual_ids
     if individual_ids:
         logging.info(f"Processing contributions for specific individuals: {individual_ids}")
     
-    # The process_ind function already processes all available raw data,
-    # so we don't need to filter here - it will process whatever was fetched
-    new_recipient_committees = process_ind(context.db, context.session)
+    new_recipient_committees = process_ind(
+        context.db, context.session, individual_ids=individual_ids or None
+    )
     
     return {
         "new_recipient_committees": new_recipient_committees,
@@ -117,11 +111,20 @@ def add_and_process_individual(context, individual_id, individual_data):
     if "company" in individual_data and individual_data["company"]:
         logging.info(f"Updating company data for associated companies: {individual_data['company']}")
         
+        company_ids = get_company_ids_for_individuals(context.db, [individual_id])
+
         # Update company spending to refresh relatedIndividuals
-        update_spending_by_company(context.db, context.session)
+        update_spending_by_company(
+            context.db,
+            context.session,
+            company_ids=company_ids,
+            changelog=context.changelog,
+        )
         
         # Process company contributions to include this individual's data
-        company_new_recipients = process_company_contributions(context.db, context.session)
+        company_new_recipients = process_company_contributions(
+            context.db, context.session, company_ids=company_ids
+        )
         
         companies_updated = True
         company_result = {
@@ -0,0 +1,40 @@
+from company_spending import get_search_jobs, plan_searches
+
+
+def count_queries(queries, uses):
+    """Queries run per endpoint: shared queries once, and each of the rest once per job."""
+    count = len(uses)
+    for company_queries in queries.values():
+        for search_param, job_queries, _ in company_queries:
+            count += sum(1 for query in job_queries if (search_param, query) not in uses)
+    return count
+
+
+def plan(search_ids_by_company):
+    search_jobs_by_company = {
+        str_id: get_search_jobs({"search_id": search_ids}, str_id)
+        for str_id, search_ids in search_ids_by_company.items()
+    }
+    unplanned = sum(len(search_jobs) for search_jobs in search_jobs_by_company.values())
+    return unplanned, plan_searches(search_jobs_by_company)
+
+
+def test_partly_shared_terms_are_not_split_out():
+    unplanned, (queries, uses) = plan({"alpha-beta": ["Alpha", "Beta"], "alpha-gamma": ["Alpha", "Gamma"]})
+    assert count_queries(queries, uses) == unplanned == 4
+    assert uses == {}
+
+
+def test_fully_shared_terms_are_queried_once():
+    unplanned, (queries, uses) = plan({"alpha": ["Alpha"], "alpha-labs": ["Alpha"], "beta": ["Beta"]})
+    assert unplanned == 6
+    assert count_queries(queries, uses) == 4
+    assert uses[("contributor_name", ("ALPHA",))] == 2
+
+
+def test_shared_term_split_out_when_it_saves_queries():
+    unplanned, (queries, uses) = plan(
+        {"alpha": ["Alpha"], "alpha-labs": ["Alpha"], "alpha-beta": ["Alpha", "Beta"]}
+    )
+    assert count_queries(queries, uses) < unplanned
+    assert queries["alpha-beta"][0] == ("contributor_name", [("ALPHA",), ("Beta",)], None)
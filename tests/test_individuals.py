@@ -0,0 +1,25 @@
+from individuals import matches_search_params, matches_search_term
+
+
+def test_search_term_matches_word_prefixes():
+    assert matches_search_term("BANKMAN-FRIED, SAMUEL", ["Sam Bankman Fried"])
+    assert matches_search_term("NEW YORK CITY", ["New York"])
+    assert not matches_search_term("FRIED, SAMANTHA", ["Sam Bankman Fried"])
+    assert not matches_search_term("BANKMAN-FRIED, SAMUEL", ["Samuelson Bankman"])
+
+
+def test_search_params_match_nicknames_and_cities():
+    contrib = {
+        "contributor_name": "BANKMAN-FRIED, SAMUEL",
+        "contributor_city": "NEW YORK CITY",
+        "contributor_zip": "100070001",
+    }
+    assert matches_search_params(
+        contrib, {"contributor_name": ["Sam Bankman Fried"], "contributor_city": "New York"}
+    )
+    assert matches_search_params(
+        contrib, {"contributor_name": ["Sam Bankman Fried"], "contributor_zip": "10007"}
+    )
+    assert not matches_search_params(
+        contrib, {"contributor_name": ["Sam Bankman Fried"], "contributor_city": "Newark"}
+    )
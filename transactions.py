@@ -0,0 +1,197 @@
+"""
+Amendment-aware store of FEC transactions.
+
+The FEC reports a transaction again each time the filing it's on is amended, and the same transaction can come back
+from both the processed and the efiled endpoints. Transactions are keyed by (committee_id, transaction_id), since
+transaction IDs are only unique within a filer, and every version seen is kept along with its filing and amendment
+metadata. The current version of each transaction is resolved as versions are added, so looking it up is O(1).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass(slots=True)
+class TransactionVersion:
+    """One version of a transaction, as reported on one filing."""
+
+    record: Any  # What's stored for this version, e.g. the transaction with a trimmed set of fields
+    amendment_indicator: Optional[str] = None  # "N" for new, "A" for amended
+    amendment_number: int = 0
+    amendment_chain_length: int = 0  # Number of filings in the amendment chain, for Schedule A transactions
+    file_number: Optional[int] = None
+    efiled: bool = False
+
+    @property
+    def rank(self):
+        """Versions with a higher rank supersede those with a lower one."""
+        return get_rank(
+            self.amendment_indicator, self.amendment_number, self.amendment_chain_length
+        )
+
+
+def get_rank(amendment_indicator, amendment_number, amendment_chain_length):
+    return (
+        1 if amendment_indicator == "A" else 0,
+        amendment_number,
+        amendment_chain_length,
+    )
+
+
+def get_amendment_chain_length(transaction):
+    amendment_chain = transaction.get("amendment_chain")
+    if amendment_chain is None:
+        amendment_chain = (transaction.get("filing") or {}).get("amendment_chain")
+    return len(amendment_chain) if amendment_chain else 0
+
+
+def get_amendment_metadata(transaction):
+    """Get just the fields of a transaction that describe its version, so the rest of it needn't be kept."""
+    amendment_chain = transaction.get("amendment_chain")
+    if amendment_chain is None:
+        amendment_chain = (transaction.get("filing") or {}).get("amendment_chain")
+    return {
+        "amendment_indicator": transaction.get("amendment_indicator"),
+        "amendment_number": transaction.get("amendment_number"),
+        "amendment_chain": amendment_chain,
+        "file_number": transaction.get("file_number"),
+        "efiled": transaction.get("efiled"),
+    }
+
+
+def get_transaction_rank(transaction):
+    """Get the rank of a transaction's version from its amendment metadata, without building the version."""
+    return get_rank(
+        transaction.get("amendment_indicator"),
+        transaction.get("amendment_number") or 0,
+        get_amendment_chain_length(transaction),
+    )
+
+
+def get_transaction_version(transaction, record=None, efiled=None):
+    """
+    Get the version of a transaction described by a raw FEC record.
+
+    Args:
+        transaction: Transaction as returned by the FEC API, or as stored with its amendment metadata
+        record: What to store for this version (defaults to the transaction itself)
+        efiled: Whether the transaction came from the efiled endpoint (defaults to its "efiled" field)
+    """
+    return TransactionVersion(
+        transaction if record is None else record,
+        transaction.get("amendment_indicator"),
+        transaction.get("amendment_number") or 0,
+        get_amendment_chain_length(transaction),
+        transaction.get("file_number"),
+        bool(transaction.get("efiled")) if efiled is None else efiled,
+    )
+
+
+class TransactionStore:
+    """
+    Every version seen of a set of transactions, keyed by (committee_id, transaction_id), with the current version of
+    each resolved as it's added.
+
+    A version becomes current if it outranks the current one: amendments supersede originals, later amendments
+    supersede earlier ones, and longer amendment chains supersede shorter ones. Of equally ranked versions, the first
+    one added stays current. Transactions are iterated in the order they were first seen.
+
+    Most transactions are only reported once, so versions are kept as added, and their amendment metadata is only read
+    once a second version of the transaction turns up (or the versions are asked for). If a separate record is stored
+    for a version, only the transaction's amendment metadata is kept alongside it, rather than the whole transaction.
+    """
+
+    def __init__(self):
+        self._versions = {}  # Key -> [(transaction, record, efiled)]
+        self._current = {}  # Key -> index of the current version
+        self._ranks = {}  # Key -> rank of each version, once a second version has been added
+
+    def add(self, transaction, record=None, committee_id=None, efiled=None):
+        """
+        Add a version of a transaction.
+
+        Args:
+            transaction: Transaction as returned by the FEC API, or as stored with its amendment metadata
+            record: What to store for this version (defaults to the transaction itself)
+            committee_id: ID of the filing committee (defaults to the transaction's committee_id)
+            efiled: Whether the transaction came from the efiled endpoint (defaults to its "efiled" field)
+
+        Returns:
+            True if this version is now the current version of the transaction
+        """
+        key = (committee_id or transaction["committee_id"], transaction["transaction_id"])
+        if record is None:
+            entry = (transaction, transaction, efiled)
+        else:
+            entry = (get_amendment_metadata(transaction), record, efiled)
+        versions = self._versions.get(key)
+        if versions is None:
+            self._versions[key] = [entry]
+            self._current[key] = 0
+            return True
+        ranks = self._get_ranks(key)
+        rank = get_transaction_rank(transaction)
+        versions.append(entry)
+        ranks.append(rank)
+        if rank > ranks[self._current[key]]:
+            self._current[key] = len(versions) - 1
+            return True
+        return False
+
+    def _get_ranks(self, key):
+        ranks = self._ranks.get(key)
+        if ranks is None:
+            ranks = [get_transaction_rank(transaction) for transaction, _, _ in self._versions[key]]
+            self._ranks[key] = ranks
+        return ranks
+
+    def current(self, committee_id, transaction_id):
+        """Get the current version of a transaction, or None if it hasn't been seen."""
+        key = (committee_id, transaction_id)
+        if key not in self._current:
+            return None
+        return get_transaction_version(*self._versions[key][self._current[key]])
+
+    def versions(self, committee_id, transaction_id):
+        """Get every version seen of a transaction, in the order they were added."""
+        return [
+            get_transaction_version(*entry)
+            for entry in self._versions.get((committee_id, transaction_id), [])
+        ]
+
+    def version_records(self, committee_id, transaction_id):
+        """Get the record stored for every version seen of a transaction, in the order they were added."""
+        return [record for _, record, _ in self._versions.get((committee_id, transaction_id), [])]
+
+    def latest_versions(self, committee_id, transaction_id):
+        """Get the versions of a transaction that are ranked as high as the current one, in the order they were added."""
+        return [get_transaction_version(*entry) for entry in self._latest_entries((committee_id, transaction_id))]
+
+    def latest_records(self, committee_id, transaction_id):
+        """Get the record stored for each of the latest versions of a transaction, in the order they were added."""
+        return [record for _, record, _ in self._latest_entries((committee_id, transaction_id))]
+
+    def _latest_entries(self, key):
+        versions = self._versions.get(key)
+        if versions is None:
+            return []
+        if len(versions) == 1:
+            return versions
+        ranks = self._get_ranks(key)
+        current_rank = ranks[self._current[key]]
+        return [entry for entry, rank in zip(versions, ranks) if rank == current_rank]
+
+    def records(self):
+        """Iterate over the current version of each transaction."""
+        return (
+            self._versions[key][index][1] for key, index in self._current.items()
+        )
+
+    def __iter__(self):
+        return iter(self._current)
+
+    def __contains__(self, key):
+        return key in self._current
+
+    def __len__(self):
+        return len(self._current)
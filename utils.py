@@ -4,13 +4,44 @@ import logging
 import os
 import re
 import requests
+import sys
 from unidecode import unidecode
 
+from pipeline_core.metrics import MetricsCollector
+
 logging.getLogger("backoff").addHandler(logging.StreamHandler())
 
+FEC_API_URL = "https://api.open.fec.gov/v1"
+
+
+def pick(d, keys, interned=None):
+    """
+    Copy the given keys from d. String values of the keys in interned are interned: these are fields like states,
+    receipt types, and committee names that repeat across thousands of records, which would otherwise each hold their
+    own copy of the string for as long as a committee's or company's records are held in memory.
+    """
+    picked = {k: d[k] for k in keys if k in d}
+    if interned:
+        intern_fields(picked, interned)
+    return picked
+
+
+def intern_fields(d, keys):
+    """Intern the string values of the given keys in d, in place."""
+    for k in keys:
+        value = d.get(k)
+        if type(value) is str:
+            d[k] = sys.intern(value)
+    return d
 
-def pick(d, keys):
-    return {k: d[k] for k in keys if k in d}
+
+def get_documents(db, collection, doc_ids=None):
+    """Stream a whole collection, or batch fetch only the given documents if doc_ids is provided."""
+    if doc_ids is None:
+        return db.client.collection(collection).stream()
+    return db.client.get_all(
+        [db.client.collection(collection).document(doc_id) for doc_id in doc_ids]
+    )
 
 
 def fatal_code(e):
@@ -20,6 +51,14 @@ def fatal_code(e):
         return False
 
 
+def FEC_url(url):
+    """Point a request at FEC_API_BASE_URL (e.g. a local FEC API simulator) instead of the live API, if it's set."""
+    base_url = os.environ.get("FEC_API_BASE_URL")
+    if base_url and url.startswith(FEC_API_URL):
+        return base_url.rstrip("/") + url[len(FEC_API_URL) :]
+    return url
+
+
 def chunk(lst, chunk_size=10):
     for i in range(0, len(lst), chunk_size):
         yield lst[i : i + chunk_size]
@@ -39,13 +78,14 @@ def chunk(lst, chunk_size=10):
 )
 def FEC_fetch(session, description, url, params={}):
     r = session.get(
-        url,
+        FEC_url(url),
         params={
             **params,
             "api_key": os.environ["FEC_API_KEY"],
         },
         timeout=30,
     )
+    MetricsCollector.get_instance().record_http_response(r)
     if r.status_code == 404:
         return None
     r.raise_for_status()